@@ -0,0 +1,171 @@
+import sys
+import os
+import time
+import socket
+import asyncio
+import tempfile
+import subprocess
+from benchmarks.bench_create_url import AdminAuthService, populate
+
+# Servers to benchmark: the Flask application on the threaded Werkzeug server that `python main.py url_shortener` runs,
+# and the ASGI application on uvicorn that `python main.py url_shortener_asgi` runs
+SERVERS = ('flask', 'asgi')
+
+# Number of concurrent keep-alive connections, can be overridden on the command line
+DEFAULT_CONNECTIONS = 10_000
+
+# Number of stored entries, and duration in seconds of the redirect load once all connections are open
+ENTRIES = 100_000
+DURATION = 10
+
+# Time in seconds a connection attempt or a request may take before it counts as failed
+TIMEOUT = 10
+
+def serve(server, port):
+
+    """
+    Serve ENTRIES stored URLs with public redirects until the process is terminated. Runs in a subprocess.
+
+    Args:
+        server (str): 'flask' or 'asgi'.
+        port (int): The port to listen on.
+    """
+
+    import logging
+    from werkzeug.serving import make_server
+    import uvicorn
+    from main_modules.shortener import URLShortenerService
+    from main_modules.shortener_asgi import URLShortenerASGI
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        service = URLShortenerService(AdminAuthService(), data_file=os.path.join(temp_dir, 'url_data.json'), public_redirects=True)
+        populate(service, ENTRIES)
+        if server == 'flask':
+            logging.getLogger('werkzeug').setLevel(logging.ERROR)
+            make_server('127.0.0.1', port, service.app, threaded=True).serve_forever()
+        else:
+            uvicorn.run(URLShortenerASGI(service), host='127.0.0.1', port=port, log_level='warning', backlog=DEFAULT_CONNECTIONS)
+
+async def read_response(reader):
+
+    """
+    Read one HTTP response.
+
+    Returns:
+        bool: Whether the server keeps the connection open.
+    """
+
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').lower().split('\r\n')
+    headers = dict(line.split(': ', 1) for line in lines[1:] if ': ' in line)
+    await reader.readexactly(int(headers.get('content-length', 0)))
+    if lines[0].startswith('http/1.0'):
+        return headers.get('connection') == 'keep-alive'
+    return headers.get('connection') != 'close'
+
+async def client(port, ids, start, stats):
+
+    """
+    Open a connection and send redirect requests on it until the load ends, reconnecting whenever the server closes it.
+
+    Args:
+        port (int): The port of the server.
+        ids (list): The IDs to request.
+        start (asyncio.Event): Set once all connections have been attempted.
+        stats (dict): Counters and latencies, updated in place.
+    """
+
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), TIMEOUT)
+    except (OSError, asyncio.TimeoutError):
+        stats['failed_connections'] += 1
+        return
+    stats['open_connections'] += 1
+    await start.wait()
+
+    index = stats['open_connections']
+    while time.monotonic() < stats['deadline']:
+        request_start = time.perf_counter()
+        try:
+            writer.write(f'GET /{ids[index % len(ids)]} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode('ascii'))
+            keep_alive = await asyncio.wait_for(read_response(reader), TIMEOUT)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            stats['failed_requests'] += 1
+            keep_alive = False
+        else:
+            stats['latencies'].append(time.perf_counter() - request_start)
+        index += 1
+        if not keep_alive:
+            writer.close()
+            stats['reconnects'] += 1
+            try:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), TIMEOUT)
+            except (OSError, asyncio.TimeoutError):
+                stats['failed_connections'] += 1
+                return
+    writer.close()
+
+async def load(port, connections):
+
+    """
+    Open `connections` concurrent connections, then send redirect requests on all of them for DURATION seconds.
+
+    Returns:
+        dict: The counters and latencies of the load.
+    """
+
+    stats = {'open_connections': 0, 'failed_connections': 0, 'failed_requests': 0, 'reconnects': 0, 'latencies': [], 'deadline': 0}
+    start = asyncio.Event()
+    ids = [f'{i:08d}' for i in range(0, ENTRIES, 7)]
+    tasks = [asyncio.ensure_future(client(port, ids, start, stats)) for _ in range(connections)]
+    while stats['open_connections'] + stats['failed_connections'] < connections:
+        await asyncio.sleep(0.1)
+    stats['deadline'] = time.monotonic() + DURATION
+    start.set()
+    await asyncio.gather(*tasks)
+    return stats
+
+def bench_server(server, connections):
+
+    """
+    Start a server in a subprocess and put it under the keep-alive load.
+
+    Returns:
+        dict: The counters and latencies of the load.
+    """
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+
+    process = subprocess.Popen([sys.executable, '-m', 'benchmarks.bench_asgi', '--serve', server, str(port)])
+    try:
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.5)
+        return asyncio.run(load(port, connections))
+    finally:
+        process.terminate()
+        process.wait()
+
+def main():
+    if sys.argv[1:2] == ['--serve']:
+        serve(sys.argv[2], int(sys.argv[3]))
+        return
+
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CONNECTIONS
+    print(f"{connections} concurrent keep-alive connections, {DURATION} s of redirects, {os.cpu_count()} CPU cores")
+    print(f"{'server':>6} {'open':>6} {'failed':>7} {'redirects/s':>12} {'p50 (ms)':>9} {'p99 (ms)':>9} {'failed requests':>16} {'reconnects':>11}")
+    for server in SERVERS:
+        stats = bench_server(server, connections)
+        latencies = sorted(stats['latencies'])
+        p50 = latencies[len(latencies) // 2] * 1e3 if latencies else float('nan')
+        p99 = latencies[int(len(latencies) * 0.99)] * 1e3 if latencies else float('nan')
+        print(f"{server:>6} {stats['open_connections']:>6} {stats['failed_connections']:>7} {len(latencies) / DURATION:>12.0f} "
+              f"{p50:>9.1f} {p99:>9.1f} {stats['failed_requests']:>16} {stats['reconnects']:>11}")
+
+if __name__ == '__main__':
+    main()
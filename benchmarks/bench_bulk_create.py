@@ -0,0 +1,53 @@
+import sys
+import os
+import json
+import time
+import tempfile
+from main_modules.shortener import URLShortenerService
+from benchmarks.bench_create_url import AdminAuthService, populate
+
+# Dataset sizes to benchmark, can be overridden on the command line
+DEFAULT_SIZES = [0, 100_000, 1_000_000]
+
+# Number of URLs per bulk request
+BATCH_SIZE = 10_000
+
+def bench_bulk_create(size, storage_backend):
+
+    """
+    Measure the duration of a single POST /bulk request with BATCH_SIZE new URLs.
+
+    Args:
+        size (int): The number of entries already stored (memory backend only).
+        storage_backend (str): The storage backend of the service.
+
+    Returns:
+        float: The duration of the request in milliseconds.
+    """
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        service = URLShortenerService(AdminAuthService(), data_file=os.path.join(temp_dir, 'url_data.json'), storage_backend=storage_backend)
+        if storage_backend == 'memory':
+            populate(service, size)
+        client = service.app.test_client()
+        body = json.dumps({"urls": [f"https://www.example.org/{i}" for i in range(BATCH_SIZE)]})
+
+        start = time.perf_counter()
+        response = client.post("/bulk", headers={"Authorization": "Bearer token"}, data=body, content_type="application/json")
+        duration = (time.perf_counter() - start) * 1e3
+        assert response.status_code == 200
+
+        service.close()
+
+    return duration
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or DEFAULT_SIZES
+    print(f"{BATCH_SIZE} URLs per request")
+    print(f"{'backend':>8} {'entries':>12} {'duration (ms)':>14}")
+    for size in sizes:
+        print(f"{'memory':>8} {size:>12} {bench_bulk_create(size, 'memory'):>14.1f}")
+    print(f"{'sqlite':>8} {0:>12} {bench_bulk_create(0, 'sqlite'):>14.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+import sys
+import os
+import json
+import time
+import tempfile
+import statistics
+from main_modules.shortener import URLShortenerService
+from helper_modules.table_helpers import RecordTable
+
+# Dataset sizes to benchmark, can be overridden on the command line
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+
+# Number of POST requests timed per dataset size
+REQUESTS = 1000
+
+# Timestamp of creation of the synthetic entries, 2023-01-01 00:00:00 UTC
+CREATED_AT = 1672531200
+
+class AdminAuthService:
+
+    """
+    Stand-in for AuthService that accepts every token as an admin token, so only the shortener is measured.
+    """
+
+    def validate_jwt(self, token):
+        return {"role": "admin"}
+
+def populate(service, size):
+
+    """
+    Fill the memory store of the service with `size` synthetic short URLs and rebuild its sorted order.
+
+    Args:
+        service (URLShortenerService): The service to fill.
+        size (int): The number of entries.
+    """
+
+    table = RecordTable()
+    for i in range(size):
+        table.put(f'{i:08d}'.encode('ascii'), f"https://www.example.com/{i}".encode('utf-8'), CREATED_AT, ordered=False)
+    table.build_order()
+    service.store.table = table
+
+def bench_create(size):
+
+    """
+    Measure the latency of POST / against a dataset of the given size.
+
+    Args:
+        size (int): The number of entries already stored.
+
+    Returns:
+        Tuple: The median and 99th percentile latency in microseconds.
+    """
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        service = URLShortenerService(AdminAuthService(), data_file=os.path.join(temp_dir, 'url_data.json'))
+        populate(service, size)
+        client = service.app.test_client()
+        headers = {"Authorization": "Bearer token"}
+
+        latencies = []
+        for i in range(REQUESTS):
+            body = json.dumps({"url": f"https://www.example.org/{i}"})
+            start = time.perf_counter()
+            response = client.post("/", headers=headers, data=body, content_type="application/json")
+            latencies.append((time.perf_counter() - start) * 1e6)
+            assert response.status_code == 201
+
+        service.close()
+
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.99)]
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or DEFAULT_SIZES
+    print(f"{'entries':>12} {'median (us)':>12} {'p99 (us)':>12}")
+    for size in sizes:
+        median, p99 = bench_create(size)
+        print(f"{size:>12} {median:>12.1f} {p99:>12.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import sys
+import os
+import time
+import tempfile
+from main_modules.auth import AuthService
+from helper_modules.auth_helpers import PasswordHasher, kdf_parameters
+
+# Numbers of users to import with the HMAC hasher, can be overridden on the command line
+DEFAULT_USERS = [100_000, 1_000_000]
+
+# Number of users to import with the key derivation function, whose rate is extrapolated to a million users
+KDF_USERS = 200
+
+# Password of the benchmark users
+PASSWORD = 'Str3ngP4ss1!'
+
+def bench_import(hasher, users):
+
+    """
+    Import `users` users into an empty user store from a stream of records, like `python main.py import_users` does.
+
+    Args:
+        hasher (PasswordHasher): The password hasher of the auth service.
+        users (int): The number of users to import.
+
+    Returns:
+        float: The number of users imported per second.
+    """
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        auth_service = AuthService(None, password_hasher=hasher, users_file=os.path.join(temp_dir, 'users.json'))
+        records = ({'username': f'import_user_{i:07d}', 'password': PASSWORD} for i in range(users))
+        start = time.perf_counter()
+        for result in auth_service.import_users(records):
+            assert result['status'] == 'created'
+        elapsed = time.perf_counter() - start
+        auth_service.close()
+    return users / elapsed
+
+def bench_sign_ups(users):
+
+    """
+    Create `users` users with one POST /users request each, the way an import had to be done before.
+
+    Args:
+        users (int): The number of users to create.
+
+    Returns:
+        float: The number of users created per second.
+    """
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        auth_service = AuthService(None, password_hasher=PasswordHasher('hmac'), users_file=os.path.join(temp_dir, 'users.json'))
+        client = auth_service.app.test_client()
+        start = time.perf_counter()
+        for i in range(users):
+            assert client.post('/users', json={'username': f'sign_up_user_{i:07d}', 'password': PASSWORD}).status_code == 201
+        elapsed = time.perf_counter() - start
+        auth_service.close()
+    return users / elapsed
+
+def main():
+    counts = [int(count) for count in sys.argv[1:]] or DEFAULT_USERS
+    print(f"{os.cpu_count()} CPU cores")
+    print(f"{'hasher':>16} {'users':>9} {'users/s':>9} {'1M users (min)':>15}")
+    rate = bench_sign_ups(10_000)
+    print(f"{'POST /users':>16} {10_000:>9} {rate:>9.0f} {1e6 / rate / 60:>15.1f}")
+    for users in counts:
+        rate = bench_import(PasswordHasher('hmac'), users)
+        print(f"{'hmac':>16} {users:>9} {rate:>9.0f} {1e6 / rate / 60:>15.1f}")
+    for workers in sorted({1, os.cpu_count()}):
+        hasher = PasswordHasher('scrypt', workers=workers)
+        rate = bench_import(hasher, KDF_USERS)
+        hasher.close()
+        print(f"{f'scrypt pool {workers}':>16} {KDF_USERS:>9} {rate:>9.1f} {1e6 / rate / 60:>15.0f}")
+    print(f"scrypt {kdf_parameters('scrypt')}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import sys
+import os
+import time
+import tempfile
+import threading
+from main_modules.auth import AuthService
+from helper_modules.auth_helpers import PasswordHasher, kdf_parameters
+
+# Worker pool sizes to benchmark, can be overridden on the command line
+DEFAULT_WORKERS = [1, 2, 4]
+
+# Number of concurrent clients logging in, and duration in seconds of the load
+CLIENTS = 16
+DURATION = 5
+
+# Password of the benchmark users
+PASSWORD = 'Str3ngP4ss1!'
+
+class InlineHasher(PasswordHasher):
+
+    """
+    A password hasher that runs the key derivation function on the request thread, the baseline the worker pool is measured against.
+    """
+
+    def _run(self, function, *args):
+        return function(*args)
+
+def bench_login(hasher):
+
+    """
+    Log in from CLIENTS threads for DURATION seconds, while a probe thread sends a request that needs no password hash
+    (a login of an unknown user) to measure how much the logins stall the other requests of the server.
+
+    Args:
+        hasher (PasswordHasher): The password hasher of the auth service.
+
+    Returns:
+        Tuple: The successful logins per second, their median and 99th percentile latency in milliseconds,
+               the number of logins rejected with 503, and the 99th percentile latency of the probe in milliseconds.
+    """
+
+    temp_dir = tempfile.TemporaryDirectory()
+    auth_service = AuthService(None, password_hasher=hasher, users_file=os.path.join(temp_dir.name, 'users.json'))
+    for index in range(CLIENTS):
+        auth_service.get_user_store().create(f'bench_user_{index}', hasher.hash(PASSWORD), 'regular')
+
+    latencies = [[] for _ in range(CLIENTS)]
+    rejected = [0] * CLIENTS
+    probes = []
+    deadline = time.monotonic() + DURATION
+
+    def client(index):
+        test_client = auth_service.app.test_client()
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            status = test_client.post('/users/login', json={'username': f'bench_user_{index}', 'password': PASSWORD}).status_code
+            if status == 503:
+                rejected[index] += 1
+            else:
+                assert status == 200
+                latencies[index].append(time.perf_counter() - start)
+
+    def probe():
+        test_client = auth_service.app.test_client()
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            test_client.post('/users/login', json={'username': 'unknown_user', 'password': PASSWORD})
+            probes.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(CLIENTS)] + [threading.Thread(target=probe)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    auth_service.close()
+    temp_dir.cleanup()
+
+    logins = sorted(latency * 1e3 for client_latencies in latencies for latency in client_latencies)
+    probes = sorted(latency * 1e3 for latency in probes)
+    return len(logins) / DURATION, logins[len(logins) // 2], logins[int(len(logins) * 0.99)], sum(rejected), probes[int(len(probes) * 0.99)]
+
+def main():
+    counts = [int(count) for count in sys.argv[1:]] or DEFAULT_WORKERS
+    kdf = os.environ.get("PASSWORD_KDF", "scrypt")
+    if kdf == 'hmac':
+        kdf = 'scrypt'
+    print(f"{kdf} {kdf_parameters(kdf)}, {CLIENTS} clients, {DURATION} s of logins, {os.cpu_count()} CPU cores")
+    print(f"{'hasher':>10} {'logins/s':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} {'rejected':>9} {'probe p99 (ms)':>15}")
+    configurations = [('hmac', PasswordHasher('hmac')), ('inline', InlineHasher(kdf))]
+    configurations += [(f'pool {workers}', PasswordHasher(kdf, workers=workers)) for workers in counts]
+    for name, hasher in configurations:
+        rate, p50, p99, rejected, probe_p99 = bench_login(hasher)
+        print(f"{name:>10} {rate:>9.0f} {p50:>9.1f} {p99:>9.1f} {rejected:>9} {probe_p99:>15.1f}")
+
+if __name__ == '__main__':
+    main()
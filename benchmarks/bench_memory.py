@@ -0,0 +1,95 @@
+import gc
+import sys
+import resource
+import subprocess
+from helper_modules.table_helpers import RecordTable
+
+# Dataset sizes to benchmark, can be overridden on the command line
+DEFAULT_SIZES = [100_000, 1_000_000]
+
+# Memory layouts that are compared: the per-record dictionaries used before the RecordTable, and the RecordTable
+LAYOUTS = ('dict', 'table')
+
+# Timestamp of creation of the synthetic entries, 2023-01-01 00:00:00 UTC
+CREATED_AT = 1672531200
+
+def max_rss():
+
+    """
+    Returns the peak resident set size of the current process in bytes.
+    """
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def current_rss():
+
+    """
+    Returns the current resident set size of the current process in bytes (Linux only).
+    """
+
+    with open('/proc/self/statm') as file:
+        return int(file.read().split()[1]) * resource.getpagesize()
+
+def build(layout, size):
+
+    """
+    Build the in-memory structures of the memory store for `size` synthetic short URLs with ~40 character URLs.
+
+    Args:
+        layout (str): 'dict' or 'table'.
+        size (int): The number of entries.
+
+    Returns:
+        object: The structures, kept alive by the caller while memory is measured.
+    """
+
+    urls = (f"https://www.example.com/articles/{i:08d}" for i in range(size))
+    if layout == 'dict':
+        url_data = {f'{i:08d}': {"url": url, "created_at": "2023-01-01 00:00:00"} for i, url in enumerate(urls)}
+        url_index = {value["url"]: key for key, value in url_data.items()}
+        created_index = [(value["created_at"], key) for key, value in url_data.items()]
+        created_index.sort()
+        return url_data, url_index, created_index
+
+    table = RecordTable()
+    for i, url in enumerate(urls):
+        table.put(f'{i:08d}'.encode('ascii'), url.encode('utf-8'), CREATED_AT, ordered=False)
+    table.build_order()
+    return table
+
+def measure(layout, size):
+
+    """
+    Measure the memory per entry of a layout in a fresh interpreter, so the layouts do not share freed memory.
+
+    Args:
+        layout (str): 'dict' or 'table'.
+        size (int): The number of entries.
+
+    Returns:
+        Tuple: The growth of the current and of the peak resident set size per entry, in bytes.
+    """
+
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_memory', '--measure', layout, str(size)], check=True, capture_output=True, text=True).stdout
+    resident, peak = output.split()
+    return float(resident), float(peak)
+
+def main():
+    if sys.argv[1:2] == ['--measure']:
+        layout, size = sys.argv[2], int(sys.argv[3])
+        before, peak_before = current_rss(), max_rss()
+        structures = build(layout, size)
+        gc.collect()
+        print((current_rss() - before) / size, (max_rss() - peak_before) / size)
+        return
+
+    sizes = [int(size) for size in sys.argv[1:]] or DEFAULT_SIZES
+    print(f"{'entries':>12} {'layout':>8} {'resident (B)':>14} {'peak (B)':>10}")
+    for size in sizes:
+        results = {layout: measure(layout, size) for layout in LAYOUTS}
+        for layout, (resident, peak) in results.items():
+            print(f"{size:>12} {layout:>8} {resident:>14.1f} {peak:>10.1f}")
+        print(f"{'':>12} {'ratio':>8} {results['dict'][0] / results['table'][0]:>14.2f} {results['dict'][1] / results['table'][1]:>10.2f}")
+
+if __name__ == '__main__':
+    main()
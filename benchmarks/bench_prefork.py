@@ -0,0 +1,154 @@
+import sys
+import os
+import time
+import signal
+import socket
+import tempfile
+import threading
+import http.client
+from main_modules.shortener import URLShortenerService
+from helper_modules.server_helpers import PreforkServer
+from benchmarks.bench_create_url import AdminAuthService, populate
+
+# Worker counts to benchmark, can be overridden on the command line
+DEFAULT_WORKERS = [1, 2, 4]
+
+# Number of stored entries
+ENTRIES = 1_000_000
+
+# Number of concurrent clients and duration in seconds of the redirect load
+CLIENTS = 16
+DURATION = 5
+
+def free_port():
+
+    """
+    Returns a free TCP port on localhost.
+    """
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def memory_of(pid):
+
+    """
+    Read the memory of a process from /proc.
+
+    Args:
+        pid (int): The process ID.
+
+    Returns:
+        Tuple: The resident and the private (not shared with any other process) memory in MiB.
+    """
+
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return values['Rss'], values['Private_Clean'] + values['Private_Dirty']
+
+def workers_of(pid, count, timeout=60):
+
+    """
+    Wait until the master process has forked its workers.
+
+    Args:
+        pid (int): The process ID of the master.
+        count (int): The number of workers.
+        timeout (float, optional): The time in seconds to wait. Defaults to 60.
+
+    Returns:
+        list: The process IDs of the workers.
+    """
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with open(f'/proc/{pid}/task/{pid}/children') as file:
+            children = [int(child) for child in file.read().split()]
+        if len(children) == count:
+            return children
+        time.sleep(0.1)
+    raise RuntimeError(f"Master {pid} did not fork {count} workers.")
+
+def redirect_load(port, ids):
+
+    """
+    Send redirect requests from CLIENTS threads for DURATION seconds.
+
+    Args:
+        port (int): The port of the server.
+        ids (list): The IDs to request.
+
+    Returns:
+        float: The number of redirects per second.
+    """
+
+    counts = [0] * CLIENTS
+    deadline = time.monotonic() + DURATION
+    def client(index):
+        while time.monotonic() < deadline:
+            connection = http.client.HTTPConnection('127.0.0.1', port)
+            connection.request('GET', f'/{ids[counts[index] % len(ids)]}')
+            assert connection.getresponse().status == 301
+            connection.close()
+            counts[index] += 1
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(CLIENTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / DURATION
+
+def bench_prefork(workers):
+
+    """
+    Serve ENTRIES stored URLs with the pre-fork server and measure redirect throughput and memory.
+
+    Args:
+        workers (int): The number of worker processes.
+
+    Returns:
+        Tuple: The redirects per second, and the mean resident and private memory per worker in MiB.
+               The difference between the two is memory that the worker shares copy-on-write with the master.
+    """
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        service = URLShortenerService(AdminAuthService(), data_file=os.path.join(temp_dir, 'url_data.json'), public_redirects=True)
+        populate(service, ENTRIES)
+        port = free_port()
+
+        pid = os.fork()
+        if pid == 0:
+            server = PreforkServer(service.app, port, workers, max_requests=0, after_fork=service.after_fork, on_exit=service.close)
+            server.cfg.set('bind', [f'127.0.0.1:{port}'])
+            server.cfg.set('loglevel', 'warning')
+            server.run()
+            os._exit(0)
+
+        children = workers_of(pid, workers)
+        time.sleep(1)
+        rate = redirect_load(port, [f'{i:08d}' for i in range(0, ENTRIES, 997)])
+
+        usage = [memory_of(child) for child in children]
+        resident = sum(rss for rss, _ in usage) / workers
+        private = sum(private for _, private in usage) / workers
+
+        os.kill(pid, signal.SIGTERM)
+        os.waitpid(pid, 0)
+        service.close()
+
+    return rate, resident, private
+
+def main():
+    counts = [int(count) for count in sys.argv[1:]] or DEFAULT_WORKERS
+    print(f"{ENTRIES} entries, {CLIENTS} clients, {os.cpu_count()} CPU cores")
+    print(f"{'workers':>7} {'redirects/s':>12} {'RSS/worker (MiB)':>17} {'private/worker (MiB)':>21}")
+    for workers in counts:
+        rate, resident, private = bench_prefork(workers)
+        print(f"{workers:>7} {rate:>12.0f} {resident:>17.1f} {private:>21.1f}")
+
+if __name__ == '__main__':
+    main()
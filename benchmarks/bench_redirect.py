@@ -0,0 +1,71 @@
+import sys
+import os
+import time
+import tempfile
+from flask import Flask
+from werkzeug.test import EnvironBuilder
+from main_modules.auth import AuthService
+from main_modules.shortener import URLShortenerService
+from helper_modules.auth_helpers import generate_jwt_token
+
+# Number of redirect requests timed per mode, can be overridden on the command line
+DEFAULT_REQUESTS = 20000
+
+# Timestamp of creation of the short URL that is redirected
+CREATED_AT = 1672531200
+
+def start_response(status, headers, exc_info=None):
+    pass
+
+def bench_redirects(public_redirects, token_cache, fast_path, requests):
+
+    """
+    Measure the throughput of GET /<id> through the WSGI application, without the overhead of an HTTP server.
+
+    Args:
+        public_redirects (bool): Whether redirects are served without a bearer token.
+        token_cache (bool): Whether verified tokens are cached, otherwise every request verifies the token.
+        fast_path (bool): Whether public redirects are served by the WSGI fast path, otherwise by Flask.
+        requests (int): The number of requests.
+
+    Returns:
+        float: The number of requests per second.
+    """
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        auth_service = AuthService(None, revocations_file=os.path.join(temp_dir, 'revocations.log'))
+        auth_service.token_cache.max_size = auth_service.token_cache.max_size if token_cache else 0
+        service = URLShortenerService(auth_service, data_file=os.path.join(temp_dir, 'url_data.json'), public_redirects=public_redirects)
+        service.store.put('abcdefgh', {'url': 'https://www.example.com/articles/00000001', 'created_at': CREATED_AT})
+
+        headers = {} if public_redirects else {'Authorization': f"Bearer {generate_jwt_token('bench_user', 'regular', auth_service.get_signing_context())}"}
+        environ = EnvironBuilder(path='/abcdefgh', headers=headers).get_environ()
+        if fast_path:
+            wsgi_app = service.app.wsgi_app
+        else:
+            wsgi_app = lambda environ, start_response: Flask.wsgi_app(service.app, environ, start_response)
+
+        start = time.perf_counter()
+        for _ in range(requests):
+            for _ in wsgi_app(environ.copy(), start_response):
+                pass
+        duration = time.perf_counter() - start
+
+        service.close()
+        auth_service.close()
+        return requests / duration
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REQUESTS
+    print(f"{'mode':>20} {'requests/s':>12}")
+    modes = [
+        ('token, uncached', False, False, False),
+        ('token, cached', False, True, False),
+        ('public, flask', True, True, False),
+        ('public, fast path', True, True, True),
+    ]
+    for mode, public_redirects, token_cache, fast_path in modes:
+        print(f"{mode:>20} {bench_redirects(public_redirects, token_cache, fast_path, requests):>12.0f}")
+
+if __name__ == '__main__':
+    main()
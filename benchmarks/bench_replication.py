@@ -0,0 +1,106 @@
+import sys
+import os
+import json
+import time
+import tempfile
+from helper_modules.storage_helpers import MemoryStorage
+from helper_modules.wal_helpers import write_snapshot
+from benchmarks.bench_create_url import CREATED_AT
+
+# Follow intervals in seconds to benchmark, can be overridden on the command line
+DEFAULT_INTERVALS = [0.01, 0.1]
+
+# Number of stored entries, which a process would have to load again to pick up the writes of another process without following the log
+ENTRIES = 100_000
+
+# Number of writes made by the other process, and their rate per second
+WRITES = 1000
+RATE = 200
+
+def follow(data_file, interval, ready, results):
+
+    """
+    Open the store and follow the writes of the other process, recording the propagation lag of every record. Runs in a forked process.
+
+    Args:
+        data_file (str): The path of the shared data file.
+        interval (float): The follow interval in seconds.
+        ready (int): The pipe to signal on once the store is open.
+        results (int): The pipe to write the lags and the total apply time to, as JSON.
+    """
+
+    store = MemoryStorage(data_file, follow_interval=interval)
+    lags = []
+    apply_time = 0.0
+    apply_followed = store._follower._apply
+    def measured_apply(records):
+        nonlocal apply_time
+        now = time.time()
+        lags.extend(now - record['ts'] for record in records)
+        start = time.perf_counter()
+        apply_followed(records)
+        apply_time += time.perf_counter() - start
+    store._follower._apply = measured_apply
+
+    os.write(ready, b'1')
+    while len(lags) < WRITES:
+        time.sleep(0.01)
+    store.close()
+    os.write(results, json.dumps({'lags': lags, 'apply_time': apply_time}).encode('ascii'))
+
+def bench_replication(interval):
+
+    """
+    Write to a store at a fixed rate while a second process follows the shared log.
+
+    Args:
+        interval (float): The follow interval of the second process in seconds.
+
+    Returns:
+        Tuple: The median and 99th percentile propagation lag in milliseconds, the apply time per record in microseconds,
+               and the time in seconds the writing process took to load the store, which a full reload would take on every change.
+    """
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_file = os.path.join(temp_dir, 'url_data.json')
+        write_snapshot(data_file, ((f'{i:08d}', {'url': f"https://www.example.com/{i}", 'created_at': CREATED_AT}) for i in range(ENTRIES)))
+
+        ready_read, ready_write = os.pipe()
+        results_read, results_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            follow(data_file, interval, ready_write, results_write)
+            os._exit(0)
+        os.read(ready_read, 1)
+
+        start = time.perf_counter()
+        store = MemoryStorage(data_file)
+        load_time = time.perf_counter() - start
+        for i in range(WRITES):
+            store.put(f'w{i:07d}', {'url': f"https://www.example.org/{i}", 'created_at': CREATED_AT})
+            time.sleep(1 / RATE)
+
+        data = b''
+        while chunk := os.read(results_read, 1 << 20):
+            data += chunk
+            try:
+                results = json.loads(data)
+                break
+            except ValueError:
+                continue
+        os.waitpid(pid, 0)
+        store.close()
+
+    lags = sorted(lag * 1e3 for lag in results['lags'])
+    return lags[len(lags) // 2], lags[int(len(lags) * 0.99)], results['apply_time'] / len(lags) * 1e6, load_time
+
+def main():
+    intervals = [float(interval) for interval in sys.argv[1:]] or DEFAULT_INTERVALS
+    print(f"{ENTRIES} entries, {WRITES} writes at {RATE}/s by another process")
+    print(f"{'interval (s)':>12} {'p50 lag (ms)':>13} {'p99 lag (ms)':>13} {'apply (us/record)':>18} {'full load (s)':>14}")
+    for interval in intervals:
+        median, p99, apply_time, load_time = bench_replication(interval)
+        print(f"{interval:>12} {median:>13.1f} {p99:>13.1f} {apply_time:>18.1f} {load_time:>14.2f}")
+
+if __name__ == '__main__':
+    main()
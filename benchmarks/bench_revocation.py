@@ -0,0 +1,62 @@
+import sys
+import time
+from main_modules.auth import RevocationList
+
+# Numbers of live revocations to benchmark, can be overridden on the command line
+DEFAULT_REVOCATIONS = [0, 10_000, 100_000]
+
+# Number of checks of tokens that are not revoked
+CHECKS = 1_000_000
+
+class LockedRevocationList(RevocationList):
+
+    """
+    A revocation list whose checks take the lock, the baseline the lock-free checks are measured against.
+    """
+
+    def is_revoked(self, payload):
+        with self._lock:
+            if payload.get('jti') in self._tokens:
+                return True
+            revocation = self._users.get(payload.get('sub'))
+            return revocation is not None and payload.get('iat', 0) < revocation[0]
+
+def bench_checks(revocations, payloads):
+
+    """
+    Check tokens that are not revoked.
+
+    Args:
+        revocations (RevocationList): The revocation list.
+        payloads (list): The payloads of the tokens.
+
+    Returns:
+        float: The time per check in nanoseconds.
+    """
+
+    is_revoked = revocations.is_revoked
+    start = time.perf_counter()
+    for payload in payloads:
+        is_revoked(payload)
+    return (time.perf_counter() - start) / len(payloads) * 1e9
+
+def main():
+    counts = [int(count) for count in sys.argv[1:]] or DEFAULT_REVOCATIONS
+    now = time.time()
+    payloads = [{'sub': f'user_{i % 50_000}', 'role': 'regular', 'iat': now, 'jti': f'live_{i}', 'exp': now + 86400} for i in range(CHECKS)]
+
+    print(f"{CHECKS} checks of tokens that are not revoked")
+    print(f"{'revocations':>11} {'lock-free (ns/check)':>21} {'locked (ns/check)':>18}")
+    for count in counts:
+        results = []
+        for revocation_list in (RevocationList(), LockedRevocationList()):
+            for i in range(count):
+                if i % 2:
+                    revocation_list.revoke_token({'jti': f'revoked_{i}', 'exp': now + 86400})
+                else:
+                    revocation_list.revoke_user(f'revoked_user_{i}', cutoff=now)
+            results.append(bench_checks(revocation_list, payloads))
+        print(f"{count:>11} {results[0]:>21.0f} {results[1]:>18.0f}")
+
+if __name__ == '__main__':
+    main()
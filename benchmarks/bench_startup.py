@@ -0,0 +1,71 @@
+import sys
+import os
+import time
+import tempfile
+from helper_modules.snapshot_helpers import SNAPSHOT_FORMATS, table_items, write_binary_snapshot
+from helper_modules.storage_helpers import MemoryStorage
+from helper_modules.table_helpers import RecordTable
+from helper_modules.wal_helpers import write_snapshot
+
+# Dataset sizes to benchmark, can be overridden on the command line
+DEFAULT_SIZES = [100_000, 1_000_000]
+
+# Timestamp of creation of the synthetic entries, 2023-01-01 00:00:00 UTC
+CREATED_AT = 1672531200
+
+def build_table(size):
+
+    """
+    Build a table with `size` synthetic short URLs with ~40 character URLs.
+
+    Args:
+        size (int): The number of entries.
+
+    Returns:
+        RecordTable: The table.
+    """
+
+    table = RecordTable()
+    for i in range(size):
+        table.put(f'{i:08d}'.encode('ascii'), f"https://www.example.com/articles/{i:08d}".encode('utf-8'), CREATED_AT + i // 1000, ordered=False)
+    table.build_order()
+    return table
+
+def bench_startup(table, snapshot_format):
+
+    """
+    Measure how long the memory store takes to load a snapshot of the table in the given format.
+
+    Args:
+        table (RecordTable): The records to snapshot.
+        snapshot_format (str): 'json' or 'binary'.
+
+    Returns:
+        Tuple: The load time in seconds and the size of the snapshot in bytes.
+    """
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_file = os.path.join(temp_dir, 'url_data.json')
+        if snapshot_format == 'binary':
+            write_binary_snapshot(data_file, table, table.order)
+        else:
+            write_snapshot(data_file, table_items(table, table.order))
+
+        start = time.perf_counter()
+        store = MemoryStorage(data_file)
+        duration = time.perf_counter() - start
+        assert store.count() == len(table)
+        store.close()
+        return duration, os.path.getsize(data_file)
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or DEFAULT_SIZES
+    print(f"{'entries':>12} {'format':>8} {'load (s)':>10} {'size (MB)':>10}")
+    for size in sizes:
+        table = build_table(size)
+        for snapshot_format in SNAPSHOT_FORMATS:
+            duration, file_size = bench_startup(table, snapshot_format)
+            print(f"{size:>12} {snapshot_format:>8} {duration:>10.3f} {file_size / 1e6:>10.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+import sys
+import os
+import time
+import tempfile
+import threading
+from helper_modules.auth_helpers import hash_password
+from helper_modules.user_helpers import UserStore
+from helper_modules.wal_helpers import write_snapshot
+
+# Numbers of users in the snapshot to benchmark, can be overridden on the command line
+DEFAULT_USERS = [100_000, 1_000_000]
+
+# Number of users created after the snapshot was written, which startup replays from the log
+LOG_USERS = 50_000
+
+# Number of threads signing up concurrently, and sign-ups per thread
+THREADS = 16
+SIGN_UPS = 500
+
+def bench_startup(users):
+
+    """
+    Load a store of `users` users from a snapshot plus LOG_USERS users from the write-ahead log.
+
+    Args:
+        users (int): The number of users in the snapshot.
+
+    Returns:
+        float: The time in seconds startup took.
+    """
+
+    password_hash = hash_password('Str3ngP4ss1!')
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_file = os.path.join(temp_dir, 'users.json')
+        write_snapshot(data_file, ((f'user_{i:07d}', f'regular:{password_hash}') for i in range(users)))
+        store = UserStore(data_file, durability='async')
+        for i in range(LOG_USERS):
+            store.create(f'log_user_{i:07d}', password_hash, 'regular')
+        store.close()
+
+        start = time.perf_counter()
+        store = UserStore(data_file)
+        elapsed = time.perf_counter() - start
+        assert len(store) == users + LOG_USERS
+        store.close()
+    return elapsed
+
+def bench_sign_ups(stripes):
+
+    """
+    Create users from THREADS threads at once, each waiting until its user is durable.
+
+    Args:
+        stripes (int): The number of lock stripes of the store.
+
+    Returns:
+        float: The number of sign-ups per second.
+    """
+
+    password_hash = hash_password('Str3ngP4ss1!')
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = UserStore(os.path.join(temp_dir, 'users.json'), stripes=stripes)
+        barrier = threading.Barrier(THREADS + 1)
+        def sign_up(thread):
+            barrier.wait()
+            for i in range(SIGN_UPS):
+                assert store.create(f'user_{thread}_{i}', password_hash, 'regular')
+        threads = [threading.Thread(target=sign_up, args=(thread,)) for thread in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        store.close()
+    return THREADS * SIGN_UPS / elapsed
+
+def main():
+    counts = [int(count) for count in sys.argv[1:]] or DEFAULT_USERS
+    print(f"Startup with {LOG_USERS} users in the log")
+    print(f"{'users':>9} {'startup (s)':>12}")
+    for users in counts:
+        print(f"{users:>9} {bench_startup(users):>12.2f}")
+
+    print(f"\n{THREADS} threads signing up, durability 'sync'")
+    print(f"{'stripes':>7} {'sign-ups/s':>11}")
+    for stripes in (1, 64):
+        print(f"{stripes:>7} {bench_sign_ups(stripes):>11.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+import re
+import sys
+import time
+from helper_modules.shortener_helpers import is_valid_url, canonicalize_urls, INTERNET_MAX_PATH_LENGTH, _idna_host
+
+# Numbers of URLs to validate, can be overridden on the command line
+DEFAULT_URLS = [10_000, 100_000]
+
+# Number of distinct hosts the URLs are spread over
+HOSTS = 1000
+
+def is_valid_url_uncompiled(url):
+
+    """
+    The validation before the pattern was compiled at import time, the baseline the other paths are measured against:
+    the pattern is built on every call (and looked up in the cache of the re module), and '<' and '>' are searched with a second pattern.
+    """
+
+    if len(url) > INTERNET_MAX_PATH_LENGTH:
+        return False
+
+    regex = re.compile(
+        r'^https?://'
+        r'(?:www\.)?'
+        r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'
+        r'localhost|'
+        r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'
+        r'(?::\d+)?'
+        r'(?:/?|[/?]\S+)$', re.IGNORECASE)
+
+    return False if re.search(r'[<>]', url) else bool(re.match(regex, url))
+
+def make_urls(count):
+
+    """
+    Build a mix of URLs on HOSTS hosts: most are valid, some use uppercase hosts and default ports, some are internationalized, some are invalid.
+
+    Args:
+        count (int): The number of URLs.
+
+    Returns:
+        list: The URLs.
+    """
+
+    shapes = ["https://www.example{}.com/path/to/page?id={}", "HTTP://Example{}.ORG:80/a/b?q={}", "https://bücher{}.de/{}",
+              "https://sub.domain{}.co.uk:8443/{}", "ftp://invalid{}.com/{}", "https://example{}.com/<script>{}"]
+    return [shapes[i % len(shapes)].format(i % HOSTS, i) for i in range(count)]
+
+def bench(function, urls):
+
+    """
+    Validate a list of URLs, starting with an empty cache of internationalized host names.
+
+    Args:
+        function (function): Validates the whole list.
+        urls (list): The URLs.
+
+    Returns:
+        float: The number of URLs validated per second.
+    """
+
+    _idna_host.cache_clear()
+    start = time.perf_counter()
+    function(urls)
+    return len(urls) / (time.perf_counter() - start)
+
+def main():
+    counts = [int(count) for count in sys.argv[1:]] or DEFAULT_URLS
+    paths = [('uncompiled', lambda urls: [is_valid_url_uncompiled(url) for url in urls]),
+             ('is_valid_url', lambda urls: [is_valid_url(url) for url in urls]),
+             ('canonicalize_urls', canonicalize_urls)]
+    print(f"{'urls':>8} " + ' '.join(f"{name + ' (URLs/s)':>28}" for name, _ in paths))
+    for count in counts:
+        urls = make_urls(count)
+        print(f"{count:>8} " + ' '.join(f"{bench(function, urls):>28.0f}" for _, function in paths))
+
+if __name__ == '__main__':
+    main()
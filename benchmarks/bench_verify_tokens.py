@@ -0,0 +1,64 @@
+import sys
+import json
+import time
+import socket
+import logging
+import threading
+import http.client
+from werkzeug.serving import make_server
+from main_modules.auth import AuthService
+from helper_modules.auth_helpers import generate_jwt_token
+
+# Batch sizes to benchmark, can be overridden on the command line
+DEFAULT_BATCH_SIZES = [1, 10, 100, 1000]
+
+# Number of distinct tokens verified per batch size
+TOKENS = 10_000
+
+def bench_verify(port, tokens, batch_size):
+
+    """
+    Verify all tokens through `POST /tokens/verify` over HTTP, `batch_size` tokens per request.
+
+    Args:
+        port (int): The port of the auth service.
+        tokens (list): The tokens to verify.
+        batch_size (int): The number of tokens per request.
+
+    Returns:
+        float: The number of tokens verified per second.
+    """
+
+    start = time.perf_counter()
+    for offset in range(0, len(tokens), batch_size):
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        connection.request('POST', '/tokens/verify', json.dumps({'tokens': tokens[offset:offset + batch_size]}), {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        results = json.loads(response.read())['results']
+        assert response.status == 200 and all(result['status'] == 'valid' for result in results)
+        connection.close()
+    return len(tokens) / (time.perf_counter() - start)
+
+def main():
+    batch_sizes = [int(size) for size in sys.argv[1:]] or DEFAULT_BATCH_SIZES
+    auth_service = AuthService(None, revocations_file=None)
+    tokens = [generate_jwt_token(f'user_{i}', 'regular', auth_service.get_signing_context()) for i in range(TOKENS)]
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', port, auth_service.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    print(f"{TOKENS} distinct tokens, verified over HTTP on the threaded Werkzeug server")
+    print(f"{'batch size':>10} {'tokens/s':>9} {'cached tokens/s':>16}")
+    for batch_size in batch_sizes:
+        auth_service.token_cache.clear()
+        rate = bench_verify(port, tokens, batch_size)
+        cached_rate = bench_verify(port, tokens, batch_size)
+        print(f"{batch_size:>10} {rate:>9.0f} {cached_rate:>16.0f}")
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import sys
+import os
+import time
+import tempfile
+from helper_modules.storage_helpers import MemoryStorage
+from helper_modules.table_helpers import RecordTable
+from benchmarks.bench_create_url import CREATED_AT
+
+# Dataset sizes to benchmark, can be overridden on the command line
+DEFAULT_SIZES = [10_000, 100_000]
+
+# Number of writes measured per configuration
+WRITES = 200
+
+# Persistence and durability modes to benchmark
+CONFIGURATIONS = [('log', 'sync'), ('log', 'group'), ('log', 'async'), ('json', 'sync'), ('json', 'group'), ('json', 'async')]
+
+def bench_write(size, persistence_mode, durability):
+
+    """
+    Measure the latency of single writes to a memory store of the given size.
+
+    Args:
+        size (int): The number of entries already stored.
+        persistence_mode (str): The persistence mode of the store.
+        durability (str): The durability mode of the store.
+
+    Returns:
+        Tuple: The median and 99th percentile latency in milliseconds.
+    """
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = MemoryStorage(os.path.join(temp_dir, 'url_data.json'), persistence_mode, durability=durability)
+        table = RecordTable()
+        for i in range(size):
+            table.put(f'{i:08d}'.encode('ascii'), f"https://www.example.com/{i}".encode('utf-8'), CREATED_AT, ordered=False)
+        table.build_order()
+        store.table = table
+
+        latencies = []
+        for i in range(WRITES):
+            start = time.perf_counter()
+            store.put(f'w{i:07d}', {'url': f"https://www.example.org/{i}", 'created_at': CREATED_AT})
+            latencies.append((time.perf_counter() - start) * 1e3)
+        store.close()
+
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or DEFAULT_SIZES
+    print(f"{WRITES} sequential writes per configuration")
+    print(f"{'mode':>5} {'durability':>10} {'entries':>10} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for size in sizes:
+        for persistence_mode, durability in CONFIGURATIONS:
+            median, p99 = bench_write(size, persistence_mode, durability)
+            print(f"{persistence_mode:>5} {durability:>10} {size:>10} {median:>9.3f} {p99:>9.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,16 @@
 import re
 import hashlib
-import re
 import json
 import hmac
 import os
+import functools
+import time
 import base64
 import secrets
+import threading
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
 
 # Get the password secret from environment variable, or generate to hash password
@@ -14,6 +19,41 @@ PASSWORD_SECRET = os.environ.get("PASSWORD_SECRET", secrets.token_urlsafe(64))
 # Set expiration date JWT_token
 DAYS_EXPIRE = 1
 
+# HMAC keyed with the password secret once, copied for every password that is hashed
+_PASSWORD_MAC = hmac.new(PASSWORD_SECRET.encode('utf-8'), digestmod=hashlib.sha256)
+
+# Select how new passwords are hashed: 'hmac' (a single HMAC-SHA256 keyed with the password secret), or the key derivation functions
+# 'scrypt' or 'pbkdf2', which run in a pool of worker processes. Hashes of every kind are verified, and hashes of another kind or cost are
+# replaced on the next login
+PASSWORD_KDF = os.environ.get("PASSWORD_KDF", "hmac")
+
+# Names of the password hashing backends
+PASSWORD_KDFS = ('hmac', 'scrypt', 'pbkdf2')
+
+# Set the cost of the key derivation functions: CPU/memory cost, block size and parallelization of scrypt, and iterations of PBKDF2-HMAC-SHA256
+SCRYPT_N = int(os.environ.get("SCRYPT_N", 2 ** 14))
+SCRYPT_R = int(os.environ.get("SCRYPT_R", 8))
+SCRYPT_P = int(os.environ.get("SCRYPT_P", 1))
+PBKDF2_ITERATIONS = int(os.environ.get("PBKDF2_ITERATIONS", 600_000))
+
+# Set the number of processes that run the key derivation function, and the number of hashes that may be running or waiting for a process.
+# A request beyond that is rejected with 503 instead of queueing up
+HASH_WORKERS = int(os.environ.get("HASH_WORKERS", os.cpu_count() or 1))
+HASH_QUEUE_DEPTH = int(os.environ.get("HASH_QUEUE_DEPTH", 64))
+
+# Set the number of passwords hashed per task when many passwords are hashed at once, e.g. on a bulk import
+HASH_BATCH_SIZE = int(os.environ.get("HASH_BATCH_SIZE", 16))
+
+# Length in bytes of the random salt and of the derived key
+KDF_SALT_SIZE = 16
+KDF_KEY_SIZE = 32
+
+# Key ID of the key that verifies tokens without a 'kid' header, i.e. tokens issued before keys were rotated
+DEFAULT_KID = 'default'
+
+# Set the maximum number of verified tokens kept in the token cache
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", 10000))
+
 def generate_jwt_token(username, role, secret_key):
 
     """
@@ -23,21 +63,27 @@ def generate_jwt_token(username, role, secret_key):
     The `payload` dictionary includes a `datetime` object with an expiration time for the token that is one day in the future. 
     The `timezone` module is used to create a `timezone.utc` object that represents the (UTC) timezone, and the `timedelta` function is used to add one day to the current time to generate the expiration time for the token. 
     This ensures that the token expires after a certain amount of time, providing an additional layer of security to the authentication process.
+    The token also carries the time it was issued at ('iat') and a random token ID ('jti'), so it can be revoked before it expires.
 
     Args:
         username (str): The username of the user.
         role (str): The role of the user.
-        secret_key (str): The secret key used for JWT token encoding.
+        secret_key (str or SigningContext): The secret key used for JWT token encoding, or a signing context that signs with its active key.
 
     Returns:
         str: A JWT token.
 
     """
+    now = datetime.now(timezone.utc)
     payload = {
         'sub': username,
         'role': role,
-        'exp': int((datetime.now(timezone.utc) + timedelta(days=DAYS_EXPIRE)).timestamp()) # JWT_token expires X day from creation
+        'iat': now.timestamp(),
+        'jti': secrets.token_urlsafe(12),
+        'exp': int((now + timedelta(days=DAYS_EXPIRE)).timestamp()) # JWT_token expires X day from creation
     }
+    if isinstance(secret_key, SigningContext):
+        return secret_key.encode(payload)
     return jwt_encode({"alg": "HS256", "typ": "JWT"}, payload, secret_key) # return JWT_token
 
 def hash_password(password):
@@ -52,7 +98,308 @@ def hash_password(password):
         str: The hashed password in hexadecimal format.
     """
 
-    return hmac.new(PASSWORD_SECRET.encode('utf-8'), password.encode('utf-8'), hashlib.sha256).hexdigest()
+    mac = _PASSWORD_MAC.copy()
+    mac.update(password.encode('utf-8'))
+    return mac.hexdigest()
+
+def kdf_parameters(kdf):
+
+    """
+    Returns the configured cost parameters of a key derivation function.
+
+    Args:
+        kdf (str): 'scrypt' or 'pbkdf2'.
+
+    Returns:
+        tuple: (N, r, p) for scrypt, (iterations,) for PBKDF2.
+    """
+
+    return (SCRYPT_N, SCRYPT_R, SCRYPT_P) if kdf == 'scrypt' else (PBKDF2_ITERATIONS,)
+
+def _derive_key(password, kdf, params, salt):
+
+    """
+    Derives a key from a password.
+
+    Args:
+        password (str): The password.
+        kdf (str): 'scrypt' or 'pbkdf2'.
+        params (tuple): The cost parameters, see kdf_parameters.
+        salt (bytes): The salt.
+
+    Returns:
+        bytes: The derived key.
+    """
+
+    if kdf == 'scrypt':
+        n, r, p = params
+        return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p, maxmem=max(256 * n * r * p, 32 * 1024 * 1024), dklen=KDF_KEY_SIZE)
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, params[0], dklen=KDF_KEY_SIZE)
+
+def kdf_hash(password, kdf, params):
+
+    """
+    Hashes a password with a key derivation function and a random salt.
+    The hash names the function and its cost, so it can still be verified after the configured cost has changed.
+
+    Args:
+        password (str): The password to be hashed.
+        kdf (str): 'scrypt' or 'pbkdf2'.
+        params (tuple): The cost parameters, see kdf_parameters.
+
+    Returns:
+        str: `scrypt$<N>$<r>$<p>$<salt>$<key>` or `pbkdf2$<iterations>$<salt>$<key>`, with the salt and key in URL-safe Base64.
+    """
+
+    salt = os.urandom(KDF_SALT_SIZE)
+    key = _derive_key(password, kdf, params, salt)
+    return '$'.join([kdf, *map(str, params), base64url_encode(salt).decode('ascii'), base64url_encode(key).decode('ascii')])
+
+def kdf_hash_many(passwords, kdf, params):
+
+    """
+    Hashes several passwords with a key derivation function, in a single task of the worker pool.
+
+    Args:
+        passwords (list): The passwords to be hashed.
+        kdf (str): 'scrypt' or 'pbkdf2'.
+        params (tuple): The cost parameters, see kdf_parameters.
+
+    Returns:
+        list: The hashes, in the order of the passwords.
+    """
+
+    return [kdf_hash(password, kdf, params) for password in passwords]
+
+def parse_kdf_hash(password_hash):
+
+    """
+    Splits a hash created by kdf_hash into its parts.
+
+    Args:
+        password_hash (str): The stored hash.
+
+    Returns:
+        tuple or None: The function, the cost parameters, the salt and the key, or None if the hash was not created by kdf_hash,
+                       e.g. a hash created by hash_password.
+    """
+
+    kdf, *fields = password_hash.split('$')
+    if (kdf, len(fields)) not in (('scrypt', 5), ('pbkdf2', 3)):
+        return None
+    try:
+        return kdf, tuple(int(field) for field in fields[:-2]), base64url_decode(fields[-2].encode('ascii')), base64url_decode(fields[-1].encode('ascii'))
+    except ValueError:
+        return None
+
+def kdf_verify(password, password_hash):
+
+    """
+    Verifies a password against a hash created by kdf_hash, in constant time.
+
+    Args:
+        password (str): The password to verify.
+        password_hash (str): The stored hash.
+
+    Returns:
+        bool: True if the password matches the hash, False otherwise.
+    """
+
+    parts = parse_kdf_hash(password_hash)
+    if parts is None:
+        return False
+    kdf, params, salt, key = parts
+    return hmac.compare_digest(_derive_key(password, kdf, params, salt), key)
+
+class HasherOverloaded(Exception):
+
+    """
+    Raised when a password cannot be hashed because as many hashes as the queue allows are already running or waiting.
+    """
+
+class PasswordHasher:
+
+    """
+    Hashes and verifies passwords with the selected backend, without running a key derivation function on the request thread.
+    With 'scrypt' or 'pbkdf2' the function runs in a pool of worker processes, which is started on first use with the 'spawn' start method,
+    so it is never forked from a threaded server and a pre-fork master that hashes nothing starts none. The request thread only waits for the result,
+    so other requests keep being served meanwhile. At most `queue_depth` hashes may be running or waiting for a process; beyond that
+    HasherOverloaded is raised right away, so a burst of logins is rejected with 503 instead of piling up behind the pool.
+    Hashes created by hash_password ('hmac') are verified on the request thread, it costs a single HMAC.
+
+    Attributes:
+        kdf (str): 'hmac', 'scrypt' or 'pbkdf2', how new passwords are hashed.
+        params (tuple): The cost parameters of the key derivation function.
+        workers (int): The number of worker processes.
+        queue_depth (int): The maximum number of hashes running or waiting for a process.
+    """
+
+    def __init__(self, kdf=PASSWORD_KDF, workers=HASH_WORKERS, queue_depth=HASH_QUEUE_DEPTH, params=None):
+
+        """
+        Initializes a new password hasher. The worker processes are not started until a password is hashed with a key derivation function.
+
+        Args:
+            kdf (str, optional): 'hmac', 'scrypt' or 'pbkdf2'. Defaults to PASSWORD_KDF.
+            workers (int, optional): The number of worker processes. Defaults to HASH_WORKERS.
+            queue_depth (int, optional): The maximum number of hashes running or waiting for a process. Defaults to HASH_QUEUE_DEPTH.
+            params (tuple, optional): The cost parameters of the key derivation function. Defaults to the configured cost, see kdf_parameters.
+        """
+
+        if kdf not in PASSWORD_KDFS:
+            raise ValueError(f"Invalid password KDF: {kdf}. Use one of {', '.join(PASSWORD_KDFS)}.")
+
+        self.kdf = kdf
+        self.params = params if params is not None else kdf_parameters(kdf)
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self._slots = threading.BoundedSemaphore(queue_depth)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _run(self, function, *args):
+
+        """
+        Runs a function in the worker pool and waits for its result.
+
+        Args:
+            function (function): The function, a module-level function that can be pickled.
+            *args: The arguments of the function.
+
+        Returns:
+            object: The result of the function.
+
+        Raises:
+            HasherOverloaded: If the queue is full.
+        """
+
+        if not self._slots.acquire(blocking=False):
+            raise HasherOverloaded("Too many passwords are being hashed, try again later.")
+        try:
+            return self._pool().submit(function, *args).result()
+        finally:
+            self._slots.release()
+
+    def _pool(self):
+
+        """
+        Returns the worker pool, which is started on first use.
+
+        Returns:
+            ProcessPoolExecutor: The worker pool.
+        """
+
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def hash(self, password):
+
+        """
+        Hashes a password with the selected backend.
+
+        Args:
+            password (str): The password to be hashed.
+
+        Returns:
+            str: The hash to store.
+
+        Raises:
+            HasherOverloaded: If the queue is full.
+        """
+
+        if self.kdf == 'hmac':
+            return hash_password(password)
+        return self._run(kdf_hash, password, self.kdf, self.params)
+
+    def hash_many(self, passwords):
+
+        """
+        Hashes many passwords with the selected backend, e.g. for a bulk import, spread over all worker processes.
+        The passwords are hashed in tasks of HASH_BATCH_SIZE passwords, with at most one task per worker process running or queued at a time.
+        Every task takes a slot of the queue, waiting for one instead of raising HasherOverloaded, so an import waits for its turn
+        while the remaining slots stay available to logins.
+
+        Args:
+            passwords (list): The passwords to be hashed.
+
+        Returns:
+            list: The hashes, in the order of the passwords.
+        """
+
+        if self.kdf == 'hmac':
+            return [hash_password(password) for password in passwords]
+
+        hashes = []
+        pending = deque()
+        try:
+            for start in range(0, len(passwords), HASH_BATCH_SIZE):
+                # wait for a free slot only if no batch of ours is pending, otherwise collect our oldest batch, which frees a slot
+                while len(pending) >= self.workers or not self._slots.acquire(blocking=not pending):
+                    hashes += pending.popleft().result()
+                    self._slots.release()
+                try:
+                    pending.append(self._pool().submit(kdf_hash_many, passwords[start:start + HASH_BATCH_SIZE], self.kdf, self.params))
+                except BaseException:
+                    self._slots.release()
+                    raise
+            while pending:
+                hashes += pending.popleft().result()
+                self._slots.release()
+        finally:
+            for future in pending: # only left after an error
+                future.cancel()
+                self._slots.release()
+        return hashes
+
+    def verify(self, password, password_hash):
+
+        """
+        Verifies a password against a stored hash of any backend.
+
+        Args:
+            password (str): The password to verify.
+            password_hash (str): The stored hash.
+
+        Returns:
+            bool: True if the password matches the hash, False otherwise.
+
+        Raises:
+            HasherOverloaded: If the queue is full.
+        """
+
+        if parse_kdf_hash(password_hash) is None:
+            return hmac.compare_digest(password_hash, hash_password(password))
+        return self._run(kdf_verify, password, password_hash)
+
+    def needs_upgrade(self, password_hash):
+
+        """
+        Checks whether a stored hash was created by another backend or with another cost than new passwords are hashed with,
+        so it should be replaced once the password is known, i.e. after a successful login.
+
+        Args:
+            password_hash (str): The stored hash.
+
+        Returns:
+            bool: True if the hash should be replaced, False otherwise.
+        """
+
+        parts = parse_kdf_hash(password_hash)
+        if parts is None:
+            return self.kdf != 'hmac'
+        return parts[:2] != (self.kdf, self.params)
+
+    def close(self):
+
+        """
+        Stops the worker processes.
+        """
+
+        if self._executor is not None:
+            self._executor.shutdown()
 
 def is_password_strong(password):
 
@@ -116,6 +463,25 @@ def base64url_encode(self):
 
     return base64.urlsafe_b64encode(self).rstrip(b'=')
 
+@functools.lru_cache(maxsize=16)
+def _keyed_mac_template(secret):
+    return hmac.new(secret.encode('utf-8'), digestmod=hashlib.sha256)
+
+def keyed_mac(secret):
+
+    """
+    Returns a fresh HMAC-SHA256 object keyed with the given secret.
+    The key schedule is computed once per secret and copied for every message, which is cheaper than keying a new HMAC.
+
+    Args:
+        secret (str): The secret.
+
+    Returns:
+        hmac.HMAC: The keyed HMAC, without any message data.
+    """
+
+    return _keyed_mac_template(secret).copy()
+
 def jwt_encode(self, payload, secret, algorithm='HS256'):
 
     """
@@ -141,7 +507,9 @@ def jwt_encode(self, payload, secret, algorithm='HS256'):
     message = f'{encoded_header.decode("utf-8")}.{encoded_payload.decode("utf-8")}'
 
     # Create the signature using the secret and the HMAC-SHA256 algorithm
-    signature = hmac.new(secret.encode('utf-8'), message.encode('utf-8'), hashlib.sha256).digest()
+    mac = keyed_mac(secret)
+    mac.update(message.encode('utf-8'))
+    signature = mac.digest()
 
     # Encode the signature using URL-safe Base64 encoding
     encoded_signature = base64url_encode(signature)
@@ -194,10 +562,256 @@ def jwt_decode(token, secret):
     message = f'{header_str}.{payload_str}'
 
     # Compute the expected signature using the secret and HMAC-SHA256 algorithm
-    expected_signature = hmac.new(secret.encode('utf-8'), message.encode('utf-8'), hashlib.sha256).digest()
+    mac = keyed_mac(secret)
+    mac.update(message.encode('utf-8'))
+    expected_signature = mac.digest()
 
     # Compare the input signature with the expected signature
     if not hmac.compare_digest(signature, expected_signature):
         return None
     else:
         return payload
+
+class SigningContext:
+
+    """
+    Signs and verifies JWT tokens with a set of HMAC-SHA256 keys that are keyed once, so signing a token only copies a keyed HMAC
+    and reuses the encoded header of the signing key.
+    New tokens are signed with the active key and name it in their 'kid' header, tokens are verified with the key their 'kid' names,
+    so the active key can be replaced while tokens signed with the previous key remain valid until they expire.
+    Tokens without a 'kid' header are verified with the key DEFAULT_KID.
+
+    Attributes:
+        active_kid (str): The ID of the key new tokens are signed with.
+    """
+
+    def __init__(self, keys, active_kid=DEFAULT_KID):
+
+        """
+        Initializes a new signing context.
+
+        Args:
+            keys (dict): The secrets by key ID.
+            active_kid (str, optional): The ID of the key new tokens are signed with. Defaults to DEFAULT_KID.
+        """
+
+        if active_kid not in keys:
+            raise ValueError(f"Unknown active key: {active_kid}.")
+
+        self.active_kid = active_kid
+        self._macs = {kid: hmac.new(secret.encode('utf-8'), digestmod=hashlib.sha256) for kid, secret in keys.items()}
+        self._headers = {}
+        for kid in keys:
+            header = {"alg": "HS256", "typ": "JWT"} if kid == DEFAULT_KID else {"alg": "HS256", "typ": "JWT", "kid": kid}
+            self._headers[kid] = base64url_encode(json.dumps(header).encode('utf-8')).decode('utf-8')
+        self._kids_by_header = {header: kid for kid, header in self._headers.items()}
+
+    def _sign(self, kid, message):
+
+        """
+        Computes the signature of a message with the given key.
+
+        Args:
+            kid (str): The key ID.
+            message (str): The encoded header and payload, separated by a period.
+
+        Returns:
+            bytes: The signature.
+        """
+
+        mac = self._macs[kid].copy()
+        mac.update(message.encode('utf-8'))
+        return mac.digest()
+
+    def encode(self, payload):
+
+        """
+        Encodes and signs a payload with the active key.
+
+        Args:
+            payload (dict): The JWT payload.
+
+        Returns:
+            str: The encoded and signed JWT.
+        """
+
+        message = f'{self._headers[self.active_kid]}.{base64url_encode(json.dumps(payload).encode("utf-8")).decode("utf-8")}'
+        return f'{message}.{base64url_encode(self._sign(self.active_kid, message)).decode("utf-8")}'
+
+    def _kid_of(self, header_str):
+
+        """
+        Returns the key ID named by an encoded JWT header. Headers created by this context are looked up without decoding them.
+
+        Args:
+            header_str (str): The encoded header.
+
+        Returns:
+            str or None: The key ID, or None if the header is malformed, does not use HS256 or names an unknown key or a key ID that is not a string.
+        """
+
+        kid = self._kids_by_header.get(header_str)
+        if kid is not None:
+            return kid
+
+        header = json.loads(base64url_decode(header_str.encode('utf-8')).decode('utf-8'))
+        if not isinstance(header, dict) or header.get('alg') != 'HS256':
+            return None
+        kid = header.get('kid', DEFAULT_KID)
+        return kid if isinstance(kid, str) and kid in self._macs else None
+
+    def verify(self, token):
+
+        """
+        Verifies a JWT and decodes its payload, reporting why a token is rejected. The payload is only decoded once the signature has been verified.
+        The expiry of the token is not checked, see is_token_expired. No string token raises, whatever its content,
+        so a crafted token is rejected on its own instead of failing a whole batch.
+
+        Args:
+            token (str): The JWT to be verified.
+
+        Returns:
+            Tuple: The decoded payload, or None if the token is rejected, and the status: 'valid', 'malformed' (not a JWT, or a payload
+                   that is not a JSON object), 'unknown_key' (not signed with HS256 or with a key of this context) or 'invalid_signature'.
+        """
+
+        try:
+            header_str, payload_str, signature_str = token.split('.')
+            kid = self._kid_of(header_str)
+            if kid is None:
+                return None, 'unknown_key'
+
+            signature = base64url_decode(signature_str.encode('utf-8'))
+            if not hmac.compare_digest(signature, self._sign(kid, f'{header_str}.{payload_str}')):
+                return None, 'invalid_signature'
+
+            payload = json.loads(base64url_decode(payload_str.encode('utf-8')).decode('utf-8'))
+            return (payload, 'valid') if isinstance(payload, dict) else (None, 'malformed')
+        except (ValueError, RecursionError): # ValueError also covers binascii.Error, UnicodeDecodeError and JSONDecodeError, RecursionError a deeply nested header
+            return None, 'malformed'
+
+    def decode(self, token):
+
+        """
+        Verifies a JWT and decodes its payload. The payload is only decoded once the signature has been verified.
+
+        Args:
+            token (str): The JWT to be decoded.
+
+        Returns:
+            dict or None: The decoded payload if the JWT is well-formed and its signature is valid, None otherwise.
+        """
+
+        return self.verify(token)[0]
+
+def load_signing_context(keys_file):
+
+    """
+    Loads a signing context from a JSON key file of the form {"active_kid": "<kid>", "keys": {"<kid>": "<secret>", ...}}.
+
+    Args:
+        keys_file (str): The path of the key file.
+
+    Returns:
+        SigningContext: The signing context.
+    """
+
+    with open(keys_file, 'r') as file:
+        config = json.load(file)
+    return SigningContext(config['keys'], config['active_kid'])
+
+def is_token_expired(payload, now=None):
+
+    """
+    Checks whether the 'exp' claim of a decoded JWT payload has passed. A payload without 'exp' never expires.
+
+    Args:
+        payload (dict): The decoded JWT payload.
+        now (float, optional): The current time in epoch seconds. Defaults to the current time.
+
+    Returns:
+        bool: True if the token is expired, False otherwise.
+    """
+
+    exp = payload.get('exp')
+    return exp is not None and exp <= (time.time() if now is None else now)
+
+class TokenCache:
+
+    """
+    A bounded, thread-safe cache of verified JWT payloads, so a client that sends the same bearer token many times
+    only pays for decoding and verifying it once.
+    Entries are keyed by the SHA-256 hash of the token, so the cache never holds usable credentials.
+    An entry is dropped once the token expires, and the least recently used entry is evicted when the cache is full.
+
+    Attributes:
+        max_size (int): The maximum number of cached tokens.
+    """
+
+    def __init__(self, max_size=TOKEN_CACHE_SIZE):
+
+        """
+        Initializes a new, empty token cache.
+
+        Args:
+            max_size (int, optional): The maximum number of cached tokens. Defaults to TOKEN_CACHE_SIZE.
+        """
+
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+
+        """
+        Returns the verified payload of a token.
+
+        Args:
+            token (str): The JWT token.
+
+        Returns:
+            dict or None: The cached payload, or None if the token is not cached or has expired.
+        """
+
+        key = hashlib.sha256(token.encode('utf-8')).digest()
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                return None
+            if is_token_expired(payload):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def put(self, token, payload):
+
+        """
+        Caches the verified payload of a token. Expired tokens are not cached.
+
+        Args:
+            token (str): The JWT token, whose signature has been verified.
+            payload (dict): The decoded payload.
+        """
+
+        if self.max_size <= 0 or is_token_expired(payload):
+            return
+
+        key = hashlib.sha256(token.encode('utf-8')).digest()
+        with self._lock:
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+
+        """
+        Removes all cached tokens.
+        """
+
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
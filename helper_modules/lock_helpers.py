@@ -0,0 +1,92 @@
+import threading
+from contextlib import contextmanager
+
+class ReadWriteLock:
+
+    """
+    A lock that is shared by any number of readers or held by a single writer.
+    Waiting writers take precedence over new readers, so a steady stream of reads cannot starve a write.
+    The lock is not reentrant: a thread must not acquire it again while holding it.
+    """
+
+    def __init__(self):
+
+        """
+        Initializes a new, unlocked lock.
+        """
+
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    def acquire_read(self):
+
+        """
+        Acquires the lock for reading, waiting while a writer holds it or waits for it.
+        """
+
+        with self._condition:
+            while self._writer or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+
+    def release_read(self):
+
+        """
+        Releases the lock for reading.
+        """
+
+        with self._condition:
+            self._readers -= 1
+            if self._readers == 0:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+
+        """
+        Acquires the lock for writing, waiting until no reader or writer holds it.
+        """
+
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+
+    def release_write(self):
+
+        """
+        Releases the lock for writing.
+        """
+
+        with self._condition:
+            self._writer = False
+            self._condition.notify_all()
+
+    @contextmanager
+    def read_locked(self):
+
+        """
+        A context manager that holds the lock for reading.
+        """
+
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_locked(self):
+
+        """
+        A context manager that holds the lock for writing.
+        """
+
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
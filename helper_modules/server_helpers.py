@@ -0,0 +1,80 @@
+import gc
+import os
+from gunicorn.app.base import BaseApplication
+
+# Set the number of worker processes of the pre-fork server, one per CPU core by default
+WORKERS = int(os.environ.get("WORKERS", os.cpu_count() or 1))
+
+# Set the number of requests after which a worker is gracefully replaced by a fresh fork of the master
+# The jitter spreads the restarts, so the workers are not all recycled at the same time
+MAX_REQUESTS = int(os.environ.get("MAX_REQUESTS", 10000))
+MAX_REQUESTS_JITTER = int(os.environ.get("MAX_REQUESTS_JITTER", 1000))
+
+# Set the time in seconds a worker gets to finish its requests after it was asked to stop, before it is killed
+GRACEFUL_TIMEOUT = int(os.environ.get("GRACEFUL_TIMEOUT", 30))
+
+class PreforkServer(BaseApplication):
+
+    """
+    A production server that serves a WSGI application from several forked worker processes (gunicorn).
+    The application and its data are loaded once in the master process before it forks, and the objects that exist at that point
+    are moved to the permanent generation of the garbage collector with gc.freeze(). The collector then never touches them in a worker,
+    so the pages that hold them stay shared copy-on-write between the master and all workers instead of being copied into every worker.
+
+    Attributes:
+        app (function): The WSGI application.
+        options (dict): The gunicorn settings.
+    """
+
+    def __init__(self, app, port, workers=WORKERS, max_requests=MAX_REQUESTS, max_requests_jitter=MAX_REQUESTS_JITTER,
+                 graceful_timeout=GRACEFUL_TIMEOUT, before_fork=None, after_fork=None, on_exit=None):
+
+        """
+        Initializes the server. The application has to be loaded already.
+
+        Args:
+            app (function): The WSGI application.
+            port (int): The port to listen on, on all addresses.
+            workers (int, optional): The number of worker processes. Defaults to WORKERS.
+            max_requests (int, optional): The number of requests after which a worker is recycled, 0 to never recycle. Defaults to MAX_REQUESTS.
+            max_requests_jitter (int, optional): The maximum random number of requests added to max_requests. Defaults to MAX_REQUESTS_JITTER.
+            graceful_timeout (int, optional): The time in seconds a stopping worker gets to finish its requests. Defaults to GRACEFUL_TIMEOUT.
+            before_fork (function, optional): Called in the master process before it forks a worker. Defaults to None.
+            after_fork (function, optional): Called in every new worker process, before it serves requests. Defaults to None.
+            on_exit (function, optional): Called in every worker process when it stops, and in the master process when the server stops. Defaults to None.
+        """
+
+        self.app = app
+        self.options = {
+            'bind': f'0.0.0.0:{port}',
+            'workers': workers,
+            'preload_app': True,
+            'max_requests': max_requests,
+            'max_requests_jitter': max_requests_jitter,
+            'graceful_timeout': graceful_timeout,
+        }
+        if before_fork is not None:
+            self.options['pre_fork'] = lambda server, worker: before_fork()
+        if after_fork is not None:
+            self.options['post_fork'] = lambda server, worker: after_fork()
+        if on_exit is not None:
+            self.options['worker_exit'] = lambda server, worker: on_exit()
+            self.options['on_exit'] = lambda server: on_exit()
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.app
+
+    def run(self):
+
+        """
+        Freezes the loaded objects and runs the server until it is stopped, e.g. with SIGTERM or Ctrl+C.
+        """
+
+        gc.collect()
+        gc.freeze()
+        super().run()
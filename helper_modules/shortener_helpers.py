@@ -1,7 +1,15 @@
 import re
+import os
+import json
+import base64
+import binascii
+import fcntl
+import functools
 import string
 import random
-import re
+import threading
+from datetime import datetime
+from werkzeug.urls import iri_to_uri
 
 # Set the max URL length
 INTERNET_MAX_PATH_LENGTH = 2048
@@ -12,6 +20,95 @@ URI_LENGTH = 8
 # Set the range of max_attempts to create a unique ID
 MAX_ATTEMPTS = 100
 
+# Set the format in which timestamps of creation are shown to clients
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Set the alphabet of the base62 IDs handed out by the block allocator
+BASE62_ALPHABET = string.digits + string.ascii_letters
+
+# Set the number of IDs reserved at once by the block allocator
+ID_BLOCK_SIZE = 1000
+
+# Set the multiplier that spreads consecutive counter values over the ID space
+# It is coprime with 62 ** URI_LENGTH, so the mapping from counter to ID is a bijection and never collides
+ID_SCRAMBLE_MULTIPLIER = 0x5DEECE66D
+
+# Set the pattern of a valid URL, compiled once at import time. The groups are the scheme, the host, the port and the rest of the URL
+URL_PATTERN = re.compile(
+    r'^(https?)://'  # http:// or https://
+    r'((?:www\.)?'  # www.
+    r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+(?:[A-Z]{2,6}|XN--[A-Z0-9-]{1,59})\.?|'  # domain, with a punycode top-level domain of an IDN
+    r'localhost|'  # localhost
+    r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}))'  # ...or IP
+    r'(?::(\d+))?'  # optional port (number that follows the domain name or IP address and)
+    r'((?:/?|[/?]\S+))$', re.IGNORECASE) # optional path after domain name
+
+# Set the pattern that splits a URL whose host is not ASCII into the part before the host, the host and the rest of the URL
+URL_HOST_PATTERN = re.compile(r'^([A-Za-z]+://)([^/?#:]+)(.*)$', re.DOTALL)
+
+# Set the port of each scheme that is dropped from the canonical form of a URL
+DEFAULT_PORTS = {'http': '80', 'https': '443'}
+
+# Set the number of internationalized host names whose punycode form is cached, the IDNA codec takes tens of microseconds per host
+IDNA_CACHE_SIZE = int(os.environ.get("IDNA_CACHE_SIZE", 4096))
+
+# Set the number of original URLs whose redirect headers are cached, so a hit on a popular short URL does not encode its Location again
+REDIRECT_CACHE_SIZE = int(os.environ.get("REDIRECT_CACHE_SIZE", 65536))
+
+@functools.lru_cache(maxsize=REDIRECT_CACHE_SIZE)
+def redirect_headers(url):
+
+    """
+    Build the headers of a redirect to the given URL once, with the URL encoded as an ASCII URI for the Location header.
+    The headers are cached by the URL itself rather than by the ID, so an update or a delete, also by another process,
+    never serves stale headers: the new URL is looked up instead, and the headers of the old one age out of the cache.
+    Args:
+        url (str): The original URL.
+    Returns:
+        tuple: The WSGI headers as (name, value) strings, and the ASGI headers as (name, value) byte strings without the content length.
+               They are shared by all redirects to the URL and must not be modified.
+    """
+
+    location = iri_to_uri(url, safe_conversion=True)
+    return [('Location', location), ('Content-Length', '0')], [(b'location', location.encode('latin-1'))]
+
+@functools.lru_cache(maxsize=IDNA_CACHE_SIZE)
+def _idna_host(host):
+
+    """
+    Convert an internationalized host name to punycode.
+    Args:
+        host (str): The host name.
+    Returns:
+        str or None: The ASCII host name, or None if the host name is not valid in IDNA.
+    """
+
+    try:
+        return host.encode('idna').decode('ascii')
+    except UnicodeError:
+        return None
+
+def _match_url(url):
+
+    """
+    Match a URL against URL_PATTERN, after converting an internationalized host name to punycode.
+    Args:
+        url (str): The URL.
+    Returns:
+        re.Match or None: The match, or None if the URL is too long, contains '<' or '>', or is not valid.
+    """
+
+    if len(url) > INTERNET_MAX_PATH_LENGTH or '<' in url or '>' in url:
+        return None
+    if not url.isascii():
+        parts = URL_HOST_PATTERN.match(url)
+        if parts is not None and not parts.group(2).isascii():
+            host = _idna_host(parts.group(2))
+            if host is None:
+                return None
+            url = parts.group(1) + host + parts.group(3)
+    return URL_PATTERN.match(url)
+
 def is_valid_url(url):
 
     """
@@ -22,21 +119,44 @@ def is_valid_url(url):
         bool: True if the URL is valid, False otherwise.
     """
 
-    # Check for URL length
-    if len(url) > INTERNET_MAX_PATH_LENGTH:
-        return False
+    return _match_url(url) is not None
 
-    regex = re.compile(
-        r'^https?://'  # http:// or https://
-        r'(?:www\.)?'  # www.
-        r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'  # domain
-        r'localhost|'  # localhost
-        r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'  # ...or IP
-        r'(?::\d+)?'  # optional port (number that follows the domain name or IP address and)
-        r'(?:/?|[/?]\S+)$', re.IGNORECASE) # optional path after domain name
+def canonicalize_url(url):
 
-    # Check for special characters not allowed in URLs
-    return False if re.search(r'[<>]', url) else bool(re.match(regex, url))
+    """
+    Validate a URL and return its canonical form, so equivalent URLs are stored and found as the same string:
+    the scheme and the host are lowercased, an internationalized host name is converted to punycode,
+    the trailing dot of a fully qualified host name and the default port of the scheme are dropped. The rest of the URL is kept as it is.
+    Args:
+        url (str): The URL.
+    Returns:
+        str or None: The canonical URL, or None if the URL is not valid.
+    """
+
+    match = _match_url(url)
+    if match is None:
+        return None
+    scheme, host, port, rest = match.groups()
+    scheme = scheme.lower()
+    host = host.lower().rstrip('.')
+    if port is not None:
+        port = str(int(port))
+        if port != DEFAULT_PORTS[scheme]:
+            host = f'{host}:{port}'
+    return f'{scheme}://{host}{rest}'
+
+def canonicalize_urls(urls):
+
+    """
+    Validate a list of URLs and return their canonical forms, see canonicalize_url.
+    Items that are not strings are invalid.
+    Args:
+        urls (list): The URLs.
+    Returns:
+        list: The canonical URL per item, in the order of the items, or None for an invalid item.
+    """
+
+    return [canonicalize_url(url) if isinstance(url, str) else None for url in urls]
 
 def generate_unique_id(url_data, max_attempts=MAX_ATTEMPTS):
 
@@ -57,3 +177,206 @@ def generate_unique_id(url_data, max_attempts=MAX_ATTEMPTS):
             return unique_id
         attempts += 1
     raise ValueError("Exceeded maximum number of attempts to generate a unique ID.")
+
+def base62_encode(number, length=URI_LENGTH):
+
+    """
+    Encode a non-negative integer as a fixed-length base62 string.
+    Args:
+        number (int): The number to encode, smaller than 62 ** length.
+        length (int): The length of the encoded string.
+    Returns:
+        str: The base62 representation, left-padded with '0'.
+    """
+
+    chars = []
+    for _ in range(length):
+        number, remainder = divmod(number, 62)
+        chars.append(BASE62_ALPHABET[remainder])
+    if number:
+        raise ValueError(f"Number does not fit in {length} base62 characters.")
+    return ''.join(reversed(chars))
+
+class BlockIdAllocator:
+
+    """
+    Hand out unique IDs from blocks of counter values that are reserved in a shared lease file.
+    Every process (e.g. every replica on the shared volume) reserves its own block under an exclusive file lock,
+    so blocks never overlap and IDs can be handed out in O(1) instead of drawing random IDs until a free one is found.
+    The counter values are spread over the ID space with a bijective scramble, so consecutive IDs do not look alike.
+
+    Attributes:
+        lease_file (str): The path of the file holding the next free block.
+        block_size (int): The number of counter values reserved per block.
+    """
+
+    def __init__(self, lease_file, block_size=ID_BLOCK_SIZE):
+
+        """
+        Initialize the allocator. The first block is reserved on the first allocation.
+        Args:
+            lease_file (str): The path of the file holding the next free block.
+            block_size (int): The number of counter values reserved per block.
+        """
+
+        self.lease_file = lease_file
+        self.block_size = block_size
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def _reserve_block(self, blocks=1):
+
+        """
+        Reserve the next free block(s) in the lease file and persist the new lease before it is used.
+        Args:
+            blocks (int): The number of consecutive blocks to reserve.
+        Returns:
+            int: The first counter value of the reserved block.
+        """
+
+        os.makedirs(os.path.dirname(self.lease_file) or '.', exist_ok=True)
+        with open(self.lease_file, 'a+') as file:
+            fcntl.lockf(file, fcntl.LOCK_EX)
+            try:
+                file.seek(0)
+                content = file.read()
+                block = json.loads(content)['next_block'] if content else 0
+                file.seek(0)
+                file.truncate()
+                json.dump({'next_block': block + blocks}, file)
+                file.flush()
+                os.fsync(file.fileno())
+            finally:
+                fcntl.lockf(file, fcntl.LOCK_UN)
+        return block * self.block_size
+
+    def allocate(self, url_data=()):
+
+        """
+        Hand out the next unique ID.
+        IDs that are already taken in url_data (e.g. random IDs created before the allocator was used) are skipped.
+        Args:
+            url_data (container): The stored IDs.
+        Returns:
+            str: A URI_LENGTH-character unique identifier.
+        """
+
+        while True:
+            with self._lock:
+                if self._next >= self._end:
+                    self._next = self._reserve_block()
+                    self._end = self._next + self.block_size
+                counter = self._next
+                self._next += 1
+            unique_id = self._encode(counter)
+            if unique_id not in url_data:
+                return unique_id
+
+    def reset(self):
+
+        """
+        Drop the rest of the current block, e.g. in a forked process, so it does not hand out the same IDs as its parent.
+        The next allocation reserves a new block.
+        """
+
+        with self._lock:
+            self._next = self._end = 0
+
+    def allocate_many(self, count, url_data=()):
+
+        """
+        Hand out several unique IDs in one pass. The lease file is updated at most once, for all blocks that are needed.
+        Args:
+            count (int): The number of IDs.
+            url_data (container): The stored IDs.
+        Returns:
+            list: `count` unique identifiers.
+        """
+
+        with self._lock:
+            available = self._end - self._next
+            counters = list(range(self._next, self._next + min(count, available)))
+            missing = count - len(counters)
+            if missing > 0:
+                blocks = -(-missing // self.block_size)
+                start = self._reserve_block(blocks)
+                counters.extend(range(start, start + missing))
+                self._next, self._end = start + missing, start + blocks * self.block_size
+            else:
+                self._next += count
+
+        unique_ids = [self._encode(counter) for counter in counters]
+        return [unique_id if unique_id not in url_data else self.allocate(url_data) for unique_id in unique_ids]
+
+    def _encode(self, counter):
+
+        """
+        Map a counter value to its unique identifier.
+        Args:
+            counter (int): The counter value.
+        Returns:
+            str: The base62-encoded, scrambled identifier.
+        """
+
+        return base62_encode(counter * ID_SCRAMBLE_MULTIPLIER % 62 ** URI_LENGTH)
+
+def encode_cursor(created_at, id):
+
+    """
+    Encode the sort key of the last item of a page as an opaque pagination cursor.
+    Args:
+        created_at (int): The timestamp of creation of the last item, in epoch seconds.
+        id (str): The unique identifier of the last item.
+    Returns:
+        str: The URL-safe cursor.
+    """
+
+    return base64.urlsafe_b64encode(json.dumps([created_at, id], separators=(',', ':')).encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+
+    """
+    Decode a pagination cursor created by encode_cursor.
+    Args:
+        cursor (str): The cursor.
+    Returns:
+        tuple: The (created_at, id) sort key.
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Malformed cursor.")
+    if not isinstance(key, list) or len(key) != 2 or type(key[0]) is not int or not isinstance(key[1], str):
+        raise ValueError("Malformed cursor.")
+    return tuple(key)
+
+def to_epoch(timestamp):
+
+    """
+    Convert a timestamp of creation to epoch seconds.
+    Timestamps are stored as epoch seconds, older data files contain them formatted as TIMESTAMP_FORMAT in local time.
+    Args:
+        timestamp (int or str): The timestamp in epoch seconds or formatted as TIMESTAMP_FORMAT.
+    Returns:
+        int: The timestamp in epoch seconds.
+    """
+
+    if isinstance(timestamp, str):
+        return int(datetime.strptime(timestamp, TIMESTAMP_FORMAT).timestamp())
+    return int(timestamp)
+
+def format_timestamp(epoch):
+
+    """
+    Format a timestamp of creation for a response.
+    Args:
+        epoch (int): The timestamp in epoch seconds.
+    Returns:
+        str: The timestamp formatted as TIMESTAMP_FORMAT in local time.
+    """
+
+    return datetime.fromtimestamp(epoch).strftime(TIMESTAMP_FORMAT)
@@ -0,0 +1,240 @@
+import os
+import sys
+import struct
+import logging
+from array import array
+from helper_modules.shortener_helpers import to_epoch
+from helper_modules.table_helpers import RecordTable, ID_WIDTH, pack_id
+from helper_modules.wal_helpers import load_snapshot, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Names of the available snapshot formats
+SNAPSHOT_FORMATS = ('json', 'binary')
+
+# First bytes of a binary snapshot, a JSON snapshot always starts with '{'
+BINARY_SNAPSHOT_MAGIC = b'URLSNAP1'
+
+# Header of a binary snapshot: magic, number of rows, length of the URL blob, capacity of the ID index,
+# capacity of the URL index and number of distinct URLs
+BINARY_SNAPSHOT_HEADER = struct.Struct('<8sQQQQQ')
+
+def is_binary_snapshot(path):
+
+    """
+    Checks whether a snapshot file is in the binary format by reading its header.
+
+    Args:
+        path (str): The path of the snapshot file.
+
+    Returns:
+        bool: True if the file exists and starts with BINARY_SNAPSHOT_MAGIC.
+    """
+
+    if not os.path.exists(path):
+        return False
+
+    with open(path, 'rb') as file:
+        return file.read(len(BINARY_SNAPSHOT_MAGIC)) == BINARY_SNAPSHOT_MAGIC
+
+def _write_array(file, values):
+
+    """
+    Writes an array in little-endian byte order.
+
+    Args:
+        file (file): The file opened for binary writing.
+        values (array): The array.
+    """
+
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    values.tofile(file)
+
+def _read_array(file, typecode, count):
+
+    """
+    Reads an array that was written by _write_array.
+
+    Args:
+        file (file): The file opened for binary reading.
+        typecode (str): The typecode of the array.
+        count (int): The number of items.
+
+    Returns:
+        array: The array.
+    """
+
+    values = array(typecode)
+    values.fromfile(file, count)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+def write_binary_snapshot(path, table, order):
+
+    """
+    Atomically writes the live rows of a table to a binary snapshot.
+    The file holds the columns of a vacuumed copy of the table, including the slot arrays of its hash indexes,
+    so loading it reads every column straight into an array instead of parsing and indexing record by record.
+
+    Args:
+        path (str): The path of the snapshot file.
+        table (RecordTable): The table.
+        order (array): The live rows of the table, in sorted order.
+    """
+
+    snapshot = table.vacuumed(order)
+    id_index, url_index = snapshot.id_index, snapshot.url_index
+
+    temp_path = f'{path}.{os.urandom(4).hex()}.tmp' # unique, as processes sharing the data file may write snapshots concurrently
+    with open(temp_path, 'wb') as file:
+        file.write(BINARY_SNAPSHOT_HEADER.pack(BINARY_SNAPSHOT_MAGIC, len(snapshot.created), len(snapshot.blob), len(id_index.slots), len(url_index.slots), url_index.size))
+        file.write(snapshot.ids)
+        for values in (snapshot.created, snapshot.offsets, snapshot.lengths):
+            _write_array(file, values)
+        file.write(snapshot.blob)
+        _write_array(file, id_index.slots)
+        _write_array(file, url_index.slots)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+def load_binary_snapshot(path):
+
+    """
+    Loads a binary snapshot written by write_binary_snapshot.
+
+    Args:
+        path (str): The path of the snapshot file.
+
+    Returns:
+        RecordTable: The table, with its rows in sorted order.
+
+    Raises:
+        ValueError: If the file is not a binary snapshot or is truncated.
+    """
+
+    with open(path, 'rb') as file:
+        magic, count, blob_length, id_capacity, url_capacity, url_count = BINARY_SNAPSHOT_HEADER.unpack(file.read(BINARY_SNAPSHOT_HEADER.size))
+        if magic != BINARY_SNAPSHOT_MAGIC:
+            raise ValueError(f"Not a binary snapshot: {path}.")
+
+        expected_size = BINARY_SNAPSHOT_HEADER.size + count * (ID_WIDTH + 8 + 8 + 4) + blob_length + (id_capacity + url_capacity) * 8
+        if os.fstat(file.fileno()).st_size != expected_size:
+            raise ValueError(f"Truncated binary snapshot: {path}.")
+
+        table = RecordTable()
+        table.ids = bytearray(file.read(count * ID_WIDTH))
+        table.created = _read_array(file, 'q', count)
+        table.offsets = _read_array(file, 'Q', count)
+        table.lengths = _read_array(file, 'I', count)
+        table.blob = bytearray(file.read(blob_length))
+        table.id_index.restore(_read_array(file, 'q', id_capacity), count)
+        table.url_index.restore(_read_array(file, 'q', url_capacity), url_count)
+        table.live = bytearray(b'\x01') * count
+        table.order = array('q', range(count))
+
+    return table
+
+def table_from_items(items):
+
+    """
+    Builds a table from the records of a JSON snapshot.
+    Records whose ID does not fit the table, e.g. IDs of another length written by an older version, are skipped with a warning,
+    so they do not keep the service from starting.
+
+    Args:
+        items (iterator): (id, record) tuples.
+
+    Returns:
+        RecordTable: The table, with its sorted order built.
+    """
+
+    table = RecordTable()
+    skipped = []
+    for id, value in items:
+        packed_id = pack_id(id)
+        if packed_id is None:
+            skipped.append(id)
+            continue
+        table.put(packed_id, value['url'].encode('utf-8'), to_epoch(value['created_at']), ordered=False)
+    table.build_order()
+    if skipped:
+        logger.warning("Skipped %d records whose IDs are not %d ASCII characters, e.g. %r. They are not served by the memory backend "
+                       "and are dropped from its next snapshot; the sqlite backend keeps them.", len(skipped), ID_WIDTH, skipped[0])
+    return table
+
+def table_items(table, order):
+
+    """
+    Generates the records of a table as they are written to a JSON snapshot.
+
+    Args:
+        table (RecordTable): The table.
+        order (array): The rows to generate.
+
+    Returns:
+        Iterator: (id, record) tuples.
+    """
+
+    for row in order:
+        yield table.row_id(row).decode('ascii'), {'url': table.row_url(row).decode('utf-8'), 'created_at': table.created[row]}
+
+def load_table(path):
+
+    """
+    Loads a snapshot in either format, chosen by the header of the file.
+
+    Args:
+        path (str): The path of the snapshot file.
+
+    Returns:
+        RecordTable: The table, or an empty table if no snapshot exists.
+    """
+
+    if is_binary_snapshot(path):
+        return load_binary_snapshot(path)
+    return table_from_items(load_snapshot(path).items())
+
+def load_snapshot_data(path):
+
+    """
+    Loads a snapshot in either format as a dictionary, e.g. to import it into another store.
+
+    Args:
+        path (str): The path of the snapshot file.
+
+    Returns:
+        dict: The records by ID, or an empty dictionary if no snapshot exists.
+    """
+
+    if is_binary_snapshot(path):
+        table = load_binary_snapshot(path)
+        return dict(table_items(table, table.order))
+    return load_snapshot(path)
+
+def convert_snapshot(path, output_path=None):
+
+    """
+    Converts a snapshot to the other format: a JSON snapshot to the binary format and a binary snapshot back to JSON.
+    The converted snapshot is written atomically, so a snapshot can be converted in place while the service is stopped.
+
+    Args:
+        path (str): The path of the snapshot file.
+        output_path (str, optional): The path of the converted snapshot. Defaults to `path`.
+
+    Returns:
+        str: The format of the converted snapshot.
+    """
+
+    output_path = path if output_path is None else output_path
+    if is_binary_snapshot(path):
+        table = load_binary_snapshot(path)
+        write_snapshot(output_path, table_items(table, table.order))
+        return 'json'
+
+    table = table_from_items(load_snapshot(path).items())
+    write_binary_snapshot(output_path, table, table.order)
+    return 'binary'
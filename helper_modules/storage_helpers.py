@@ -0,0 +1,1155 @@
+import os
+import time
+import logging
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from array import array
+from collections import Counter
+from contextlib import contextmanager, suppress
+from helper_modules.shortener_helpers import to_epoch
+from helper_modules.lock_helpers import ReadWriteLock
+from helper_modules.snapshot_helpers import SNAPSHOT_FORMATS, is_binary_snapshot, load_snapshot_data, load_table, table_items, write_binary_snapshot
+from helper_modules.table_helpers import ID_WIDTH, pack_id
+from helper_modules.wal_helpers import BackgroundWriter, LogFollower, WriteAheadLog, ASYNC_FLUSH_INTERVAL, GROUP_COMMIT_WINDOW, LOG_COMPACT_THRESHOLD, LOG_FOLLOW_INTERVAL, ROTATED_SUFFIX, apply_record, read_generation, read_log, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Names of the available storage backends
+STORAGE_BACKENDS = ('memory', 'sqlite')
+
+# Names of the available persistence modes of the memory backend
+PERSISTENCE_MODES = ('log', 'json')
+
+# Number of records fetched per page when iterating over a whole store
+ITER_PAGE_SIZE = 1000
+
+class Storage(ABC):
+
+    """
+    The interface of a url_data store. Records are dictionaries with a 'url' and a 'created_at' key, stored under their unique ID.
+    The timestamp of creation is kept in epoch seconds, it is only formatted when a response is serialized.
+    A backend must implement every abstract method, otherwise it cannot be instantiated.
+    """
+
+    @abstractmethod
+    def get(self, id):
+
+        """
+        Returns the record stored under the given ID.
+
+        Args:
+            id (str): The unique identifier of the shortened URL.
+
+        Returns:
+            dict or None: The record, or None if the ID is not stored.
+        """
+
+        raise NotImplementedError
+
+    @abstractmethod
+    def put(self, id, value):
+
+        """
+        Stores a record under the given ID, replacing an existing record.
+
+        Args:
+            id (str): The unique identifier of the shortened URL.
+            value (dict): The record with the original URL and its timestamp.
+        """
+
+        raise NotImplementedError
+
+    @abstractmethod
+    def put_many(self, items):
+
+        """
+        Stores several records at once. The records are committed atomically with a single persistence write.
+
+        Args:
+            items (list): (id, record) tuples.
+        """
+
+        raise NotImplementedError
+
+    @abstractmethod
+    def put_new(self, id, value):
+
+        """
+        Stores a record unless its original URL is already stored. The check and the write are atomic,
+        so concurrent requests for the same URL never create two records.
+
+        Args:
+            id (str): The unique identifier of the shortened URL.
+            value (dict): The record with the original URL and its timestamp.
+
+        Returns:
+            str or None: The ID under which the URL was already stored, or None if the record was stored.
+        """
+
+        raise NotImplementedError
+
+    @abstractmethod
+    def put_many_new(self, items):
+
+        """
+        Stores several records at once, except those whose original URL is already stored, also by an earlier record of the batch.
+        The checks and the writes are atomic, like put_new, and the stored records are committed with a single persistence write.
+
+        Args:
+            items (list): (id, record) tuples.
+
+        Returns:
+            list: Per record, the ID under which its URL was already stored, or None if the record was stored.
+        """
+
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, id):
+
+        """
+        Removes the record stored under the given ID.
+
+        Args:
+            id (str): The unique identifier of the shortened URL.
+
+        Returns:
+            bool: True if a record was removed, False if the ID was not stored.
+        """
+
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_many(self, updates):
+
+        """
+        Replaces the original URL of several stored records, keeping their timestamps of creation.
+        All changes are applied atomically with a single persistence write.
+
+        Args:
+            updates (list): (id, url) tuples.
+
+        Returns:
+            list: A boolean per update, False if the ID was not stored.
+        """
+
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_many(self, ids):
+
+        """
+        Removes several records. All removals are applied atomically with a single persistence write.
+
+        Args:
+            ids (list): The unique identifiers to remove.
+
+        Returns:
+            list: A boolean per ID, False if the ID was not stored.
+        """
+
+        raise NotImplementedError
+
+    @abstractmethod
+    def find_by_url(self, url):
+
+        """
+        Returns the ID under which the given original URL is stored.
+
+        Args:
+            url (str): The original URL.
+
+        Returns:
+            str or None: The unique identifier, or None if the URL is not stored.
+        """
+
+        raise NotImplementedError
+
+    @abstractmethod
+    def page_by_created_at(self, limit, after=None, reverse=True):
+
+        """
+        Returns one page of records ordered by their timestamp of creation, ties are ordered by ID.
+        Pages are addressed by the sort key of the last record of the previous page (keyset pagination),
+        so records that are inserted or deleted in the meantime never shift a page.
+
+        Args:
+            limit (int): The maximum number of records on the page.
+            after (tuple, optional): The (created_at, id) sort key after which the page starts. Defaults to None, the first page.
+            reverse (bool, optional): Whether the newest records come first. Defaults to True.
+
+        Returns:
+            List: (id, record) tuples.
+        """
+
+        raise NotImplementedError
+
+    def iter_by_created_at(self, reverse=True):
+
+        """
+        Iterates over all records ordered by their timestamp of creation, fetching them page by page.
+
+        Args:
+            reverse (bool, optional): Whether the newest records come first. Defaults to True.
+
+        Returns:
+            Iterator: (id, record) tuples.
+        """
+
+        after = None
+        while True:
+            page = self.page_by_created_at(ITER_PAGE_SIZE, after, reverse)
+            yield from page
+            if len(page) < ITER_PAGE_SIZE:
+                return
+            id, value = page[-1]
+            after = (value['created_at'], id)
+
+    @abstractmethod
+    def ids(self):
+
+        """
+        Returns an iterator over all stored IDs.
+        """
+
+        raise NotImplementedError
+
+    @abstractmethod
+    def count(self):
+
+        """
+        Returns the number of stored records.
+        """
+
+        raise NotImplementedError
+
+    def close(self):
+
+        """
+        Flushes pending work and releases the resources held by the store.
+        """
+
+    @abstractmethod
+    def supports_prefork(self):
+
+        """
+        Returns whether the store can be shared by worker processes that are forked after it was opened, e.g. by the pre-fork server:
+        after after_fork, every worker must see the writes of the other workers.
+
+        Returns:
+            bool: True if forked workers can share the store.
+        """
+
+        raise NotImplementedError
+
+    def before_fork(self):
+
+        """
+        Prepares the store for the process to fork, e.g. by stopping threads that could hold a lock while the process forks.
+        """
+
+    def after_fork(self):
+
+        """
+        Prepares a store that was opened before the process forked for use in the forked worker process.
+        """
+
+    def metrics(self):
+
+        """
+        Returns the metrics of the store, e.g. the propagation lag of a store that follows the writes of other processes.
+
+        Returns:
+            dict: The values of the metrics by name.
+        """
+
+        return {}
+
+    def __contains__(self, id):
+        return self.get(id) is not None
+
+    def __len__(self):
+        return self.count()
+
+class MemoryStorage(Storage):
+
+    """
+    A store that keeps all records in memory in a compact RecordTable and persists them to a JSON or binary snapshot.
+    Per record the table holds a packed ID, the timestamp in epoch seconds, the UTF-8 URL and a few array slots,
+    instead of a dictionary per record with a formatted timestamp string.
+
+    Writes hold a reader/writer lock exclusively. Lookups by ID or URL take no lock at all: rows are never modified once written
+    and are indexed only after they are complete, so a lookup sees either the old or the new record. Reads that walk the sorted order
+    share the lock.
+
+    Mutations are persisted by a BackgroundWriter: a write only queues its log record (or, in 'json' mode, marks the state as changed)
+    and then waits as long as its durability mode requires, so neither the request thread nor the lock is held while a file is written.
+
+    In 'log' mode several processes can share the data file, e.g. the workers of the pre-fork server or replicas on a shared volume.
+    Every process follows the log with a LogFollower and applies the records that other processes appended, so it picks up their writes
+    without loading the data again. Records carry the instance that wrote them and when: a process skips its own records, and a record of
+    another process is not applied to an ID with an own mutation that was not read back from the log yet, because that mutation comes later
+    in the log and wins, like it does on replay.
+
+    Attributes:
+        table (RecordTable): The table holding the records, replaced by a vacuumed copy once most of its rows are dead.
+        data_file (str): The path of the snapshot.
+        log_file (str): The path of the write-ahead log.
+        persistence_mode (str): 'log' to append every mutation to a write-ahead log, 'json' to rewrite the whole data file.
+        compact_threshold (int): The log size in bytes after which the log is folded into a fresh snapshot.
+        snapshot_format (str): 'json' or 'binary', the format in which snapshots are written.
+        durability (str): 'sync', 'group' or 'async', when a write is acknowledged (see BackgroundWriter).
+        replication_lag (float): The time in seconds from the write to the apply of the records of other processes, for the last poll that found any.
+        replicated_records (int): The number of records of other processes that were applied.
+        skipped_records (int): The number of logged records that were skipped because their ID does not fit the table.
+        write_error (Exception or None): The error of the first write that failed to persist, after which the store rejects writes.
+    """
+
+    def __init__(self, data_file, persistence_mode='log', compact_threshold=LOG_COMPACT_THRESHOLD, snapshot_format='json',
+                 durability='sync', group_window=GROUP_COMMIT_WINDOW, flush_interval=ASYNC_FLUSH_INTERVAL, follow_interval=LOG_FOLLOW_INTERVAL):
+
+        """
+        Initializes a new instance of the MemoryStorage class and loads the persisted data.
+
+        Args:
+            data_file (str): The path of the snapshot.
+            persistence_mode (str, optional): 'log' or 'json'. Defaults to 'log'.
+            compact_threshold (int, optional): The log size in bytes after which the log is compacted. Defaults to LOG_COMPACT_THRESHOLD.
+            snapshot_format (str, optional): The format of a new data file, 'json' or 'binary'. An existing data file keeps its format. Defaults to 'json'.
+            durability (str, optional): 'sync', 'group' or 'async'. Defaults to 'sync'.
+            group_window (float, optional): The time in seconds to collect writes into one fsync in 'group' mode. Defaults to GROUP_COMMIT_WINDOW.
+            flush_interval (float, optional): The time in seconds between flushes in 'async' mode. Defaults to ASYNC_FLUSH_INTERVAL.
+            follow_interval (float, optional): The time in seconds between two reads of the log for the writes of other processes. Defaults to LOG_FOLLOW_INTERVAL.
+        """
+
+        if persistence_mode not in PERSISTENCE_MODES:
+            raise ValueError(f"Invalid persistence mode: {persistence_mode}. Use 'log' or 'json'.")
+        if snapshot_format not in SNAPSHOT_FORMATS:
+            raise ValueError(f"Invalid snapshot format: {snapshot_format}. Use 'json' or 'binary'.")
+
+        self.data_file = data_file
+        self.log_file = f'{data_file}.log'
+        self.persistence_mode = persistence_mode
+        self.compact_threshold = compact_threshold
+        self.snapshot_format = snapshot_format
+        self.durability = durability
+        self.replication_lag = 0.0
+        self.replicated_records = 0
+        self.skipped_records = 0
+        self.write_error = None
+        self.wal = None
+        self._follow_interval = follow_interval
+        self._follower = None
+        self._instance = os.urandom(4).hex()
+        self._unlogged = Counter()
+        self._rwlock = ReadWriteLock()
+        self._compactor = None
+        self.table = self._load_data()
+        self._writer_options = (durability, group_window, flush_interval)
+        self._writer = BackgroundWriter(self._write_batch, self._sync, *self._writer_options)
+        if self._follower is not None:
+            if self.wal.size() >= self.compact_threshold:
+                self._rotate_log()
+            self._follower.start()
+
+    def _load_data(self):
+
+        """
+        Load the records from the snapshot in the data file, in the format given by its header.
+        In 'log' mode the write-ahead log is replayed on top of the snapshot, a torn last record is cut off, and the follower is set up
+        at the end of the replayed log. The log is locked exclusively meanwhile, so other processes neither rotate it nor append to it.
+        A rotated log that was left behind by an interrupted compaction is folded into the snapshot before serving; a log that has grown
+        beyond the threshold is compacted once the store is set up.
+
+        Returns:
+            RecordTable: The restored table.
+        """
+
+        os.makedirs(os.path.dirname(self.data_file) or '.', exist_ok=True)
+        if os.path.exists(self.data_file):
+            self.snapshot_format = 'binary' if is_binary_snapshot(self.data_file) else 'json'
+        if self.persistence_mode != 'log':
+            return load_table(self.data_file)
+
+        rotated_file = self.log_file + ROTATED_SUFFIX
+        self.wal = WriteAheadLog(self.log_file)
+        with self.wal.locked(exclusive=True):
+            table, rotated_records = self._load_snapshot()
+            for record in rotated_records + self.wal.open():
+                self._apply_record(table, record)
+            follow_file, offset = open(self.log_file, 'rb'), self.wal.size()
+
+            if os.path.exists(rotated_file):
+                self._write_snapshot(table, table.live_order())
+                with suppress(FileNotFoundError): # removed by the process that rotated it, if it is still compacting
+                    os.remove(rotated_file)
+
+        self._follower = LogFollower(self.log_file, self._apply_followed, self._reload, follow_file, offset, self.wal.generation, self._follow_interval)
+        return table
+
+    def _load_snapshot(self):
+
+        """
+        Load the snapshot and read the rotated log, if one exists. Must be called while holding the lock of the log.
+        The rotated log is read first: a compaction by another process removes it only after it has written the snapshot that contains it,
+        so either the rotated log is read, or the snapshot contains it.
+
+        Returns:
+            tuple: The table loaded from the snapshot and the records of the rotated log, to be replayed on top of it.
+        """
+
+        rotated_records = read_log(self.log_file + ROTATED_SUFFIX)[0]
+        return load_table(self.data_file), rotated_records
+
+    def _apply_record(self, table, record):
+
+        """
+        Apply a logged mutation record to a table that is being loaded.
+        A record whose ID does not fit the table, e.g. an ID of another length written by an older version, is skipped with a warning,
+        so it does not keep the service from starting.
+
+        Args:
+            table (RecordTable): The table.
+            record (dict): The mutation record.
+        """
+
+        if record['op'] == 'put':
+            if pack_id(record['id']) is None:
+                self.skipped_records += 1
+                logger.warning("Skipped the logged record of ID %r, IDs must be %d ASCII characters.", record['id'], ID_WIDTH)
+                return
+            self._apply_put(table, record['id'], record['value'])
+        elif record['op'] == 'del':
+            id = pack_id(record['id'])
+            if id is not None:
+                table.delete(id)
+        elif record['op'] == 'batch':
+            for batch_record in record['records']:
+                self._apply_record(table, batch_record)
+
+    @staticmethod
+    def _record_ids(record):
+
+        """
+        Return the IDs that a mutation record writes.
+
+        Args:
+            record (dict): The mutation record.
+
+        Returns:
+            list: The IDs.
+        """
+
+        if record['op'] == 'batch':
+            return [batch_record['id'] for batch_record in record['records']]
+        return [record['id']]
+
+    def _apply_foreign(self, record):
+
+        """
+        Apply a mutation record that another process appended to the log, except to IDs with an own mutation that was not read back yet.
+        Must be called while holding the lock for writing.
+
+        Args:
+            record (dict): The mutation record.
+        """
+
+        if record['op'] == 'batch':
+            for batch_record in record['records']:
+                self._apply_foreign(batch_record)
+        elif record['id'] not in self._unlogged:
+            self._apply_record(self.table, record)
+
+    def _settle(self, record):
+
+        """
+        Count an own mutation record as read back from the log. Must be called while holding the lock for writing.
+
+        Args:
+            record (dict): The mutation record.
+        """
+
+        for id in self._record_ids(record):
+            self._unlogged[id] -= 1
+            if self._unlogged[id] <= 0:
+                del self._unlogged[id]
+
+    def _apply_followed(self, records):
+
+        """
+        Apply the records that the follower read from the log. Runs on the follower thread, or on the writer thread when the log is rotated.
+        Own records were applied when they were written, so they are only settled. The propagation lag is measured from the time the writing
+        process stamped on the record, so it includes its queueing, its fsync and the poll interval.
+
+        Args:
+            records (list): The mutation records, in log order.
+        """
+
+        lag = None
+        foreign = 0
+        with self._rwlock.write_locked():
+            for record in records:
+                if record.get('src') == self._instance:
+                    self._settle(record)
+                    continue
+                self._apply_foreign(record)
+                foreign += 1
+                if 'ts' in record:
+                    lag = max(lag or 0.0, time.time() - record['ts'])
+            self._vacuum()
+        self.replicated_records += foreign
+        if lag is not None:
+            self.replication_lag = lag
+
+    def _reload(self):
+
+        """
+        Load the whole state again, when the follower skipped a generation of the log. Runs on the follower thread.
+        The log is locked shared meanwhile, so it is not rotated, but other processes keep appending; the follower continues behind the part
+        that was replayed. Own mutations that were not read back from the log yet are carried over from the current table.
+
+        Returns:
+            tuple: The log file opened for reading, the length of the replayed part and its generation, to continue following from.
+        """
+
+        with self.wal.locked():
+            table, rotated_records = self._load_snapshot()
+            records, offset = read_log(self.log_file)
+            follow_file = open(self.log_file, 'rb')
+            generation = read_generation(self.log_file)
+        for record in rotated_records + records:
+            self._apply_record(table, record)
+
+        with self._rwlock.write_locked():
+            for record in records:
+                if record.get('src') == self._instance:
+                    self._settle(record)
+            for id in self._unlogged:
+                value = self.get(id)
+                if value is None:
+                    table.delete(pack_id(id))
+                else:
+                    self._apply_put(table, id, value)
+            self.table = table
+        return follow_file, offset, generation
+
+    def _apply_put(self, table, id, value, ordered=True):
+
+        """
+        Store a record in a table. Must be called while holding the lock for writing, or while loading.
+
+        Args:
+            table (RecordTable): The table.
+            id (str): The unique identifier of the shortened URL.
+            value (dict): The record with the original URL and its timestamp.
+            ordered (bool, optional): Whether the sorted order is maintained. Defaults to True.
+        """
+
+        packed_id = pack_id(id)
+        if packed_id is None:
+            raise ValueError(f"Invalid ID: {id}. IDs must be {ID_WIDTH} ASCII characters.")
+        table.put(packed_id, value['url'].encode('utf-8'), to_epoch(value['created_at']), ordered)
+
+    def _write_snapshot(self, table, order):
+
+        """
+        Atomically write the given rows of a table to the data file, in the snapshot format of the store.
+
+        Args:
+            table (RecordTable): The table.
+            order (array): The live rows of the table, in sorted order.
+        """
+
+        if self.snapshot_format == 'binary':
+            write_binary_snapshot(self.data_file, table, order)
+        else:
+            write_snapshot(self.data_file, table_items(table, order))
+
+    def _vacuum(self):
+
+        """
+        Replace the table by a vacuumed copy once most of its rows are dead. Must be called while holding the lock for writing.
+        """
+
+        if self.table.needs_vacuum():
+            self.table = self.table.vacuumed()
+
+    def get(self, id):
+        packed_id = pack_id(id)
+        if packed_id is None:
+            return None
+        table = self.table
+        row = table.id_index.find(packed_id)
+        if row < 0:
+            return None
+        return {'url': table.row_url(row).decode('utf-8'), 'created_at': table.created[row]}
+
+    def put(self, id, value):
+        with self._write_locked():
+            self._apply_put(self.table, id, value)
+            ticket = self._persist({'op': 'put', 'id': id, 'value': value})
+            self._vacuum()
+        self._wait(ticket)
+
+    def put_new(self, id, value):
+        with self._write_locked():
+            existing_id = self.find_by_url(value['url'])
+            if existing_id is not None:
+                return existing_id
+            self._apply_put(self.table, id, value)
+            ticket = self._persist({'op': 'put', 'id': id, 'value': value})
+            self._vacuum()
+        self._wait(ticket)
+        return None
+
+    def put_many(self, items):
+        with self._write_locked():
+            for id, value in items:
+                self._apply_put(self.table, id, value)
+            ticket = self._persist({'op': 'batch', 'records': [{'op': 'put', 'id': id, 'value': value} for id, value in items]})
+            self._vacuum()
+        self._wait(ticket)
+
+    def put_many_new(self, items):
+        ticket = None
+        with self._write_locked():
+            results = []
+            records = []
+            for id, value in items:
+                existing_id = self.find_by_url(value['url'])
+                results.append(existing_id)
+                if existing_id is None:
+                    self._apply_put(self.table, id, value)
+                    records.append({'op': 'put', 'id': id, 'value': value})
+            if records:
+                ticket = self._persist({'op': 'batch', 'records': records})
+                self._vacuum()
+        self._wait(ticket)
+        return results
+
+    def delete(self, id):
+        packed_id = pack_id(id)
+        if packed_id is None:
+            return False
+        with self._write_locked():
+            if not self.table.delete(packed_id):
+                return False
+            ticket = self._persist({'op': 'del', 'id': id})
+            self._vacuum()
+        self._wait(ticket)
+        return True
+
+    def update_many(self, updates):
+        ticket = None
+        with self._write_locked():
+            table = self.table
+            results = []
+            records = []
+            for id, url in updates:
+                packed_id = pack_id(id)
+                row = table.id_index.find(packed_id) if packed_id is not None else -1
+                results.append(row >= 0)
+                if row >= 0:
+                    value = {'url': url, 'created_at': table.created[row]}
+                    self._apply_put(table, id, value)
+                    records.append({'op': 'put', 'id': id, 'value': value})
+            if records:
+                ticket = self._persist({'op': 'batch', 'records': records})
+                self._vacuum()
+        self._wait(ticket)
+        return results
+
+    def delete_many(self, ids):
+        ticket = None
+        with self._write_locked():
+            table = self.table
+            results = []
+            for id in ids:
+                packed_id = pack_id(id)
+                results.append(packed_id is not None and table.delete(packed_id))
+            records = [{'op': 'del', 'id': id} for id, deleted in zip(ids, results) if deleted]
+            if records:
+                ticket = self._persist({'op': 'batch', 'records': records})
+                self._vacuum()
+        self._wait(ticket)
+        return results
+
+    def find_by_url(self, url):
+        table = self.table
+        row = table.url_index.find(url.encode('utf-8'))
+        return None if row < 0 else table.row_id(row).decode('ascii')
+
+    def page_by_created_at(self, limit, after=None, reverse=True):
+        with self._rwlock.read_locked():
+            table = self.table
+            rows = table.page(limit, None if after is None else (after[0], after[1].encode('utf-8')), reverse)
+            return [(table.row_id(row).decode('ascii'), {'url': table.row_url(row).decode('utf-8'), 'created_at': table.created[row]}) for row in rows]
+
+    def ids(self):
+        with self._rwlock.read_locked():
+            table = self.table
+            return iter([table.row_id(row).decode('ascii') for row in table.order if table.live[row]])
+
+    def count(self):
+        return len(self.table)
+
+    def __contains__(self, id):
+        packed_id = pack_id(id)
+        return packed_id is not None and self.table.id_index.find(packed_id) >= 0
+
+    def _persist(self, record):
+
+        """
+        Hand a single mutation to the background writer. Must be called while holding the lock for writing,
+        so mutations are queued in the order in which they were applied.
+        In 'log' mode the record is stamped with the instance and the time, queued to be appended to the write-ahead log,
+        and once it is queued, counted as unlogged until the follower reads it back. In 'json' mode only the fact that the state changed
+        is queued, the writer captures the state itself when it rewrites the data file.
+        If an earlier write failed in the meantime ('async' mode), the record is not queued and the store stops accepting writes.
+
+        Args:
+            record (dict): The mutation record.
+
+        Returns:
+            WriteTicket or None: The ticket to wait on once the lock is released, None in 'async' mode.
+        """
+
+        if self.persistence_mode == 'log':
+            record['src'] = self._instance
+            record['ts'] = round(time.time(), 3)
+        try:
+            ticket = self._writer.submit(record if self.persistence_mode == 'log' else None)
+        except Exception as e:
+            self._fail(e)
+            raise
+        if self.persistence_mode == 'log':
+            self._unlogged.update(self._record_ids(record))
+        return ticket
+
+    @contextmanager
+    def _write_locked(self):
+
+        """
+        Hold the lock for writing to apply a mutation, once the store is known to accept writes.
+        A mutation is applied before it is persisted, so after a write failed to persist, memory is ahead of the disk: the store then
+        rejects all further writes with the error of the failed write, instead of applying mutations that may never be persisted.
+        In 'async' mode nobody waits for a write, so its error is only picked up from the writer here, before the next mutation is applied.
+
+        Raises:
+            Exception: The error of the write that failed to persist.
+        """
+
+        with self._rwlock.write_locked():
+            if self.write_error is None:
+                try:
+                    self._writer.check()
+                except Exception as e:
+                    self._fail(e)
+            if self.write_error is not None:
+                raise self.write_error
+            yield
+
+    def _fail(self, error):
+
+        """
+        Stop accepting writes after a write failed to persist. Must be called while holding the lock for writing.
+        Own mutations that will never be read back from the log no longer shadow the writes of other processes to the same IDs.
+
+        Args:
+            error (Exception): The error of the failed write.
+        """
+
+        if self.write_error is None:
+            self.write_error = error
+        self._unlogged.clear()
+
+    def _wait(self, ticket):
+
+        """
+        Wait until a mutation is durable, without holding the lock. A write that failed to persist stops the store from accepting writes.
+
+        Args:
+            ticket (WriteTicket or None): The ticket returned by _persist, or None if there is nothing to wait for.
+        """
+
+        if ticket is None:
+            return
+        try:
+            ticket.wait()
+        except Exception as e:
+            with self._rwlock.write_locked():
+                self._fail(e)
+            raise
+
+    def _capture(self):
+
+        """
+        Capture the current state of the table.
+        Rows are never modified, so copies of the order and of the live flags are enough to capture the current state of the table.
+        The tombstones are only dropped from the copy once the lock is released.
+
+        Returns:
+            tuple: The table and its live rows, in sorted order.
+        """
+
+        with self._rwlock.read_locked():
+            table = self.table
+            order, live = array('q', table.order), bytes(table.live)
+        return (table, table.live_order(order, live))
+
+    def _write_batch(self, records):
+
+        """
+        Append a batch of queued mutations to the write-ahead log ('log' mode). Runs on the background writer thread.
+        The log is compacted once it passes the threshold, after it has been forced to disk.
+
+        Args:
+            records (list): The queued mutation records, or placeholders in 'json' mode.
+        """
+
+        if self.persistence_mode != 'log':
+            return
+
+        self.wal.append_many(records)
+        if self.wal.size() >= self.compact_threshold and not (self._compactor and self._compactor.is_alive()):
+            self.wal.sync()
+            self._rotate_log()
+
+    def _rotate_log(self):
+
+        """
+        Rotate the write-ahead log and start the compactor, unless another process is still compacting a log it rotated.
+        The follower first reads the rest of the rotated log, which other processes may have appended to, and the state is captured
+        after that, so the snapshot contains at least every mutation of the rotated log.
+        """
+
+        rotated_file = self.wal.rotate()
+        if rotated_file is None:
+            return
+        self._follower.poll()
+        self._compactor = threading.Thread(target=self._compact, args=(self._capture(), rotated_file), daemon=True)
+        self._compactor.start()
+
+    def _sync(self):
+
+        """
+        Make the written mutations durable. Runs on the background writer thread.
+        In 'log' mode the write-ahead log is forced to disk, in 'json' mode the whole data file is rewritten with the current state,
+        which contains every mutation that was queued so far.
+        """
+
+        if self.persistence_mode == 'log':
+            self.wal.sync()
+        else:
+            self._write_snapshot(*self._capture())
+
+    def _compact(self, snapshot, rotated_file):
+
+        """
+        Fold a rotated log into a fresh snapshot. Runs on the background compactor thread.
+        The rotated log is only removed once the new snapshot has been atomically written,
+        so a crash at any point is recovered by replaying the rotated log on startup.
+
+        Args:
+            snapshot (tuple): The table and a copy of its order, taken when the log was rotated.
+            rotated_file (str): The path of the rotated log file.
+        """
+
+        self._write_snapshot(*snapshot)
+        with suppress(FileNotFoundError): # folded by a process that started meanwhile
+            os.remove(rotated_file)
+
+    def close(self):
+
+        """
+        Drain the background writer, so every queued mutation is written and flushed, wait for a running compaction, stop the follower
+        and close the write-ahead log.
+        """
+
+        self._writer.close()
+        if self._compactor is not None:
+            self._compactor.join()
+        if self._follower is not None:
+            self._follower.close()
+        if self.wal is not None:
+            self.wal.close()
+
+    def metrics(self):
+        if self._follower is None:
+            return {}
+        return {
+            'replication_lag_seconds': self.replication_lag,
+            'replicated_records_total': self.replicated_records,
+            'replication_poll_errors_total': self._follower.errors,
+            'replication_last_poll_timestamp_seconds': self._follower.polled_at,
+        }
+
+    def supports_prefork(self):
+
+        """
+        Forked workers share the store in 'log' mode, where they follow each other's writes in the log.
+        In 'json' mode a worker cannot catch up with the data file that other workers rewrite.
+        """
+
+        return self.persistence_mode == 'log'
+
+    def before_fork(self):
+
+        """
+        Stop the follower before the process forks, so it cannot hold a lock or be halfway through applying records in the forked process.
+        The process that forks, e.g. the master of the pre-fork server, does not serve requests, so it does not need to follow the log.
+        """
+
+        if self._follower is not None:
+            self._follower.stop()
+
+    def after_fork(self):
+
+        """
+        Prepare the store for use in a worker process that was forked after the data was loaded, e.g. by the pre-fork server.
+        The table is shared copy-on-write with the parent, so only the pages that the worker modifies are copied.
+        The worker appends to the log through a file of its own, under an instance of its own, so the other workers apply its records.
+        Its follower reads on from the position of the parent before the worker serves, so a worker that replaces a recycled one starts
+        with the writes of the other workers, and then keeps following them. The threads do not survive the fork, so new ones are started.
+
+        Raises:
+            ValueError: In 'json' mode, because a worker cannot catch up with the data file that other workers rewrite.
+        """
+
+        if self.persistence_mode != 'log':
+            raise ValueError("The 'json' persistence mode cannot be used by forked workers. Use 'log'.")
+
+        self._rwlock = ReadWriteLock()
+        self._compactor = None
+        self._instance = os.urandom(4).hex()
+        self._unlogged = Counter()
+        self.wal.reopen()
+        self._follower.after_fork()
+        self._follower.poll()
+        self._writer = BackgroundWriter(self._write_batch, self._sync, *self._writer_options)
+        self._follower.start()
+
+class SQLiteStorage(Storage):
+
+    """
+    A store that keeps all records in an SQLite database, so datasets larger than memory can be served
+    and startup does not need to parse the whole dataset.
+
+    The database runs in WAL journal mode, so readers are never blocked by a writer. Every thread gets its own connection,
+    and all queries are constant SQL strings, so each connection prepares a statement once and reuses it from its statement cache.
+
+    Attributes:
+        db_file (str): The path of the SQLite database.
+    """
+
+    CREATE_TABLE = 'CREATE TABLE IF NOT EXISTS urls (id TEXT PRIMARY KEY, url TEXT NOT NULL, created_at INTEGER NOT NULL) WITHOUT ROWID'
+    CREATE_URL_INDEX = 'CREATE INDEX IF NOT EXISTS urls_url ON urls (url)'
+    CREATE_CREATED_AT_INDEX = 'CREATE INDEX IF NOT EXISTS urls_created_at ON urls (created_at, id)'
+    SELECT_ID = 'SELECT url, created_at FROM urls WHERE id = ?'
+    SELECT_URL = 'SELECT id FROM urls WHERE url = ? LIMIT 1'
+    SELECT_IDS = 'SELECT id FROM urls'
+    SELECT_PAGE = 'SELECT id, url, created_at FROM urls ORDER BY created_at ASC, id ASC LIMIT ?'
+    SELECT_PAGE_AFTER = 'SELECT id, url, created_at FROM urls WHERE (created_at, id) > (?, ?) ORDER BY created_at ASC, id ASC LIMIT ?'
+    SELECT_PAGE_DESC = 'SELECT id, url, created_at FROM urls ORDER BY created_at DESC, id DESC LIMIT ?'
+    SELECT_PAGE_DESC_AFTER = 'SELECT id, url, created_at FROM urls WHERE (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?'
+    SELECT_COUNT = 'SELECT COUNT(*) FROM urls'
+    UPSERT = 'INSERT OR REPLACE INTO urls (id, url, created_at) VALUES (?, ?, ?)'
+    UPDATE_URL = 'UPDATE urls SET url = ? WHERE id = ?'
+    # Databases created before timestamps were stored in epoch seconds hold them formatted in local time, in a TEXT column
+    SELECT_CREATED_AT_TYPE = "SELECT type FROM pragma_table_info('urls') WHERE name = 'created_at'"
+    MIGRATE_TIMESTAMPS = (
+        'ALTER TABLE urls RENAME TO urls_text_timestamps',
+        'DROP INDEX IF EXISTS urls_url',
+        'DROP INDEX IF EXISTS urls_created_at',
+        CREATE_TABLE,
+        "INSERT INTO urls SELECT id, url, CAST(strftime('%s', created_at, 'utc') AS INTEGER) FROM urls_text_timestamps",
+        'DROP TABLE urls_text_timestamps',
+    )
+    DELETE = 'DELETE FROM urls WHERE id = ?'
+
+    def __init__(self, db_file, import_file=None):
+
+        """
+        Initializes a new instance of the SQLiteStorage class and creates the schema if needed.
+
+        Args:
+            db_file (str): The path of the SQLite database.
+            import_file (str, optional): The path of a snapshot (and its write-ahead log) that is imported
+                                         when the database is still empty. Defaults to None.
+        """
+
+        self.db_file = db_file
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._inherited_connections = []
+
+        os.makedirs(os.path.dirname(self.db_file) or '.', exist_ok=True)
+        connection = self._connection()
+        connection.execute('PRAGMA journal_mode=WAL')
+        with connection:
+            if connection.execute(self.SELECT_CREATED_AT_TYPE).fetchone() == ('TEXT',):
+                for statement in self.MIGRATE_TIMESTAMPS:
+                    connection.execute(statement)
+            connection.execute(self.CREATE_TABLE)
+            connection.execute(self.CREATE_URL_INDEX)
+            connection.execute(self.CREATE_CREATED_AT_INDEX)
+
+        if import_file is not None and self.count() == 0:
+            self._import_json(import_file)
+
+    def _connection(self):
+
+        """
+        Returns the connection of the calling thread, opening it on first use.
+        """
+
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_file, check_same_thread=False, cached_statements=256)
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    def _import_json(self, import_file):
+
+        """
+        Import the records of a JSON snapshot and its write-ahead log into the database.
+
+        Args:
+            import_file (str): The path of the snapshot.
+        """
+
+        url_data = load_snapshot_data(import_file)
+        for log_file in (f'{import_file}.log{ROTATED_SUFFIX}', f'{import_file}.log'):
+            for record in read_log(log_file)[0]:
+                apply_record(url_data, record)
+
+        with self._connection() as connection:
+            connection.executemany(self.UPSERT, ((id, value['url'], to_epoch(value['created_at'])) for id, value in url_data.items()))
+
+    def get(self, id):
+        row = self._connection().execute(self.SELECT_ID, (id,)).fetchone()
+        return None if row is None else {'url': row[0], 'created_at': row[1]}
+
+    def put(self, id, value):
+        with self._connection() as connection:
+            connection.execute(self.UPSERT, (id, value['url'], to_epoch(value['created_at'])))
+
+    def put_many(self, items):
+        with self._connection() as connection:
+            connection.executemany(self.UPSERT, ((id, value['url'], to_epoch(value['created_at'])) for id, value in items))
+
+    def put_new(self, id, value):
+        connection = self._connection()
+        with connection:
+            # An immediate transaction takes the write lock before the check, so no other writer can store the URL in between
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute(self.SELECT_URL, (value['url'],)).fetchone()
+            if row is not None:
+                return row[0]
+            connection.execute(self.UPSERT, (id, value['url'], to_epoch(value['created_at'])))
+        return None
+
+    def put_many_new(self, items):
+        connection = self._connection()
+        results = []
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            for id, value in items:
+                row = connection.execute(self.SELECT_URL, (value['url'],)).fetchone()
+                results.append(None if row is None else row[0])
+                if row is None:
+                    connection.execute(self.UPSERT, (id, value['url'], to_epoch(value['created_at'])))
+        return results
+
+    def delete(self, id):
+        with self._connection() as connection:
+            return connection.execute(self.DELETE, (id,)).rowcount > 0
+
+    def update_many(self, updates):
+        with self._connection() as connection:
+            return [connection.execute(self.UPDATE_URL, (url, id)).rowcount > 0 for id, url in updates]
+
+    def delete_many(self, ids):
+        with self._connection() as connection:
+            return [connection.execute(self.DELETE, (id,)).rowcount > 0 for id in ids]
+
+    def find_by_url(self, url):
+        row = self._connection().execute(self.SELECT_URL, (url,)).fetchone()
+        return None if row is None else row[0]
+
+    def page_by_created_at(self, limit, after=None, reverse=True):
+        if after is None:
+            cursor = self._connection().execute(self.SELECT_PAGE_DESC if reverse else self.SELECT_PAGE, (limit,))
+        else:
+            cursor = self._connection().execute(self.SELECT_PAGE_DESC_AFTER if reverse else self.SELECT_PAGE_AFTER, (*after, limit))
+        return [(id, {'url': url, 'created_at': created_at}) for id, url, created_at in cursor]
+
+    def ids(self):
+        return (row[0] for row in self._connection().execute(self.SELECT_IDS))
+
+    def count(self):
+        return self._connection().execute(self.SELECT_COUNT).fetchone()[0]
+
+    def close(self):
+
+        """
+        Close the connections of all threads.
+        """
+
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+        self._local = threading.local()
+
+    def supports_prefork(self):
+
+        """
+        Forked workers share the database file, every worker through connections of its own, and SQLite orders their writes.
+        """
+
+        return True
+
+    def after_fork(self):
+
+        """
+        Drop the connections inherited from the parent process without using or closing them, as SQLite requires,
+        so every thread of the worker opens a connection of its own.
+        """
+
+        self._inherited_connections = self._connections
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._local = threading.local()
+
+def create_storage(backend, data_file, persistence_mode='log', compact_threshold=LOG_COMPACT_THRESHOLD, snapshot_format='json', durability='sync',
+                   follow_interval=LOG_FOLLOW_INTERVAL):
+
+    """
+    Creates the url_data store for the selected backend.
+    The SQLite database is placed next to the data file, and imports it on first use.
+
+    Args:
+        backend (str): 'memory' or 'sqlite'.
+        data_file (str): The path of the data file.
+        persistence_mode (str, optional): The persistence mode of the memory backend. Defaults to 'log'.
+        compact_threshold (int, optional): The log compaction threshold of the memory backend. Defaults to LOG_COMPACT_THRESHOLD.
+        snapshot_format (str, optional): The format of a new data file of the memory backend. Defaults to 'json'.
+        durability (str, optional): When a write to the memory backend is acknowledged, 'sync', 'group' or 'async'. Defaults to 'sync'.
+        follow_interval (float, optional): The time in seconds between two reads of the log by the memory backend. Defaults to LOG_FOLLOW_INTERVAL.
+
+    Returns:
+        Storage: The store.
+    """
+
+    if backend == 'memory':
+        return MemoryStorage(data_file, persistence_mode, compact_threshold, snapshot_format, durability, follow_interval=follow_interval)
+    elif backend == 'sqlite':
+        return SQLiteStorage(f'{os.path.splitext(data_file)[0]}.db', import_file=data_file)
+    else:
+        raise ValueError(f"Invalid storage backend: {backend}. Use one of {', '.join(STORAGE_BACKENDS)}.")
@@ -0,0 +1,435 @@
+import zlib
+from array import array
+
+# Set the width in bytes of a packed ID, IDs are stored as fixed-width ASCII
+ID_WIDTH = 8
+
+# Set the number of dead rows below which a table is never vacuumed
+VACUUM_MIN_ROWS = 4096
+
+# Slot markers of the hash index
+EMPTY_SLOT = -1
+DELETED_SLOT = -2
+
+def pack_id(id):
+
+    """
+    Packs an ID into its fixed-width byte representation.
+
+    Args:
+        id (str): The unique identifier.
+
+    Returns:
+        bytes or None: The packed ID, or None if the ID is not ID_WIDTH ASCII characters and can therefore never be stored.
+    """
+
+    if len(id) != ID_WIDTH or not id.isascii():
+        return None
+    return id.encode('ascii')
+
+class HashIndex:
+
+    """
+    An open-addressing hash table that maps byte keys to row numbers, stored in a flat array of 8-byte integers.
+    The keys themselves are not stored: they are read back from the table rows, so an entry only costs its slot.
+    Slots are probed linearly from the CRC32 of the key, which is stable across processes.
+    A non-unique index maps a key to several rows, one slot per row; a lookup returns any of them, and removing one row leaves the others.
+
+    Attributes:
+        slots (array): The row number per slot, or EMPTY_SLOT / DELETED_SLOT.
+        size (int): The number of entries in the index.
+        unique (bool): Whether a key maps to one row only.
+    """
+
+    def __init__(self, key_of_row, capacity=16, unique=True):
+
+        """
+        Initializes a new, empty hash index.
+
+        Args:
+            key_of_row (function): Returns the key of a row, used to compare keys and to rehash on growth.
+            capacity (int, optional): The initial number of slots, a power of two. Defaults to 16.
+            unique (bool, optional): Whether inserting a key replaces the row it was mapped to, or adds a row to it. Defaults to True.
+        """
+
+        self.key_of_row = key_of_row
+        self.unique = unique
+        self.slots = array('q', [EMPTY_SLOT]) * capacity
+        self.size = 0
+        self._used = 0 # live and deleted slots
+
+    def restore(self, slots, size):
+
+        """
+        Replaces the slot array by one that was persisted together with the rows it points to.
+
+        Args:
+            slots (array): The slot array.
+            size (int): The number of keys in the slot array.
+        """
+
+        self.slots = slots
+        self.size = size
+        self._used = size
+
+    def find(self, key):
+
+        """
+        Returns the row of the given key.
+        Safe to call without a lock while another thread inserts, because a grown slot array is swapped in as a whole.
+
+        Args:
+            key (bytes): The key.
+
+        Returns:
+            int: The row number, or -1 if the key is not in the index.
+        """
+
+        slots = self.slots
+        mask = len(slots) - 1
+        slot = zlib.crc32(key) & mask
+        while True:
+            row = slots[slot]
+            if row == EMPTY_SLOT:
+                return -1
+            if row >= 0 and self.key_of_row(row) == key:
+                return row
+            slot = (slot + 1) & mask
+
+    def insert(self, key, row):
+
+        """
+        Maps a key to a row, replacing the row the key was mapped to, or in a non-unique index, in addition to it.
+
+        Args:
+            key (bytes): The key.
+            row (int): The row number.
+        """
+
+        slots = self.slots
+        mask = len(slots) - 1
+        slot = zlib.crc32(key) & mask
+        free = -1
+        while True:
+            current = slots[slot]
+            if current == EMPTY_SLOT:
+                break
+            if current == DELETED_SLOT:
+                if free < 0:
+                    free = slot
+            elif self.unique and self.key_of_row(current) == key:
+                slots[slot] = row
+                return
+            slot = (slot + 1) & mask
+
+        if free < 0:
+            free = slot
+            self._used += 1
+        slots[free] = row
+        self.size += 1
+
+        if self._used * 3 >= len(slots) * 2:
+            self._grow()
+
+    def remove(self, key, row):
+
+        """
+        Removes a key from the index if it is mapped to the given row.
+
+        Args:
+            key (bytes): The key.
+            row (int): The row the key must be mapped to.
+
+        Returns:
+            bool: True if the key was removed.
+        """
+
+        slots = self.slots
+        mask = len(slots) - 1
+        slot = zlib.crc32(key) & mask
+        while True:
+            current = slots[slot]
+            if current == EMPTY_SLOT:
+                return False
+            if current == row:
+                slots[slot] = DELETED_SLOT
+                self.size -= 1
+                return True
+            slot = (slot + 1) & mask
+
+    def _grow(self):
+
+        """
+        Rehashes all keys into a slot array with room for at least twice the current number of keys, dropping deleted slots.
+        """
+
+        capacity = 16
+        while capacity < self.size * 2:
+            capacity *= 2
+
+        slots = array('q', [EMPTY_SLOT]) * capacity
+        mask = capacity - 1
+        for row in self.slots:
+            if row >= 0:
+                slot = zlib.crc32(self.key_of_row(row)) & mask
+                while slots[slot] != EMPTY_SLOT:
+                    slot = (slot + 1) & mask
+                slots[slot] = row
+
+        self.slots = slots
+        self._used = self.size
+
+class RecordTable:
+
+    """
+    A compact column store of URL records.
+    Every record is a row in a set of parallel arrays, so a record costs a few dozen bytes plus its URL text instead of several Python objects.
+    Rows are never modified once written: an update appends a new row and the old row becomes dead, so readers never see a half-written row.
+    Dead rows stay in the sorted order as tombstones, so a delete or an update never moves the rows behind it: they are skipped
+    while paging, and reclaimed together with the dead rows by building a vacuumed copy of the table.
+
+    Attributes:
+        ids (bytearray): The packed ID of every row, ID_WIDTH bytes per row.
+        created (array): The timestamp of creation of every row, in epoch seconds.
+        offsets (array): The offset of the URL of every row in the URL blob.
+        lengths (array): The length in bytes of the URL of every row.
+        blob (bytearray): The UTF-8 encoded URLs of all rows.
+        live (bytearray): 1 for every live row, 0 for every dead row.
+        order (array): The rows sorted by (created, id), live rows and tombstones, at most one row per sort key.
+        id_index (HashIndex): Maps packed IDs to their live row.
+        url_index (HashIndex): Maps UTF-8 encoded URLs to their live rows, used for duplicate detection. It is not unique: an update or another
+                               process can store a URL under a second ID, and deleting one of them must leave the URL found under the other.
+        dead_rows (int): The number of rows that are no longer live.
+    """
+
+    def __init__(self):
+
+        """
+        Initializes a new, empty table.
+        """
+
+        self.ids = bytearray()
+        self.created = array('q')
+        self.offsets = array('Q')
+        self.lengths = array('I')
+        self.blob = bytearray()
+        self.live = bytearray()
+        self.order = array('q')
+        self.id_index = HashIndex(self.row_id)
+        self.url_index = HashIndex(self.row_url, unique=False)
+        self.dead_rows = 0
+
+    def __len__(self):
+        return self.id_index.size
+
+    def row_id(self, row):
+        return bytes(self.ids[row * ID_WIDTH:(row + 1) * ID_WIDTH])
+
+    def row_url(self, row):
+        offset = self.offsets[row]
+        return bytes(self.blob[offset:offset + self.lengths[row]])
+
+    def sort_key(self, row):
+        return (self.created[row], self.row_id(row))
+
+    def position_of(self, key):
+
+        """
+        Returns the leftmost position in the order at which the given sort key could be inserted.
+
+        Args:
+            key (tuple): A (created, packed id) sort key.
+
+        Returns:
+            int: The position.
+        """
+
+        order = self.order
+        low, high = 0, len(order)
+        while low < high:
+            middle = (low + high) // 2
+            if self.sort_key(order[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _append_row(self, id, url, created):
+
+        """
+        Appends a row to the columns without indexing it.
+
+        Args:
+            id (bytes): The packed ID.
+            url (bytes): The UTF-8 encoded URL.
+            created (int): The timestamp of creation in epoch seconds.
+
+        Returns:
+            int: The new row number.
+        """
+
+        row = len(self.created)
+        self.offsets.append(len(self.blob))
+        self.lengths.append(len(url))
+        self.blob += url
+        self.created.append(created)
+        self.live.append(1)
+        self.ids += id
+        return row
+
+    def put(self, id, url, created, ordered=True):
+
+        """
+        Stores a record, replacing the record that is stored under the same ID.
+
+        Args:
+            id (bytes): The packed ID.
+            url (bytes): The UTF-8 encoded URL.
+            created (int): The timestamp of creation in epoch seconds.
+            ordered (bool, optional): Whether the sorted order is maintained. Pass False while bulk loading and call build_order afterwards.
+        """
+
+        previous = self.id_index.find(id)
+        row = self._append_row(id, url, created)
+
+        if ordered:
+            order = self.order
+            key = (created, id)
+            if not order or self.sort_key(order[-1]) < key:
+                order.append(row)
+            else:
+                position = self.position_of(key)
+                if position < len(order) and self.sort_key(order[position]) == key: # the previous row of the ID, or its tombstone
+                    order[position] = row
+                else:
+                    order.insert(position, row)
+
+        self.id_index.insert(id, row)
+        if previous >= 0:
+            self.url_index.remove(self.row_url(previous), previous)
+            self.live[previous] = 0
+            self.dead_rows += 1
+        self.url_index.insert(url, row)
+
+    def delete(self, id):
+
+        """
+        Removes the record stored under the given ID. Its row stays in the sorted order as a tombstone.
+
+        Args:
+            id (bytes): The packed ID.
+
+        Returns:
+            bool: True if a record was removed, False if the ID was not stored.
+        """
+
+        row = self.id_index.find(id)
+        if row < 0:
+            return False
+
+        self.id_index.remove(id, row)
+        self.url_index.remove(self.row_url(row), row)
+        self.live[row] = 0
+        self.dead_rows += 1
+        return True
+
+    def live_order(self, order=None, live=None):
+
+        """
+        Returns the live rows of the sorted order, without its tombstones.
+
+        Args:
+            order (array, optional): The sorted order. Defaults to the current order of the table.
+            live (bytes, optional): The live flags of the rows. Defaults to the current flags of the table.
+
+        Returns:
+            array: The live rows, in sorted order.
+        """
+
+        order = self.order if order is None else order
+        live = self.live if live is None else live
+        return array('q', (row for row in order if live[row]))
+
+    def page(self, limit, after=None, reverse=True):
+
+        """
+        Returns the live rows of one page of the sorted order, skipping tombstones.
+
+        Args:
+            limit (int): The maximum number of rows on the page.
+            after (tuple, optional): The (created, packed id) sort key after which the page starts. Defaults to None, the first page.
+            reverse (bool, optional): Whether the newest rows come first. Defaults to True.
+
+        Returns:
+            list: The row numbers.
+        """
+
+        order, live = self.order, self.live
+        rows = []
+        if reverse:
+            end = len(order) if after is None else self.position_of(after)
+            while end > 0 and len(rows) < limit:
+                start = max(end - limit + len(rows), 0)
+                rows += [row for row in order[start:end][::-1] if live[row]]
+                end = start
+        else:
+            start = 0
+            if after is not None:
+                start = self.position_of(after)
+                start += start < len(order) and self.sort_key(order[start]) == after
+            while start < len(order) and len(rows) < limit:
+                end = start + limit - len(rows)
+                rows += [row for row in order[start:end] if live[row]]
+                start = end
+        return rows[:limit]
+
+    def build_order(self):
+
+        """
+        Rebuilds the sorted order from the live rows.
+        Snapshots and logs are written in order of creation, so after a load the live rows usually are sorted already
+        and the order is built in one pass, without a sort key per row.
+        """
+
+        id_index = self.id_index
+        order = array('q')
+        previous_key = None
+        is_sorted = True
+        for row in range(len(self.created)):
+            id = self.row_id(row)
+            if id_index.find(id) == row:
+                key = (self.created[row], id)
+                is_sorted = is_sorted and (previous_key is None or previous_key < key)
+                previous_key = key
+                order.append(row)
+
+        self.order = order if is_sorted else array('q', sorted(order, key=self.sort_key))
+
+    def needs_vacuum(self):
+
+        """
+        Returns whether dead rows outnumber live rows, so a vacuumed copy would at least halve the table.
+        """
+
+        return self.dead_rows > max(len(self), VACUUM_MIN_ROWS)
+
+    def vacuumed(self, order=None):
+
+        """
+        Builds a copy of the table that only contains the live rows, in sorted order.
+
+        Args:
+            order (array, optional): The rows to copy, in sorted order. Defaults to the live rows of the current order of the table.
+
+        Returns:
+            RecordTable: The vacuumed table.
+        """
+
+        order = self.live_order() if order is None else order
+        table = RecordTable()
+        for row in order:
+            new_row = table._append_row(self.row_id(row), self.row_url(row), self.created[row])
+            table.id_index.insert(table.row_id(new_row), new_row)
+            table.url_index.insert(table.row_url(new_row), new_row)
+        table.order = array('q', range(len(order)))
+        return table
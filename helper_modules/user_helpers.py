@@ -0,0 +1,304 @@
+import os
+import fcntl
+import threading
+from contextlib import suppress
+from helper_modules.wal_helpers import BackgroundWriter, WriteAheadLog, ASYNC_FLUSH_INTERVAL, GROUP_COMMIT_WINDOW, ROTATED_SUFFIX, apply_record, load_snapshot, read_log, write_snapshot
+
+# Set the number of locks the usernames are striped over, so writes to different users rarely wait for the same lock
+USER_LOCK_STRIPES = int(os.environ.get("USER_LOCK_STRIPES", 64))
+
+# Size in bytes after which the user log is folded into a fresh snapshot. Replaying the log takes longer per user than loading the snapshot,
+# so it is kept smaller than the log of the URL store
+USER_LOG_COMPACT_THRESHOLD = int(os.environ.get("USER_LOG_COMPACT_THRESHOLD", 16 * 1024 * 1024))
+
+# Suffix of the file that the processes using a user store hold a lock on
+OWNER_SUFFIX = '.owner'
+
+class UserStore:
+
+    """
+    A store of users, their password hashes and roles, that is kept in memory and persisted to a JSON snapshot and a write-ahead log.
+
+    Writes lock the stripe of the username only, one of `stripes` locks, so sign-ups and password changes of different users rarely wait
+    for each other, while two writes to the same username are serialized: of two concurrent sign-ups with the same username exactly one succeeds.
+    Lookups take no lock, a write replaces the entry of a user. A user is stored as a single string `<role>:<password hash>`,
+    so a million users load as a million strings, which the garbage collector does not track, instead of as a million lists.
+
+    Every write queues a record for a BackgroundWriter, which appends it to the log, and waits until it is durable without holding the lock.
+    Once the log passes the threshold, it is rotated and folded into a fresh snapshot by a compactor thread, so startup only replays a short log
+    on top of the snapshot. The store is not shared by several processes: it is loaded once in the master of the pre-fork server and
+    a forked worker reads the part of the log that an earlier worker appended.
+
+    Every store holds a lock on the owner file of the data file while it is open, shared by default, or exclusively, e.g. for an offline import.
+    An exclusive store cannot be opened while any other store is, and no other store while it is, so an import never runs next to a service
+    that would compact its own copy of the users over the imported ones. A forked worker inherits the lock of the master.
+
+    Attributes:
+        data_file (str): The path of the snapshot.
+        log_file (str): The path of the write-ahead log.
+        compact_threshold (int): The log size in bytes after which the log is folded into a fresh snapshot.
+        durability (str): 'sync', 'group' or 'async', when a write is acknowledged (see BackgroundWriter).
+    """
+
+    def __init__(self, data_file, compact_threshold=USER_LOG_COMPACT_THRESHOLD, durability='sync', stripes=USER_LOCK_STRIPES,
+                 group_window=GROUP_COMMIT_WINDOW, flush_interval=ASYNC_FLUSH_INTERVAL, exclusive=False):
+
+        """
+        Initializes a new instance of the UserStore class and loads the persisted users.
+
+        Args:
+            data_file (str): The path of the snapshot.
+            compact_threshold (int, optional): The log size in bytes after which the log is compacted. Defaults to USER_LOG_COMPACT_THRESHOLD.
+            durability (str, optional): 'sync', 'group' or 'async'. Defaults to 'sync'.
+            stripes (int, optional): The number of locks the usernames are striped over. Defaults to USER_LOCK_STRIPES.
+            group_window (float, optional): The time in seconds to collect writes into one fsync in 'group' mode. Defaults to GROUP_COMMIT_WINDOW.
+            flush_interval (float, optional): The time in seconds between flushes in 'async' mode. Defaults to ASYNC_FLUSH_INTERVAL.
+            exclusive (bool, optional): Whether no other store may use the data file at the same time. Defaults to False.
+
+        Raises:
+            ValueError: If the data file is used by an exclusive store, or by any other store when `exclusive` is set.
+        """
+
+        os.makedirs(os.path.dirname(data_file) or '.', exist_ok=True)
+        self._owner_fd = os.open(data_file + OWNER_SUFFIX, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(self._owner_fd, (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(self._owner_fd)
+            if exclusive:
+                raise ValueError(f"The user store {data_file} is in use, stop the auth service first.") from None
+            raise ValueError(f"The user store {data_file} is locked by an import.") from None
+
+        self.data_file = data_file
+        self.log_file = f'{data_file}.log'
+        self.compact_threshold = compact_threshold
+        self.durability = durability
+        self._stripes = [threading.Lock() for _ in range(stripes)]
+        self._compactor = None
+        self.wal = WriteAheadLog(self.log_file)
+        self._users = self._load()
+        self._writer_options = (durability, group_window, flush_interval)
+        self._writer = BackgroundWriter(self._write_batch, self.wal.sync, *self._writer_options)
+
+    def _load(self):
+
+        """
+        Load the users from the snapshot and replay the write-ahead log on top of it; a torn last record is cut off.
+        A rotated log that was left behind by an interrupted compaction is replayed before the log and folded into the snapshot.
+
+        Returns:
+            dict: The role and password hash of every user, as `<role>:<password hash>`, by username.
+        """
+
+        rotated_file = self.log_file + ROTATED_SUFFIX
+        with self.wal.locked(exclusive=True):
+            rotated_records = read_log(rotated_file)[0]
+            users = load_snapshot(self.data_file)
+            for record in rotated_records + self.wal.open():
+                apply_record(users, record)
+            if os.path.exists(rotated_file):
+                write_snapshot(self.data_file, users)
+                os.remove(rotated_file)
+            self._log_offset = self.wal.size()
+            self._generation = self.wal.generation
+        return users
+
+    def _stripe(self, username):
+
+        """
+        Returns the lock of the stripe a username belongs to.
+        """
+
+        return self._stripes[hash(username) % len(self._stripes)]
+
+    def get(self, username):
+
+        """
+        Returns a user.
+
+        Args:
+            username (str): The username.
+
+        Returns:
+            dict or None: The 'password' hash and the 'role' of the user, or None if the user does not exist.
+        """
+
+        user = self._users.get(username)
+        if user is None:
+            return None
+        role, _, password_hash = user.partition(':')
+        return {'password': password_hash, 'role': role}
+
+    def create(self, username, password_hash, role):
+
+        """
+        Creates a user, unless the username is taken, and waits until the user is durable.
+
+        Args:
+            username (str): The username.
+            password_hash (str): The password hash.
+            role (str): The role.
+
+        Returns:
+            bool: True if the user was created, False if the username is taken.
+        """
+
+        with self._stripe(username):
+            if username in self._users:
+                return False
+            self._users[username] = user = f'{role}:{password_hash}'
+            ticket = self._writer.submit({'op': 'put', 'id': username, 'value': user})
+        self._wait(ticket)
+        return True
+
+    def create_many(self, users):
+
+        """
+        Creates many users at once, e.g. a chunk of a bulk import, and waits until they are durable.
+        The new users are written as a single batch record, so a chunk is committed with one append and one fsync, and replayed all or nothing.
+        The stripes of all usernames are locked in ascending order while the users are inserted and the record is queued,
+        so a concurrent write to one of them is ordered before or after the whole chunk.
+
+        Args:
+            users (list): The users to create, as (username, password hash, role) tuples.
+
+        Returns:
+            list: A bool per user, in the order of the users: True if the user was created, False if the username is taken,
+                  also by an earlier user of the list.
+        """
+
+        stripes = sorted({hash(username) % len(self._stripes) for username, _, _ in users})
+        created = []
+        records = []
+        ticket = None
+        for index in stripes:
+            self._stripes[index].acquire()
+        try:
+            for username, password_hash, role in users:
+                if username in self._users:
+                    created.append(False)
+                    continue
+                self._users[username] = user = f'{role}:{password_hash}'
+                records.append({'op': 'put', 'id': username, 'value': user})
+                created.append(True)
+            if records:
+                ticket = self._writer.submit({'op': 'batch', 'records': records})
+        finally:
+            for index in stripes:
+                self._stripes[index].release()
+        self._wait(ticket)
+        return created
+
+    def set_password(self, username, password_hash, expected=None):
+
+        """
+        Replaces the password hash of a user and waits until it is durable.
+        With `expected`, the hash is only replaced if it has not changed since it was read, so e.g. upgrading the hash after a login
+        does not undo a password change that happened in the meantime.
+
+        Args:
+            username (str): The username.
+            password_hash (str): The new password hash.
+            expected (str, optional): The password hash that must still be stored. Defaults to None, to replace any hash.
+
+        Returns:
+            bool: True if the hash was replaced, False if the user does not exist or its hash is not `expected`.
+        """
+
+        with self._stripe(username):
+            user = self._users.get(username)
+            if user is None:
+                return False
+            role, _, stored_hash = user.partition(':')
+            if expected is not None and stored_hash != expected:
+                return False
+            self._users[username] = user = f'{role}:{password_hash}'
+            ticket = self._writer.submit({'op': 'put', 'id': username, 'value': user})
+        self._wait(ticket)
+        return True
+
+    @staticmethod
+    def _wait(ticket):
+
+        """
+        Wait until a write is durable, without holding a lock.
+
+        Args:
+            ticket (WriteTicket or None): The ticket of the write, or None if there is nothing to wait for.
+        """
+
+        if ticket is not None:
+            ticket.wait()
+
+    def _write_batch(self, records):
+
+        """
+        Append a batch of queued records to the write-ahead log. Runs on the background writer thread.
+        Once the log passes the threshold, it is forced to disk and rotated, and the users are folded into a fresh snapshot on the compactor thread.
+        Every record of the rotated log was applied before it was queued, so a copy of the users taken now contains all of them.
+
+        Args:
+            records (list): The queued records.
+        """
+
+        self.wal.append_many(records)
+        if self.wal.size() >= self.compact_threshold and not (self._compactor and self._compactor.is_alive()):
+            self.wal.sync()
+            rotated_file = self.wal.rotate()
+            if rotated_file is not None:
+                self._compactor = threading.Thread(target=self._compact, args=(dict(self._users), rotated_file), daemon=True)
+                self._compactor.start()
+
+    def _compact(self, users, rotated_file):
+
+        """
+        Fold a rotated log into a fresh snapshot. Runs on the background compactor thread.
+        The rotated log is only removed once the new snapshot has been atomically written,
+        so a crash at any point is recovered by replaying the rotated log on startup.
+
+        Args:
+            users (dict): A copy of the users, taken when the log was rotated.
+            rotated_file (str): The path of the rotated log file.
+        """
+
+        write_snapshot(self.data_file, users)
+        with suppress(FileNotFoundError):
+            os.remove(rotated_file)
+
+    def close(self):
+
+        """
+        Drain the background writer, so every queued write is written and flushed, wait for a running compaction, close the write-ahead log
+        and release the owner lock.
+        """
+
+        self._writer.close()
+        if self._compactor is not None:
+            self._compactor.join()
+        self.wal.close()
+        os.close(self._owner_fd)
+
+    def after_fork(self):
+
+        """
+        Prepare the store for use in a worker process that was forked after the users were loaded, e.g. by the pre-fork server.
+        The records that an earlier worker appended since the users were loaded are read from the log; if that worker rotated the log,
+        the users are loaded again. The threads do not survive the fork, so a new writer is started.
+        """
+
+        self._stripes = [threading.Lock() for _ in range(len(self._stripes))]
+        self._compactor = None
+        self.wal.reopen()
+        if self.wal.generation == self._generation and not os.path.exists(self.log_file + ROTATED_SUFFIX):
+            records, self._log_offset = read_log(self.log_file, self._log_offset)
+            for record in records:
+                apply_record(self._users, record)
+        else:
+            self._users = self._load()
+        self._writer = BackgroundWriter(self._write_batch, self.wal.sync, *self._writer_options)
+
+    def __contains__(self, username):
+        return username in self._users
+
+    def __len__(self):
+        return len(self._users)
@@ -0,0 +1,740 @@
+import os
+import json
+import time
+import zlib
+import fcntl
+import queue
+import threading
+from contextlib import contextmanager
+
+# Size in bytes after which the write-ahead log is folded into a fresh snapshot
+LOG_COMPACT_THRESHOLD = 64 * 1024 * 1024
+
+# Suffix of the log file that is being folded into a snapshot by the compactor
+ROTATED_SUFFIX = '.1'
+
+# Suffix of the lock file that orders the appends of all processes sharing a log against its rotation
+LOCK_SUFFIX = '.lock'
+
+# Time in seconds between two reads of a LogFollower for records that other processes appended to a shared log
+LOG_FOLLOW_INTERVAL = 0.1
+
+# Names of the durability modes of the background writer:
+# 'sync' acknowledges a mutation once it is on disk (mutations that queued up meanwhile share the fsync), 'group' additionally waits
+# a short window to collect more mutations per fsync, 'async' acknowledges immediately and flushes periodically
+DURABILITY_MODES = ('sync', 'group', 'async')
+
+# Time in seconds during which the background writer collects mutations into one batch in 'group' mode
+GROUP_COMMIT_WINDOW = 0.002
+
+# Time in seconds after which the background writer flushes pending mutations in 'async' mode
+ASYNC_FLUSH_INTERVAL = 1.0
+
+def encode_record(record):
+
+    """
+    Encodes a mutation record as a single checksummed log line.
+    Every line has the form `<crc32 as 8 hex chars> <compact JSON>\\n`, which allows a torn or corrupted record to be detected on replay.
+
+    Args:
+        record (dict): The mutation record to encode.
+
+    Returns:
+        bytes: The encoded log line.
+    """
+
+    payload = json.dumps(record, separators=(',', ':')).encode('utf-8')
+    return b'%08x %s\n' % (zlib.crc32(payload), payload)
+
+def decode_record(line):
+
+    """
+    Decodes a single log line created by encode_record.
+
+    Args:
+        line (bytes): The log line, including the trailing newline.
+
+    Returns:
+        dict or None: The decoded record, or None if the line is torn or its checksum does not match.
+    """
+
+    if not line.endswith(b'\n') or len(line) < 10 or line[8:9] != b' ':
+        return None
+
+    payload = line[9:-1]
+    try:
+        if int(line[:8], 16) != zlib.crc32(payload):
+            return None
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+def read_log(path, offset=0):
+
+    """
+    Reads all intact records from a log file.
+    Reading stops at a torn record at the end of the log, which has no trailing newline. A complete line that is corrupted is skipped:
+    every append starts on a new line, so when a process crashed in the middle of a record, the records that other processes
+    appended to the same log after it are still intact.
+
+    Args:
+        path (str): The path of the log file.
+        offset (int, optional): The position in bytes of the first record to read, e.g. the end of the part that was already read. Defaults to 0.
+
+    Returns:
+        Tuple: A list with the decoded records and the length in bytes of the intact part of the log, including the skipped `offset` bytes.
+    """
+
+    records = []
+    valid_length = offset
+
+    if not os.path.exists(path):
+        return records, 0
+
+    with open(path, 'rb') as file:
+        file.seek(offset)
+        for line in file:
+            if not line.endswith(b'\n'):
+                break
+            record = decode_record(line)
+            if record is not None:
+                records.append(record)
+            valid_length += len(line)
+
+    return records, valid_length
+
+def apply_record(data, record):
+
+    """
+    Applies a single mutation record to a dictionary.
+    Records are idempotent, so replaying a record that is already part of the data leaves the data unchanged.
+    A 'batch' record is written as a single log line, so its mutations are either all replayed or, when the line is torn, none of them.
+
+    Args:
+        data (dict): The dictionary to mutate.
+        record (dict): A record with an 'op' of 'put' (with 'id' and 'value'), 'del' (with 'id') or 'batch' (with a list of 'records').
+    """
+
+    if record['op'] == 'put':
+        data[record['id']] = record['value']
+    elif record['op'] == 'del':
+        data.pop(record['id'], None)
+    elif record['op'] == 'batch':
+        for batch_record in record['records']:
+            apply_record(data, batch_record)
+
+def load_snapshot(path):
+
+    """
+    Loads a JSON snapshot from disk.
+
+    Args:
+        path (str): The path of the snapshot file.
+
+    Returns:
+        dict: The snapshot contents, or an empty dictionary if no snapshot exists.
+    """
+
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, 'r') as file:
+        return json.load(file)
+
+def write_snapshot(path, data):
+
+    """
+    Atomically writes a JSON snapshot to disk.
+    The data is written to a temporary file, flushed to disk and renamed over the old snapshot,
+    so a crash never leaves a half-written snapshot behind. Items are written one by one, so the data does not need to be held in a dictionary.
+
+    Args:
+        path (str): The path of the snapshot file.
+        data (dict or iterator): The data to write, as a dictionary or as (key, value) tuples.
+    """
+
+    items = data.items() if isinstance(data, dict) else data
+    temp_path = f'{path}.{os.urandom(4).hex()}.tmp' # unique, as processes sharing the data file may write snapshots concurrently
+    with open(temp_path, 'w') as file:
+        separator = '{'
+        for key, value in items:
+            file.write(f'{separator}{json.dumps(key)}:{json.dumps(value, separators=(",", ":"))}')
+            separator = ','
+        file.write('}' if separator == ',' else '{}')
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+def read_generation(path):
+
+    """
+    Reads the generation of a log file from its first record.
+
+    Args:
+        path (str): The path of the log file.
+
+    Returns:
+        int: The generation, 0 if the log was not started by a rotation or does not exist.
+    """
+
+    try:
+        with open(path, 'rb') as file:
+            record = decode_record(file.readline())
+    except FileNotFoundError:
+        return 0
+    return record['gen'] if record is not None and record['op'] == 'gen' else 0
+
+class WriteAheadLog:
+
+    """
+    An append-only log of mutation records, which several processes can share, e.g. the workers of the pre-fork server or replicas on a shared volume.
+    Appends hold a lock on a lock file next to the log shared, a rotation holds it exclusively. An append first checks whether the log
+    was rotated by another process and then opens the new log, so no record is ever appended to a log that was already rotated.
+    A log that was started by a rotation begins with a 'gen' record holding its generation, the number of rotations before it.
+
+    Attributes:
+        path (str): The path of the log file.
+        lock_path (str): The path of the lock file.
+        fsync (bool): Whether every append is forced to disk before returning.
+        generation (int): The generation of the log file that is appended to.
+    """
+
+    def __init__(self, path, fsync=False):
+
+        """
+        Initializes a new instance of the WriteAheadLog class. The log is not opened until open() is called.
+
+        Args:
+            path (str): The path of the log file.
+            fsync (bool, optional): Whether every append is forced to disk before returning. Defaults to False.
+        """
+
+        self.path = path
+        self.lock_path = path + LOCK_SUFFIX
+        self.fsync = fsync
+        self.file = None
+        self.generation = 0
+
+    @contextmanager
+    def locked(self, exclusive=False):
+
+        """
+        Holds the lock file of the log, shared or exclusively. Every call opens the lock file on its own,
+        so threads of one process exclude each other like separate processes do. Calls must not be nested.
+
+        Args:
+            exclusive (bool, optional): Whether the lock is held exclusively. Defaults to False.
+        """
+
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+        finally:
+            os.close(fd) # releases the lock
+
+    def open(self):
+
+        """
+        Recovers the log and opens it for appending. A torn record at the end of the log (e.g. after a crash during a write) is cut off,
+        so new records are never appended behind garbage. When other processes share the log, the caller holds the lock exclusively,
+        so a record that another process is still writing is not mistaken for a torn one.
+
+        Returns:
+            List: The intact records of the log, to be replayed by the caller.
+        """
+
+        records = self.recover()
+        self.reopen()
+        return records
+
+    def recover(self):
+
+        """
+        Truncates the log file to its intact prefix.
+
+        Returns:
+            List: The intact records of the log.
+        """
+
+        records, valid_length = read_log(self.path)
+        if os.path.exists(self.path) and os.path.getsize(self.path) != valid_length:
+            with open(self.path, 'r+b') as file:
+                file.truncate(valid_length)
+        return records
+
+    def reopen(self):
+
+        """
+        Opens the current log file again, e.g. in a forked process, so the process appends through a file description of its own,
+        or after another process rotated the log.
+        """
+
+        if self.file is not None:
+            self.file.close()
+        self.file = open(self.path, 'ab')
+        self.generation = read_generation(self.path)
+
+    def _write(self, data):
+
+        """
+        Appends encoded records to the current log file, while holding the lock shared.
+        Every write starts with a newline, so it starts on a line of its own even behind a record that a crashed process left torn.
+
+        Args:
+            data (bytes): The encoded records.
+        """
+
+        with self.locked():
+            if os.fstat(self.file.fileno()).st_ino != os.stat(self.path).st_ino:
+                self.reopen()
+            self.file.write(b'\n' + data)
+            self.file.flush()
+
+    def append(self, record):
+
+        """
+        Appends a single mutation record to the log.
+
+        Args:
+            record (dict): The mutation record to append.
+        """
+
+        self._write(encode_record(record))
+        if self.fsync:
+            os.fsync(self.file.fileno())
+
+    def append_many(self, records):
+
+        """
+        Appends several mutation records to the log with a single write, without forcing them to disk.
+
+        Args:
+            records (list): The mutation records to append.
+        """
+
+        self._write(b''.join(encode_record(record) for record in records))
+
+    def sync(self):
+
+        """
+        Forces the appended records to disk.
+        """
+
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def size(self):
+
+        """
+        Returns the current size of the log in bytes, including the records appended by other processes.
+        """
+
+        return os.fstat(self.file.fileno()).st_size
+
+    def rotate(self):
+
+        """
+        Moves the current log aside and starts a new log of the next generation, while holding the lock exclusively.
+        Once this returns, no process appends to the rotated log anymore.
+
+        Returns:
+            str or None: The path of the rotated log file, or None if the log rotated before, e.g. by another process, has not been compacted yet.
+        """
+
+        rotated_path = self.path + ROTATED_SUFFIX
+        with self.locked(exclusive=True):
+            if os.path.exists(rotated_path):
+                return None
+            generation = read_generation(self.path) + 1
+            os.replace(self.path, rotated_path)
+            self.reopen()
+            self.file.write(encode_record({'op': 'gen', 'gen': generation}))
+            self.file.flush()
+            self.generation = generation
+        return rotated_path
+
+    def rewrite(self, records):
+
+        """
+        Replaces the log with a new log of the next generation that starts with the given records, while holding the lock exclusively.
+        Unlike a rotation, no log is left behind to be compacted: for logs whose state is small enough to be written into the log itself.
+        The new log is written to a temporary file, forced to disk and renamed over the log, so a crash leaves either log complete.
+        Processes that follow the log read the rest of the replaced log and continue with the new one, as after a rotation.
+
+        Args:
+            records (function): Called while the lock is held, returns the records the new log starts with, e.g. the state of the log
+                                after applying all of its records.
+        """
+
+        with self.locked(exclusive=True):
+            generation = read_generation(self.path) + 1
+            temp_path = f'{self.path}.{os.urandom(4).hex()}.tmp'
+            with open(temp_path, 'wb') as file:
+                file.write(encode_record({'op': 'gen', 'gen': generation}) + b''.join(encode_record(record) for record in records()))
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.path)
+            self.reopen()
+
+    def close(self):
+
+        """
+        Closes the log file.
+        """
+
+        self.file.close()
+
+class LogFollower:
+
+    """
+    Follows a log that other processes append to and hands the records they appended to a callback, without reading the log from the start again.
+    A poll reads the complete lines behind the position up to which the log was read; a record that is still being written is read by the next poll.
+    When the log was rotated, the follower reads the rest of the rotated log through the file it holds open and continues at the start of the new log.
+    If the new log is not of the next generation, the log was rotated more than once since the last poll and the records of the skipped generation
+    are only left in the snapshot, so `on_gap` is called to load the whole state again.
+
+    Attributes:
+        path (str): The path of the log file.
+        file (file): The followed log file, opened for reading.
+        offset (int): The position in bytes up to which the followed file was read.
+        generation (int): The generation of the followed file.
+        interval (float): The time in seconds between two polls of the follower thread.
+        errors (int): The number of polls of the follower thread that failed.
+        polled_at (float): The time in epoch seconds of the last poll that completed.
+    """
+
+    def __init__(self, path, apply, on_gap, file, offset, generation, interval=LOG_FOLLOW_INTERVAL):
+
+        """
+        Initializes a new follower. The follower thread is not started until start() is called.
+
+        Args:
+            path (str): The path of the log file.
+            apply (function): Called with a list of the records read by a poll.
+            on_gap (function): Called when a generation was skipped, returns the file, offset and generation to continue from.
+            file (file): The log file, opened for reading, that the caller has read up to `offset`.
+            offset (int): The position in bytes up to which the file was read.
+            generation (int): The generation of the file.
+            interval (float, optional): The time in seconds between two polls of the follower thread. Defaults to LOG_FOLLOW_INTERVAL.
+        """
+
+        self.path = path
+        self.file = file
+        self.offset = offset
+        self.generation = generation
+        self.interval = interval
+        self.errors = 0
+        self.polled_at = 0.0
+        self._apply = apply
+        self._on_gap = on_gap
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll(self):
+
+        """
+        Reads the records that were appended since the last poll and hands them to the callback, following rotations of the log.
+
+        Returns:
+            int: The number of records read.
+        """
+
+        with self._lock:
+            count = self._read()
+            while self._rotated():
+                count += self._read() # the rest of the rotated log, nothing is appended to it once the new log exists
+                file = open(self.path, 'rb')
+                self.file.close()
+                self.file, self.offset = file, 0
+                count += self._read()
+            self.polled_at = time.time()
+            return count
+
+    def _rotated(self):
+
+        """
+        Returns whether the log file was replaced by a rotation since the followed file was opened.
+        """
+
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self.file.fileno()).st_ino
+        except FileNotFoundError: # between the two steps of a rotation
+            return False
+
+    def _read(self):
+
+        """
+        Reads the complete lines behind the current position and hands their records to the callback.
+        The file is read at an explicit position, so forked processes can share the file description they inherited.
+
+        Returns:
+            int: The number of records read.
+        """
+
+        fd = self.file.fileno()
+        data = os.pread(fd, max(os.fstat(fd).st_size - self.offset, 0), self.offset)
+        end = data.rfind(b'\n') + 1
+        self.offset += end
+
+        records = []
+        for line in data[:end].split(b'\n')[:-1]:
+            record = decode_record(line + b'\n')
+            if record is None:
+                continue
+            if record['op'] != 'gen':
+                records.append(record)
+            elif record['gen'] == self.generation + 1:
+                self.generation = record['gen']
+            else:
+                self.file.close()
+                self.file, self.offset, self.generation = self._on_gap()
+                return 0
+        if records:
+            self._apply(records)
+        return len(records)
+
+    def _run(self):
+
+        """
+        The loop of the follower thread.
+        """
+
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception: # e.g. a transient error of a network volume, the next poll retries
+                self.errors += 1
+
+    def start(self):
+
+        """
+        Starts the thread that polls the log every `interval` seconds.
+        """
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+
+        """
+        Stops the follower thread, after its current poll.
+        """
+
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self._stop = threading.Event()
+
+    def after_fork(self):
+
+        """
+        Prepares a follower that was stopped before the process forked for use in the forked process,
+        which reads on from the position of the parent.
+        """
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def close(self):
+
+        """
+        Stops the follower thread and closes the followed file.
+        """
+
+        self.stop()
+        self.file.close()
+
+class WriteTicket:
+
+    """
+    Tracks a mutation that was handed to the background writer, so the caller can wait until it is durable.
+    """
+
+    def __init__(self):
+
+        """
+        Initializes a new, unresolved ticket.
+        """
+
+        self._done = threading.Event()
+        self._error = None
+
+    def resolve(self, error=None):
+
+        """
+        Marks the mutation as durable, or as failed. Called by the writer thread.
+
+        Args:
+            error (Exception, optional): The error that prevented the mutation from being persisted. Defaults to None.
+        """
+
+        self._error = error
+        self._done.set()
+
+    def wait(self):
+
+        """
+        Waits until the mutation is durable.
+
+        Raises:
+            Exception: The error that prevented the mutation from being persisted.
+        """
+
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+
+class BackgroundWriter:
+
+    """
+    Persists mutations on a background thread that is fed by a queue, so request threads do not write files themselves.
+    The thread takes all queued mutations as one batch, writes them with `write_batch` and forces them to disk with `sync`.
+    In 'sync' and 'group' mode a mutation is acknowledged after the sync of its batch; in 'group' mode the thread additionally
+    waits up to `group_window` seconds for more mutations, so one sync covers several of them. In 'async' mode a mutation is
+    acknowledged as soon as it is queued, and written batches are synced every `flush_interval` seconds.
+
+    Attributes:
+        durability (str): 'sync', 'group' or 'async'.
+    """
+
+    _STOP = object()
+
+    def __init__(self, write_batch, sync, durability='sync', group_window=GROUP_COMMIT_WINDOW, flush_interval=ASYNC_FLUSH_INTERVAL):
+
+        """
+        Initializes a new background writer and starts its thread.
+
+        Args:
+            write_batch (function): Called on the writer thread with a list of queued items, in the order they were submitted.
+            sync (function): Called on the writer thread to force the written batches to disk.
+            durability (str, optional): 'sync', 'group' or 'async'. Defaults to 'sync'.
+            group_window (float, optional): The time in seconds to collect a batch in 'group' mode. Defaults to GROUP_COMMIT_WINDOW.
+            flush_interval (float, optional): The time in seconds between syncs in 'async' mode. Defaults to ASYNC_FLUSH_INTERVAL.
+        """
+
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Invalid durability mode: {durability}. Use one of {', '.join(DURABILITY_MODES)}.")
+
+        self.durability = durability
+        self._write_batch = write_batch
+        self._sync = sync
+        self._group_window = group_window
+        self._flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+
+        """
+        Queues an item for the writer thread. Must be called in the order in which the items are to be written.
+
+        Args:
+            item (object): The item, passed to write_batch.
+
+        Returns:
+            WriteTicket or None: A ticket to wait on until the item is durable, or None in 'async' mode.
+
+        Raises:
+            Exception: In 'async' mode, the error that prevented an earlier item from being persisted.
+        """
+
+        if self.durability == 'async':
+            self.check()
+            self._queue.put((item, None))
+            return None
+
+        ticket = WriteTicket()
+        self._queue.put((item, ticket))
+        return ticket
+
+    def check(self):
+
+        """
+        Raises the error that prevented an earlier item from being persisted, in 'async' mode, where no caller waits for the item.
+        In the other modes the error is raised to the callers waiting on the tickets of the failed batch instead. Every error is raised once.
+
+        Raises:
+            Exception: The error of the failed write.
+        """
+
+        if self.durability == 'async' and self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _collect(self, timeout):
+
+        """
+        Collects the next batch of queued items.
+
+        Args:
+            timeout (float or None): The time in seconds to wait for a first item, None to wait indefinitely.
+
+        Returns:
+            Tuple: The list of (item, ticket) tuples and whether the writer was asked to stop.
+        """
+
+        try:
+            batch = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return [], False
+
+        if self.durability == 'group':
+            deadline = time.monotonic() + self._group_window
+            while (remaining := deadline - time.monotonic()) > 0 and batch[-1][0] is not self._STOP:
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+        while batch[-1][0] is not self._STOP:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        stop = batch[-1][0] is self._STOP
+        return (batch[:-1] if stop else batch), stop
+
+    def _run(self):
+
+        """
+        The loop of the writer thread.
+        """
+
+        unsynced = False
+        next_flush = time.monotonic() + self._flush_interval
+        while True:
+            timeout = max(next_flush - time.monotonic(), 0) if unsynced else None
+            batch, stop = self._collect(timeout)
+            error = None
+            try:
+                if batch:
+                    self._write_batch([item for item, _ in batch])
+                    unsynced = True
+                if unsynced and (self.durability != 'async' or stop or time.monotonic() >= next_flush):
+                    self._sync()
+                    unsynced = False
+                    next_flush = time.monotonic() + self._flush_interval
+            except Exception as e: # handed to the waiting request threads
+                error = e
+                self._error = e
+            for _, ticket in batch:
+                if ticket is not None:
+                    ticket.resolve(error)
+            if stop:
+                return
+
+    def close(self):
+
+        """
+        Drains the queue, writes and syncs every pending item and stops the writer thread.
+        """
+
+        self._queue.put((self._STOP, None))
+        self._thread.join()
@@ -1,6 +1,14 @@
 import sys
-from main_modules.auth import AuthService
-from main_modules.shortener import URLShortenerService
+import json
+import time
+import signal
+import uvicorn
+from main_modules.auth import AuthService, USERS_FILE
+from helper_modules.user_helpers import UserStore
+from main_modules.shortener import URLShortenerService, DATA_FILE
+from main_modules.shortener_asgi import URLShortenerASGI
+from helper_modules.snapshot_helpers import convert_snapshot
+from helper_modules.server_helpers import PreforkServer, WORKERS
 
 # Specify port for url_shortener_service
 url_port = 3000
@@ -8,9 +16,110 @@ url_port = 3000
 # Specify port for auth_service
 auth_port = 3001
 
+def serve(service_name, workers=WORKERS):
+
+    """
+    Serve a service in production with the pre-fork server. The service and its data are loaded once, before the workers are forked.
+    The auth service keeps its users in the memory of its worker, so it is served by a single worker. The users are loaded in the master,
+    and a worker that replaces a recycled one reads the writes of its predecessor from the log of the user store.
+
+    Args:
+        service_name (str): 'url_shortener' or 'auth_service'.
+        workers (int, optional): The number of worker processes of the URL shortener. Defaults to WORKERS.
+    """
+
+    if service_name == "url_shortener":
+        auth_service = AuthService(None)
+        url_shortener_service = URLShortenerService(auth_service)
+        url_shortener_service.check_prefork(workers)
+
+        def before_fork():
+            url_shortener_service.before_fork()
+            auth_service.before_fork()
+
+        def after_fork():
+            url_shortener_service.after_fork()
+            auth_service.after_fork()
+
+        def on_exit():
+            url_shortener_service.close()
+            auth_service.close()
+
+        server = PreforkServer(url_shortener_service.app, url_port, workers, before_fork=before_fork, after_fork=after_fork, on_exit=on_exit)
+    elif service_name == "auth_service":
+        url_shortener_service = URLShortenerService(None)
+        url_shortener_service.check_prefork(1)
+        auth_service = AuthService(url_shortener_service)
+        auth_service.get_user_store()
+
+        def before_fork():
+            url_shortener_service.before_fork()
+            auth_service.before_fork()
+
+        def after_fork():
+            url_shortener_service.after_fork()
+            auth_service.after_fork()
+
+        def on_exit():
+            auth_service.close()
+            url_shortener_service.close()
+
+        server = PreforkServer(auth_service.app, auth_port, 1, before_fork=before_fork, after_fork=after_fork, on_exit=on_exit)
+    else:
+        raise ValueError(f"Invalid service name: {service_name}. Use 'url_shortener' or 'auth_service'.")
+    server.run()
+
+def read_users(path):
+
+    """
+    Read the users to import from a file with one JSON object per line, e.g. {"username": "...", "password": "...", "role": "regular"}.
+    A line that is not valid JSON is passed on as None, so it is reported as an invalid record.
+
+    Args:
+        path (str): The path of the file.
+
+    Yields:
+        dict or None: The user of every non-empty line.
+    """
+
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield None
+
+def import_users(path):
+
+    """
+    Import the users of a file into the user store. The store is opened exclusively, so the import refuses to start while the auth service
+    is running, and the auth service refuses to start during the import.
+    Every rejected record is printed with its number (counting the non-empty lines), followed by a summary.
+
+    Args:
+        path (str): The path of the file, with one JSON object per line.
+    """
+
+    auth_service = AuthService(None, user_store=UserStore(USERS_FILE, exclusive=True))
+    counts = {'created': 0, 'duplicate': 0, 'invalid': 0}
+    start = time.perf_counter()
+    try:
+        for number, result in enumerate(auth_service.import_users(read_users(path)), start=1):
+            counts[result['status']] += 1
+            if result['status'] != 'created':
+                print(json.dumps({'record': number, **result}))
+    finally:
+        auth_service.close()
+    print(f"Imported {counts['created']} users in {time.perf_counter() - start:.1f} s, "
+          f"skipped {counts['duplicate']} duplicates and {counts['invalid']} invalid records.", file=sys.stderr)
+
 def main():
     service_name = sys.argv[1]
 
+    # Stop on SIGTERM (e.g. `docker stop`) the same way as on Ctrl+C, so the services shut down gracefully and flush pending writes
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
     if service_name == "url_shortener":
         auth_service = AuthService(None)
         url_shortener_service = URLShortenerService(auth_service)
@@ -18,9 +127,24 @@ def main():
     elif service_name == "auth_service":
         url_shortener_service = URLShortenerService(None)
         auth_service = AuthService(url_shortener_service)
-        auth_service.run(debug=True, port=auth_port, use_reloader=False)
+        try:
+            auth_service.run(debug=True, port=auth_port, use_reloader=False)
+        finally:
+            auth_service.close()
+            url_shortener_service.close()
+    elif service_name == "url_shortener_asgi":
+        url_shortener_service = URLShortenerService(AuthService(None))
+        uvicorn.run(URLShortenerASGI(url_shortener_service), host='0.0.0.0', port=url_port)
+    elif service_name == "serve":
+        serve(sys.argv[2] if len(sys.argv) > 2 else "url_shortener")
+    elif service_name == "convert_snapshot":
+        data_file = sys.argv[2] if len(sys.argv) > 2 else DATA_FILE
+        snapshot_format = convert_snapshot(data_file)
+        print(f"Converted {data_file} to the {snapshot_format} snapshot format.")
+    elif service_name == "import_users":
+        import_users(sys.argv[2])
     else:
-        print("Invalid service name. Use 'url_shortener' or 'auth_service'.")
+        print("Invalid service name. Use 'url_shortener', 'url_shortener_asgi', 'auth_service', 'serve', 'convert_snapshot' or 'import_users'.")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -1,14 +1,295 @@
 from flask import Flask, request, jsonify
 import secrets
 import os
+import time
+import threading
 from functools import wraps
-from helper_modules.auth_helpers import hash_password, is_password_strong, is_username_valid, jwt_decode, generate_jwt_token
+from helper_modules.user_helpers import UserStore
+from helper_modules.wal_helpers import WriteAheadLog, LogFollower, LOG_FOLLOW_INTERVAL, read_log, read_generation
+from helper_modules.auth_helpers import PasswordHasher, HasherOverloaded, is_password_strong, is_username_valid, generate_jwt_token, is_token_expired, TokenCache, SigningContext, DEFAULT_KID, DAYS_EXPIRE, load_signing_context
 
 # Get the jwt secret from environment variable, or generate for jwt token
 JWT_SECRET = os.environ.get("JWT_SECRET", secrets.token_urlsafe(64))
 
-# User Database
-USER_DATA = {}
+# Get the path of a JSON file with the JWT signing keys from an environment variable, which is reloaded when it changes.
+# Without a key file, tokens are signed with JWT_SECRET only
+JWT_KEYS_FILE = os.environ.get("JWT_KEYS_FILE")
+
+# Set the minimum number of seconds between two checks of the key file for changes
+JWT_KEYS_RELOAD_INTERVAL = float(os.environ.get("JWT_KEYS_RELOAD_INTERVAL", 1))
+
+# Set the maximum number of tokens per batch verification request
+MAX_VERIFY_BATCH_SIZE = int(os.environ.get("MAX_VERIFY_BATCH_SIZE", 10000))
+
+# Set the minimum number of seconds between two prunings of revocations whose tokens have expired
+REVOCATION_PRUNE_INTERVAL = float(os.environ.get("REVOCATION_PRUNE_INTERVAL", 60))
+
+# Get the path of the log of the revocations from an environment variable. Every service that validates tokens follows it,
+# so it must be on a volume that the auth service and the URL shortener share
+REVOCATIONS_FILE = os.environ.get("REVOCATIONS_FILE", "revocation_data/revocations.log")
+
+# Size in bytes by which the log of the revocations grows before it is rewritten with only the revocations that have not expired
+REVOCATION_LOG_COMPACT_THRESHOLD = int(os.environ.get("REVOCATION_LOG_COMPACT_THRESHOLD", 4 * 1024 * 1024))
+
+# Get the path of the snapshot of the users from an environment variable, next to which the write-ahead log of the users is kept
+USERS_FILE = os.environ.get("USERS_FILE", "user_data/users.json")
+
+# Set the maximum number of users per bulk import request
+MAX_IMPORT_BATCH_SIZE = int(os.environ.get("MAX_IMPORT_BATCH_SIZE", 10000))
+
+# Set the number of users an import validates, hashes and commits at a time
+IMPORT_CHUNK_SIZE = int(os.environ.get("IMPORT_CHUNK_SIZE", 1000))
+
+class RevocationList:
+
+    """
+    The tokens revoked before they expire: single tokens by their token ID ('jti'), e.g. on logout, and all tokens of a user
+    issued before a cutoff ('iat'), e.g. when the password changes.
+    Checks never take the lock: revocations are added to the dictionaries under the lock, and pruning replaces them as a whole,
+    so a check of a token that is not revoked costs one or two dictionary lookups, and none while nothing is revoked.
+    A revocation is kept until the tokens it revokes have expired: a token until its 'exp', a cutoff until DAYS_EXPIRE days after it.
+    The expired revocations are dropped when a token is revoked and REVOCATION_PRUNE_INTERVAL seconds have passed since the last pruning.
+
+    With a log file, every revocation is appended to a write-ahead log and forced to disk before it is acknowledged, and a LogFollower
+    applies the revocations that other processes append, e.g. the auth service revoking a token that the URL shortener validates.
+    Revocations only accumulate until they expire and applying one twice changes nothing, so a process applies its own records again
+    when it reads them back. The log is not folded into a snapshot: once it has grown by the threshold, it is rewritten with the revocations
+    that have not expired, so loading the list only reads the log.
+
+    Attributes:
+        log_file (str or None): The path of the log, None to keep the revocations in memory only.
+        compact_threshold (int): The size in bytes by which the log grows before it is rewritten.
+    """
+
+    def __init__(self, log_file=None, compact_threshold=REVOCATION_LOG_COMPACT_THRESHOLD, follow_interval=LOG_FOLLOW_INTERVAL):
+
+        """
+        Initializes a new revocation list and loads the revocations of its log.
+
+        Args:
+            log_file (str, optional): The path of the log. Defaults to None, to keep the revocations in memory only.
+            compact_threshold (int, optional): The size in bytes by which the log grows before it is rewritten. Defaults to REVOCATION_LOG_COMPACT_THRESHOLD.
+            follow_interval (float, optional): The time in seconds between two reads of the log for the revocations of other processes.
+                                               Defaults to LOG_FOLLOW_INTERVAL.
+        """
+
+        self._tokens = {} # expiry of every revoked token by token ID
+        self._users = {} # cutoff and expiry of the cutoff by username
+        self._lock = threading.Lock()
+        self._pruned_at = time.time()
+        self.log_file = log_file
+        self.compact_threshold = compact_threshold
+        self._rewritten_size = 0 # size of the log after the last rewrite of this process, so the live revocations alone never trigger one
+        self.wal = None
+        self._follower = None
+        if log_file is not None:
+            self._load(follow_interval)
+
+    def _load(self, follow_interval):
+
+        """
+        Load the revocations of the log and start following it. The log is locked exclusively meanwhile,
+        so other processes neither rewrite it nor append to it.
+
+        Args:
+            follow_interval (float): The time in seconds between two reads of the log.
+        """
+
+        os.makedirs(os.path.dirname(self.log_file) or '.', exist_ok=True)
+        self.wal = WriteAheadLog(self.log_file, fsync=True)
+        with self.wal.locked(exclusive=True):
+            records = self.wal.open()
+            follow_file, offset = open(self.log_file, 'rb'), self.wal.size()
+        for record in records:
+            self._apply(record)
+        self._follower = LogFollower(self.log_file, self._apply_followed, self._reload, follow_file, offset, self.wal.generation, follow_interval)
+        self._follower.start()
+
+    def _apply(self, record):
+
+        """
+        Apply a revocation record. Must be called with the lock held, or while loading.
+        A user keeps the latest of its cutoffs, so records of several processes can be applied in any order.
+
+        Args:
+            record (dict): A record with an 'op' of 'token' (with 'id' and 'exp', None for a token without expiry),
+                           'user' (with 'id' and 'cutoff') or 'batch' (with a list of 'records').
+        """
+
+        if record['op'] == 'token':
+            self._tokens[record['id']] = float('inf') if record['exp'] is None else record['exp']
+        elif record['op'] == 'user':
+            revocation = self._users.get(record['id'])
+            if revocation is None or revocation[0] < record['cutoff']:
+                self._users[record['id']] = (record['cutoff'], record['cutoff'] + DAYS_EXPIRE * 86400)
+        elif record['op'] == 'batch':
+            for batch_record in record['records']:
+                self._apply(batch_record)
+
+    def _revoke(self, record):
+
+        """
+        Apply a new revocation and persist it before returning. Once the log has grown by the threshold, it is rewritten
+        with the revocations that have not expired.
+
+        Args:
+            record (dict): The revocation record.
+        """
+
+        with self._lock:
+            self._prune()
+            self._apply(record)
+            if self.wal is None:
+                return
+            self.wal.append(record)
+            if self.wal.size() >= self._rewritten_size + self.compact_threshold:
+                self.wal.rewrite(self._live_records)
+                self._rewritten_size = self.wal.size()
+
+    def _live_records(self):
+
+        """
+        Apply the whole log, which may hold revocations of other processes that the follower has not read yet, and return the revocations
+        that have not expired. Called by the log rewrite with the lock of the log held exclusively, and with the lock of the list held.
+
+        Returns:
+            list: A single 'batch' record with the revocations that have not expired.
+        """
+
+        for record in read_log(self.log_file)[0]:
+            self._apply(record)
+        now = time.time()
+        records = [{'op': 'token', 'id': jti, 'exp': None if exp == float('inf') else exp} for jti, exp in self._tokens.items() if exp > now]
+        records += [{'op': 'user', 'id': username, 'cutoff': cutoff} for username, (cutoff, expiry) in self._users.items() if expiry > now]
+        return [{'op': 'batch', 'records': records}]
+
+    def revoke_token(self, payload):
+
+        """
+        Revokes a single token until it expires.
+
+        Args:
+            payload (dict): The decoded payload of the token.
+
+        Returns:
+            bool: True if the token was revoked, False if it has no token ID.
+        """
+
+        jti = payload.get('jti')
+        if not isinstance(jti, str):
+            return False
+        self._revoke({'op': 'token', 'id': jti, 'exp': payload.get('exp')})
+        return True
+
+    def revoke_user(self, username, cutoff=None):
+
+        """
+        Revokes all tokens of a user issued before a cutoff. Tokens without 'iat' count as issued before any cutoff.
+
+        Args:
+            username (str): The username.
+            cutoff (float, optional): The cutoff in epoch seconds. Defaults to the current time.
+        """
+
+        self._revoke({'op': 'user', 'id': username, 'cutoff': time.time() if cutoff is None else cutoff})
+
+    def is_revoked(self, payload):
+
+        """
+        Checks whether a token is revoked.
+
+        Args:
+            payload (dict): The decoded payload of the token.
+
+        Returns:
+            bool: True if the token is revoked, False otherwise.
+        """
+
+        tokens, users = self._tokens, self._users
+        if tokens and payload.get('jti') in tokens:
+            return True
+        if users:
+            revocation = users.get(payload.get('sub'))
+            return revocation is not None and payload.get('iat', 0) < revocation[0]
+        return False
+
+    def _prune(self):
+
+        """
+        Drops the revocations whose tokens have expired, if the pruning interval has passed. Must be called with the lock held.
+        """
+
+        now = time.time()
+        if now - self._pruned_at < REVOCATION_PRUNE_INTERVAL:
+            return
+        self._pruned_at = now
+        self._tokens = {jti: exp for jti, exp in self._tokens.items() if exp > now}
+        self._users = {username: revocation for username, revocation in self._users.items() if revocation[1] > now}
+
+    def _apply_followed(self, records):
+
+        """
+        Apply the revocation records that the follower read from the log. Runs on the follower thread.
+
+        Args:
+            records (list): The revocation records, in log order.
+        """
+
+        with self._lock:
+            for record in records:
+                self._apply(record)
+
+    def _reload(self):
+
+        """
+        Read the whole log again, when the follower skipped a generation of the log. Runs on the follower thread.
+        A rewritten log starts with the revocations of the log it replaced, so it holds every revocation that has not expired.
+
+        Returns:
+            tuple: The log file opened for reading, the length of the part that was read and its generation, to continue following from.
+        """
+
+        with self.wal.locked():
+            records, offset = read_log(self.log_file)
+            follow_file = open(self.log_file, 'rb')
+            generation = read_generation(self.log_file)
+        self._apply_followed(records)
+        return follow_file, offset, generation
+
+    def before_fork(self):
+
+        """
+        Stop the follower thread before the process forks, so it holds no lock in the forked process.
+        """
+
+        if self._follower is not None:
+            self._follower.stop()
+
+    def after_fork(self):
+
+        """
+        Prepare the list for use in a forked worker process: the log is opened again and followed from the position of the parent.
+        Also called in the parent, to start following again.
+        """
+
+        self._lock = threading.Lock()
+        if self._follower is not None:
+            self.wal.reopen()
+            self._follower.after_fork()
+            self._follower.start()
+
+    def close(self):
+
+        """
+        Stop following the log and close it.
+        """
+
+        if self._follower is not None:
+            self._follower.close()
+            self.wal.close()
+
+    def __len__(self):
+        return len(self._tokens) + len(self._users)
 
 class AuthService:
 
@@ -18,18 +299,46 @@ class AuthService:
 
     Attributes:
         url_shortener_app (Flask): The Flask application instance to which the authentication routes will be added.
+        token_cache (TokenCache): The cache of verified tokens.
+        keys_file (str or None): The path of the JSON file with the JWT signing keys, None to sign with JWT_SECRET only.
+        password_hasher (PasswordHasher): Hashes and verifies the passwords.
+        users_file (str): The path of the snapshot of the user store.
+        revocations_file (str or None): The path of the log of the revocations, None to keep the revocations in memory only.
     """
 
-    def __init__(self, url_shortener_app):
+    def __init__(self, url_shortener_app, keys_file=JWT_KEYS_FILE, password_hasher=None, users_file=USERS_FILE, user_store=None,
+                 revocations_file=REVOCATIONS_FILE):
 
         """
         Initializes a new instance of the AuthService class.
 
         Args:
             url_shortener_app (Flask): The Flask application instance to which the authentication routes will be added.
+            keys_file (str, optional): The path of the JSON file with the JWT signing keys. Defaults to JWT_KEYS_FILE.
+            password_hasher (PasswordHasher, optional): Hashes and verifies the passwords. Defaults to a hasher with the configured backend.
+            users_file (str, optional): The path of the snapshot of the user store. Defaults to USERS_FILE.
+            user_store (UserStore, optional): The user store. Defaults to a store of `users_file` that is loaded on first use.
+            revocations_file (str, optional): The path of the log of the revocations, shared by all services that validate tokens.
+                                              Defaults to REVOCATIONS_FILE.
         """
 
         self.url_shortener_app = url_shortener_app
+        self.token_cache = TokenCache()
+        self.keys_file = keys_file
+        self.password_hasher = password_hasher if password_hasher is not None else PasswordHasher()
+        self.users_file = users_file
+        self._user_store = user_store
+        self._user_store_lock = threading.Lock()
+        self.revocations_file = revocations_file
+        self._revocations = None
+        self._revocations_lock = threading.Lock()
+        self._keys_lock = threading.Lock()
+        self._keys_checked_at = time.monotonic()
+        if keys_file is None:
+            self._signing_context = SigningContext({DEFAULT_KID: JWT_SECRET})
+        else:
+            self._keys_mtime = os.stat(keys_file).st_mtime_ns
+            self._signing_context = load_signing_context(keys_file)
         self.app = Flask(__name__)
         self.setup_routes()
 
@@ -41,7 +350,25 @@ class AuthService:
 
         self.app.add_url_rule('/users', 'create_user', self.create_user, methods=['POST'])
         self.app.add_url_rule('/users', 'update_password', self.update_password, methods=['PUT'])
+        self.app.add_url_rule('/users/bulk', 'import_users', self.import_users_request, methods=['POST'])
         self.app.add_url_rule('/users/login', 'login', self.login, methods=['POST'])
+        self.app.add_url_rule('/tokens/verify', 'verify_tokens', self.verify_tokens, methods=['POST'])
+        self.app.add_url_rule('/tokens/revoke', 'revoke_token', self.revoke_token, methods=['POST'])
+        self.app.register_error_handler(HasherOverloaded, self.handle_overload)
+
+    def handle_overload(self, error):
+
+        """
+        Rejects a request whose password could not be hashed because the queue of the password hasher is full.
+
+        Args:
+            error (HasherOverloaded): The error.
+
+        Returns:
+            Tuple: A tuple containing the HTTP response, status code and headers.
+        """
+
+        return jsonify({'error': 'Server busy, try again later'}), 503, {'Retry-After': '1'}
 
     def require_auth(f):
 
@@ -72,29 +399,203 @@ class AuthService:
 
         return decorated_function
     
+    def get_signing_context(self):
+
+        """
+        Returns the signing context, reloading the key file at most every JWT_KEYS_RELOAD_INTERVAL seconds when it has changed,
+        so keys can be rotated without a restart. A key file that cannot be loaded (e.g. while it is being rewritten) is retried later.
+        The token cache is cleared on reload, so tokens signed with a removed key are no longer accepted.
+
+        Returns:
+            SigningContext: The current signing context.
+        """
+
+        if self.keys_file is None or time.monotonic() - self._keys_checked_at < JWT_KEYS_RELOAD_INTERVAL:
+            return self._signing_context
+
+        with self._keys_lock:
+            if time.monotonic() - self._keys_checked_at >= JWT_KEYS_RELOAD_INTERVAL:
+                self._keys_checked_at = time.monotonic()
+                try:
+                    mtime = os.stat(self.keys_file).st_mtime_ns
+                    if mtime != self._keys_mtime:
+                        self._signing_context = load_signing_context(self.keys_file)
+                        self._keys_mtime = mtime
+                        self.token_cache.clear()
+                except (OSError, ValueError, KeyError):
+                    pass
+
+        return self._signing_context
+
+    def get_user_store(self):
+
+        """
+        Returns the user store, which is loaded on first use, so services that only validate tokens (e.g. the URL shortener) do not load the users.
+
+        Returns:
+            UserStore: The user store.
+        """
+
+        if self._user_store is None:
+            with self._user_store_lock:
+                if self._user_store is None:
+                    self._user_store = UserStore(self.users_file)
+        return self._user_store
+
+    @property
+    def revocations(self):
+
+        """
+        The tokens revoked before they expire. The revocation list is loaded on first use, so it is loaded in the worker processes
+        that validate tokens, and processes that never validate a token (e.g. an import) do not follow its log.
+
+        Returns:
+            RevocationList: The revocation list.
+        """
+
+        if self._revocations is None:
+            with self._revocations_lock:
+                if self._revocations is None:
+                    self._revocations = RevocationList(self.revocations_file)
+        return self._revocations
+
     def validate_jwt(self, token):
         
         """
         Validates a JWT token and returns the decoded payload if valid.
+        Verified tokens are cached until they expire, so a token that is sent again is not decoded and verified again.
+        Revocation is checked on every call, also for cached tokens.
 
         Args:
             token (str): The JWT token to validate.
 
         Returns:
-            Dict or None: The decoded JWT payload if the token is valid, None otherwise.
+            Dict or None: The decoded JWT payload if the token is valid, not expired and not revoked, None otherwise.
         """
 
-        payload = jwt_decode(token, JWT_SECRET)
+        signing_context = self.get_signing_context() # reloads rotated keys and clears the token cache first
+        payload = self.token_cache.get(token)
         if payload is None:
-            return None
-        else:
-            return payload
+            payload = signing_context.decode(token)
+            if payload is None or is_token_expired(payload):
+                return None
+            if signing_context is self._signing_context: # not verified with keys that were replaced in the meantime
+                self.token_cache.put(token, payload)
+
+        return None if self.revocations.is_revoked(payload) else payload
+
+    def validate_jwts(self, tokens):
+
+        """
+        Validates a batch of JWT tokens with one signing context and one clock reading, so the tokens of a batch are all judged by the same keys and time.
+        Tokens found in the token cache are not verified again, and a token repeated within the batch is verified once.
+
+        Args:
+            tokens (list): The JWT tokens to validate.
+
+        Returns:
+            list: A result per token, in the order of the tokens: {'status': 'valid', 'payload': ...} for a valid token, or the reason it is rejected,
+                  {'status': 'expired'}, {'status': 'revoked'}, {'status': 'invalid_signature'}, {'status': 'unknown_key'} or {'status': 'malformed'}.
+        """
+
+        signing_context = self.get_signing_context() # reloads rotated keys and clears the token cache first
+        cacheable = signing_context is self._signing_context # not verified with keys that were replaced in the meantime
+        now = time.time()
+        results = {}
+        for token in tokens:
+            if not isinstance(token, str) or token in results:
+                continue
+
+            payload, status = self.token_cache.get(token), 'valid'
+            if payload is None:
+                payload, status = signing_context.verify(token)
+                if payload is not None and is_token_expired(payload, now):
+                    status = 'expired'
+                elif payload is not None and cacheable:
+                    self.token_cache.put(token, payload)
+            if status == 'valid' and self.revocations.is_revoked(payload):
+                status = 'revoked'
+            results[token] = {'status': 'valid', 'payload': payload} if status == 'valid' else {'status': status}
+
+        return [results[token] if isinstance(token, str) else {'status': 'malformed'} for token in tokens]
+
+    def verify_tokens(self):
+
+        """
+        Verifies a list of JWT tokens in a single request, so a gateway that has to check many tokens pays for one request instead of one per token.
+        The route is public, like login: a token is only decoded for whoever already holds it.
+
+        Returns:
+            Tuple: A tuple containing the JSON response with a result per token, in the order of the request,
+                   with the decoded payload of a valid token or the reason a token is rejected, and the HTTP status code.
+        """
+
+        data = request.get_json()
+        if data is None:
+            return jsonify({'error': 'Invalid JSON'}), 400
+        tokens = data.get('tokens') if isinstance(data, dict) else None
+        if not isinstance(tokens, list):
+            return jsonify({'error': 'A list of tokens is required'}), 400
+        if len(tokens) > MAX_VERIFY_BATCH_SIZE:
+            return jsonify({'error': f'At most {MAX_VERIFY_BATCH_SIZE} tokens per request'}), 400
+
+        return jsonify({'results': self.validate_jwts(tokens)}), 200
+
+    @require_auth
+    def revoke_token(self, decoded_payload):
+
+        """
+        Revokes the token the request is authorized with, e.g. on logout, so it is rejected from now on although it has not expired.
+
+        Returns:
+            Tuple: A tuple containing the HTTP response and status code.
+        """
+
+        if not self.revocations.revoke_token(decoded_payload):
+            return jsonify({'error': 'Token has no ID and cannot be revoked'}), 400
+        return '', 204
+
+    @staticmethod
+    def validate_user(username, password, role):
+
+        """
+        Validates the username, password and role of a new user.
+
+        Args:
+            username (str): The username.
+            password (str): The password.
+            role (str): The role, 'admin' or 'regular'.
+
+        Returns:
+            str or None: The reason the user is rejected, or None if the user is valid.
+        """
+
+        if username is None:
+            return 'Username is required'
+
+        if not isinstance(username, str) or not is_username_valid(username):
+            return 'Invalid username. Must be at least 5 characters long and contain only alphanumeric characters and underscores'
+
+        if password is None:
+            return 'Password is required'
+
+        if not isinstance(password, str) or not is_password_strong(password):
+            return 'Password must be at least 8 characters long, contain an uppercase letter, a lowercase letter, and a digit'
+
+        if role is None or not isinstance(role, str) or role.strip() == '':
+            return 'Role is required'
+
+        if role not in ['admin', 'regular']:
+            return 'Invalid role'
+
+        return None
 
     def create_user(self):
 
         """
         Creates a new user with the provided username and password. 
-        When a user creates an account, the password they provide is hashed and stored in a dictionary to be later used for authentication. 
+        When a user creates an account, the password they provide is hashed and stored in the user store to be later used for authentication. 
+        A taken username is rejected before the password is hashed; of concurrent requests for the same new username, the user store lets exactly one succeed.
 
         Returns:
             Tuple: A tuple containing the HTTP response and status code.
@@ -109,33 +610,107 @@ class AuthService:
         password = data.get('password')
         role = data.get('role', 'regular') # the role is 'regular' by default
 
-        if username is None:
-            return jsonify({'error': 'Username is required'}), 400
-        
-        if not is_username_valid(username):
-            return jsonify({'error': 'Invalid username. Must be at least 5 characters long and contain only alphanumeric characters and underscores'}), 400
+        error = self.validate_user(username, password, role)
+        if error is not None:
+            return jsonify({'error': error}), 400
 
-        if password is None:
-            return jsonify({'error': 'Password is required'}), 400
-        
-        if not is_password_strong(password):
-            return jsonify({'error': 'Password must be at least 8 characters long, contain an uppercase letter, a lowercase letter, and a digit'}), 400
-        
-        if role is None or role.strip() == '':
-            return jsonify({'error': 'Role is required'}), 400
+        users = self.get_user_store()
+        if username in users or not users.create(username, self.password_hasher.hash(password), role):
+            return jsonify({'error': 'Username already exists'}), 409
 
-        if role not in ['admin', 'regular']:
-            return jsonify({'error': 'Invalid role'}), 400
+        return '', 201
 
-        if username in USER_DATA:
-            return jsonify({'error': 'Username already exists'}), 409
+    def import_users(self, records, chunk_size=IMPORT_CHUNK_SIZE):
 
-        USER_DATA[username] = {
-            'password': hash_password(password),
-            'role': role
-        }
+        """
+        Imports a stream of users, e.g. when an existing user base is migrated, in chunks of `chunk_size` users.
+        The users of a chunk are validated first, and taken usernames, also by an earlier record of the stream, are rejected before any password is hashed.
+        The passwords of the remaining users are hashed in one call, spread over the worker processes of the password hasher,
+        and the new users are committed with a single write of the user store. Only one chunk is held in memory at a time.
 
-        return '', 201
+        Args:
+            records (iterable): The users, as dicts with a 'username', a 'password' and an optional 'role' ('regular' by default);
+                                any other item is rejected as an invalid record.
+            chunk_size (int, optional): The number of users per chunk. Defaults to IMPORT_CHUNK_SIZE.
+
+        Yields:
+            dict: A result per record, in the order of the records, with the 'username' and a 'status' of 'created', 'duplicate' or 'invalid',
+                  and the reason an invalid record is rejected as 'error'.
+        """
+
+        users = self.get_user_store()
+        chunk = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                yield from self._import_chunk(users, chunk)
+                chunk = []
+        if chunk:
+            yield from self._import_chunk(users, chunk)
+
+    def _import_chunk(self, users, records):
+
+        """
+        Validates, hashes and commits a chunk of an import.
+
+        Args:
+            users (UserStore): The user store.
+            records (list): The records of the chunk.
+
+        Returns:
+            list: A result per record, see import_users.
+        """
+
+        results = []
+        new_users = {} # maps every username to create to its position in the chunk
+        for position, record in enumerate(records):
+            if not isinstance(record, dict):
+                results.append({'username': None, 'status': 'invalid', 'error': 'Invalid record'})
+                continue
+            username = record.get('username')
+            error = self.validate_user(username, record.get('password'), record.get('role', 'regular'))
+            if error is not None:
+                results.append({'username': username, 'status': 'invalid', 'error': error})
+            elif username in users or username in new_users:
+                results.append({'username': username, 'status': 'duplicate'})
+            else:
+                new_users[username] = position
+                results.append(None)
+
+        password_hashes = self.password_hasher.hash_many([records[position]['password'] for position in new_users.values()])
+        created = users.create_many([(username, password_hash, records[position].get('role', 'regular'))
+                                     for (username, position), password_hash in zip(new_users.items(), password_hashes)])
+        for (username, position), is_created in zip(new_users.items(), created):
+            results[position] = {'username': username, 'status': 'created' if is_created else 'duplicate'}
+
+        return results
+
+    @require_auth
+    def import_users_request(self, decoded_payload):
+
+        """
+        Imports a list of users in a single request. Only admins may import users.
+        Each user is validated like on sign-up and a result is reported per user, so invalid or taken users do not fail the rest of the request.
+        Larger imports, e.g. of a whole user base, are run offline with `python main.py import_users`.
+
+        Returns:
+            Tuple: A tuple containing the JSON response with a result per user, in the order of the request,
+                   with a status of 'created', 'duplicate' or 'invalid', and the HTTP status code.
+        """
+
+        if decoded_payload.get('role') != 'admin':
+            return jsonify({'error': 'Admin privileges required'}), 403
+
+        data = request.get_json()
+        if data is None:
+            return jsonify({'error': 'Invalid JSON'}), 400
+        records = data.get('users') if isinstance(data, dict) else None
+        if not isinstance(records, list):
+            return jsonify({'error': 'A list of users is required'}), 400
+        if len(records) > MAX_IMPORT_BATCH_SIZE:
+            return jsonify({'error': f'At most {MAX_IMPORT_BATCH_SIZE} users per request'}), 400
+
+        return jsonify({'results': list(self.import_users(records))}), 200
 
     def login(self):
 
@@ -143,6 +718,8 @@ class AuthService:
         Authenticates a user with the provided username and password and return the generated a JWT token.
         When a user logs in, their provided password is hashed, and the resulting hash value is compared with the stored hash value for the corresponding username. 
         If the hash values match, the user is authenticated.
+        A stored hash of another backend or cost than the configured one (e.g. a legacy HMAC hash) is replaced by a new hash of the password,
+        unless the password hasher is overloaded, then it is replaced on a later login, or the password was changed in the meantime.
 
         Returns:
             Tuple: A tuple containing the JSON response with the 'access_token' key, the corresponding JWT token as value, and the HTTP status code.
@@ -161,17 +738,24 @@ class AuthService:
         if password is None:
             return jsonify({'error': 'Password is required'}), 400
 
-        if username not in USER_DATA:
+        users = self.get_user_store()
+        user = users.get(username)
+        if user is None:
             return jsonify({'error': 'User not found'}), 403
 
-        stored_password = USER_DATA[username]['password']
-        provided_hash_password = hash_password(password)
+        stored_password = user['password']
 
-        if stored_password != provided_hash_password:
+        if not self.password_hasher.verify(password, stored_password):
             return jsonify({'error': 'Invalid credentials'}), 403
 
+        if self.password_hasher.needs_upgrade(stored_password):
+            try:
+                users.set_password(username, self.password_hasher.hash(password), expected=stored_password)
+            except HasherOverloaded:
+                pass
+
         # Generate JWT token
-        token = generate_jwt_token(username, USER_DATA[username]['role'], JWT_SECRET)
+        token = generate_jwt_token(username, user['role'], self.get_signing_context())
 
         return jsonify({'access_token': token}), 200
         
@@ -180,6 +764,7 @@ class AuthService:
 
         """
         Updates the password of the user with the provided username.
+        All tokens of the user issued before the update are revoked, so the user has to log in again with the new password.
 
         Returns:
             Tuple: A tuple containing the HTTP response and status code.
@@ -206,13 +791,50 @@ class AuthService:
         if not is_password_strong(new_password):
             return jsonify({'error': 'Password must be at least 8 characters long, contain an uppercase letter, a lowercase letter, and a digit'}), 400
 
-        if username not in USER_DATA or USER_DATA[username]['password'] != hash_password(old_password):
+        users = self.get_user_store()
+        user = users.get(username)
+        if user is None or not self.password_hasher.verify(old_password, user['password']):
             return jsonify({'error': 'Invalid credentials'}), 403
 
-        USER_DATA[username]['password'] = hash_password(new_password)
+        if not users.set_password(username, self.password_hasher.hash(new_password), expected=user['password']):
+            return jsonify({'error': 'Password was changed concurrently'}), 409
+        self.revocations.revoke_user(username)
 
         return '', 200
         
+    def before_fork(self):
+
+        """
+        Prepares the revocation list, if it was loaded, for the process to fork a worker: it stops following its log.
+        """
+
+        if self._revocations is not None:
+            self._revocations.before_fork()
+
+    def after_fork(self):
+
+        """
+        Prepares the user store and the revocation list, if they were loaded, for use in a worker process of the pre-fork server.
+        """
+
+        if self._user_store is not None:
+            self._user_store.after_fork()
+        if self._revocations is not None:
+            self._revocations.after_fork()
+
+    def close(self):
+
+        """
+        Stops the worker processes of the password hasher, closes the user store, so queued writes are flushed, and stops following
+        the log of the revocations.
+        """
+
+        self.password_hasher.close()
+        if self._user_store is not None:
+            self._user_store.close()
+        if self._revocations is not None:
+            self._revocations.close()
+
     def run(self, *args, **kwargs):
 
         """
@@ -1,36 +1,102 @@
-from flask import Flask, request, jsonify, redirect
+from flask import Flask, Response, g, request, jsonify, redirect
 import os
 import json
+import time
 from functools import wraps
-from datetime import datetime
-from helper_modules.shortener_helpers import is_valid_url, generate_unique_id
+from itertools import islice
+from helper_modules.shortener_helpers import canonicalize_url, canonicalize_urls, generate_unique_id, redirect_headers, BlockIdAllocator, encode_cursor, decode_cursor, format_timestamp
+from helper_modules.storage_helpers import create_storage
+from helper_modules.wal_helpers import LOG_COMPACT_THRESHOLD, LOG_FOLLOW_INTERVAL
 
 # Get the base URL from an environment variable, or use default value
 BASE_URL = os.environ.get("BASE_URL", "http://localhost:3000")
 
+# Get the path of the data file from an environment variable, or use default value
+DATA_FILE = os.environ.get("DATA_FILE", "url_data/url_data.json")
+
+# Select where url_data is stored: 'memory' keeps it in a compact in-memory table backed by the data file, 'sqlite' keeps it in an SQLite database
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "memory")
+
+# Select how the memory backend is persisted: 'log' appends every mutation to a write-ahead log, 'json' rewrites the whole data file
+PERSISTENCE_MODE = os.environ.get("PERSISTENCE_MODE", "log")
+
+# Set the log size in bytes after which the log is folded into a fresh snapshot
+COMPACT_THRESHOLD = int(os.environ.get("LOG_COMPACT_THRESHOLD", LOG_COMPACT_THRESHOLD))
+
+# Select the format of a new data file of the memory backend: 'json', or 'binary' for fast startup. An existing data file keeps its format
+SNAPSHOT_FORMAT = os.environ.get("SNAPSHOT_FORMAT", "json")
+
+# Select when a write to the memory backend is acknowledged: 'sync' after its own fsync, 'group' after an fsync shared with the writes
+# of a short window, 'async' immediately, with pending writes flushed periodically
+DURABILITY = os.environ.get("DURABILITY", "sync")
+
+# Set the time in seconds between two reads of the log for the writes of other replicas or workers that share the data file
+FOLLOW_INTERVAL = float(os.environ.get("LOG_FOLLOW_INTERVAL", LOG_FOLLOW_INTERVAL))
+
+# Set the prefix of the metric names and the media type of the Prometheus text format
+METRICS_PREFIX = 'url_shortener_'
+METRICS_MIMETYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Set the default and maximum number of URLs per page of the paginated index
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Set the media type of streamed exports and the number of records written per chunk
+NDJSON_MIMETYPE = 'application/x-ndjson'
+NDJSON_CHUNK_SIZE = 1000
+
+# Set the maximum number of URLs or IDs per bulk request
+MAX_BULK_SIZE = 10000
+
+# Serve redirects (GET /<id>) without a bearer token, so the highest-volume route skips JWT validation entirely
+PUBLIC_REDIRECTS = os.environ.get("PUBLIC_REDIRECTS", "false").lower() in ('1', 'true', 'yes')
+
+# Status line of the redirects served by the WSGI fast path, the same status line Flask sends for `redirect(url), 301`
+REDIRECT_STATUS = '301 MOVED PERMANENTLY'
+
+# Auth policies a route can declare: 'token' requires a valid bearer token, 'public' skips the JWT check
+AUTH_TOKEN = 'token'
+AUTH_PUBLIC = 'public'
+
+# Select how unique IDs are generated: 'counter' hands out IDs from leased blocks, 'random' draws random IDs until a free one is found
+ID_ALLOCATOR = os.environ.get("ID_ALLOCATOR", "counter")
+
 class URLShortenerService:
 
     """
     A URL shortening service implemented using the Flask framework.
 
     Attributes:
-        url_data (dict): A dictionary storing unique IDs and their corresponding URLs.
+        store (Storage): The store holding unique IDs and their corresponding URLs.
+        id_allocator (BlockIdAllocator or None): The allocator handing out unique IDs, None when random IDs are used.
         app (Flask): A Flask application instance.
         auth_service (AuthService): An instance of the AuthService class that provides authentication services.
+        public_redirects (bool): Whether redirects are served without a bearer token.
+        auth_policies (dict): The auth policy of every endpoint, AUTH_TOKEN or AUTH_PUBLIC.
     """
 
-    def __init__(self, auth_service):
+    def __init__(self, auth_service, data_file=DATA_FILE, storage_backend=STORAGE_BACKEND, persistence_mode=PERSISTENCE_MODE, compact_threshold=COMPACT_THRESHOLD,
+                 id_allocator=ID_ALLOCATOR, snapshot_format=SNAPSHOT_FORMAT, public_redirects=PUBLIC_REDIRECTS, durability=DURABILITY,
+                 follow_interval=FOLLOW_INTERVAL):
 
         """
         Initialize the URLShortenerApp instance and set up the routes.
+        The ID block lease file is kept next to the data file, so all replicas sharing the data volume share the lease.
         """
 
+        if id_allocator not in ('counter', 'random'):
+            raise ValueError(f"Invalid ID allocator: {id_allocator}. Use 'counter' or 'random'.")
+
         self.auth_service = auth_service
-        self.data_file = 'url_data/url_data.json'
-        self.url_data = self._load_data()
+        self.store = create_storage(storage_backend, data_file, persistence_mode, compact_threshold, snapshot_format, durability, follow_interval)
+        self.id_allocator = BlockIdAllocator(os.path.join(os.path.dirname(data_file), 'id_lease.json')) if id_allocator == 'counter' else None
+        self.public_redirects = public_redirects
+        self.auth_policies = {}
         self.app = Flask(__name__)
         self.app.before_request(self.check_jwt) # add the check_jwt method to be called before each request
         self.setup_routes()
+        if public_redirects:
+            self.app.wsgi_app = self.redirect_fast_path(self.app.wsgi_app)
 
     def setup_routes(self):
 
@@ -38,30 +104,157 @@ class URLShortenerService:
         Set up the route handlers for the Flask application.
         """
 
-        self.app.add_url_rule('/<string:id>', 'redirect_url', self.redirect_url, methods=['GET'])
-        self.app.add_url_rule('/', 'serve_index', self.serve_index, methods=['GET'])
-        self.app.add_url_rule('/<string:id>', 'update_url', self.update_url, methods=['PUT'])
-        self.app.add_url_rule('/<string:id>', 'delete_url', self.delete_url, methods=['DELETE'])
-        self.app.add_url_rule('/keys', 'get_all_keys', self.get_all_keys, methods=['GET'])
-        self.app.add_url_rule('/', 'create_short_url', self.create_short_url, methods=['POST'])
-        self.app.add_url_rule('/', 'unsupported_delete', self.unsupported_delete, methods=['DELETE'])
-        self.app.add_url_rule('/search/<string:uri>', 'search_uri', self.search_uri, methods=['GET'])
+        self.add_route('/<string:id>', 'redirect_url', self.redirect_url, ['GET'], auth_policy=AUTH_PUBLIC if self.public_redirects else AUTH_TOKEN)
+        self.add_route('/', 'serve_index', self.serve_index, ['GET'])
+        self.add_route('/<string:id>', 'update_url', self.update_url, ['PUT'])
+        self.add_route('/<string:id>', 'delete_url', self.delete_url, ['DELETE'])
+        self.add_route('/keys', 'get_all_keys', self.get_all_keys, ['GET'])
+        self.add_route('/', 'create_short_url', self.create_short_url, ['POST'])
+        self.add_route('/bulk', 'create_short_urls', self.create_short_urls, ['POST'])
+        self.add_route('/bulk', 'update_urls', self.update_urls, ['PUT'])
+        self.add_route('/bulk', 'delete_urls', self.delete_urls, ['DELETE'])
+        self.add_route('/', 'unsupported_delete', self.unsupported_delete, ['DELETE'])
+        self.add_route('/search/<string:uri>', 'search_uri', self.search_uri, ['GET'])
+        self.add_route('/metrics', 'serve_metrics', self.serve_metrics, ['GET'], auth_policy=AUTH_PUBLIC) # scraped by the monitoring system without a token
+
+    def add_route(self, rule, endpoint, view_func, methods, auth_policy=AUTH_TOKEN):
 
-    def _load_data(self):
-        if os.path.exists(self.data_file):
-            with open(self.data_file, "r") as file:
-                return json.load(file)
-        else:
-            return {}
-        
-    def _save_data(self):
-        with open(self.data_file, "w") as file:
-            json.dump(self.url_data, file)
+        """
+        Register a route handler together with its auth policy.
+        Args:
+            rule (str): The URL rule.
+            endpoint (str): The endpoint name.
+            view_func (function): The route handler.
+            methods (list): The HTTP methods of the route.
+            auth_policy (str): AUTH_TOKEN to require a valid bearer token, AUTH_PUBLIC to skip the JWT check.
+        """
+
+        self.app.add_url_rule(rule, endpoint, view_func, methods=methods)
+        self.auth_policies[endpoint] = auth_policy
+
+    def redirect_fast_path(self, wsgi_app):
+
+        """
+        Wrap the WSGI application in a layer that serves public redirects without Flask.
+        A GET of a single path segment that is a stored ID is answered with a precomputed status line and the cached headers of its URL,
+        without routing, request and response objects or the JWT check. Everything else, including unknown IDs, falls through to Flask.
+        Args:
+            wsgi_app (function): The WSGI application of Flask.
+        Returns:
+            function: The wrapped WSGI application.
+        """
+
+        store = self.store
+        empty_body = [b'']
+
+        def fast_path(environ, start_response):
+            path = environ.get('PATH_INFO', '')
+            # The static single-segment routes, /keys and /metrics, are never stored IDs, so a stored ID always belongs to redirect_url
+            if environ['REQUEST_METHOD'] == 'GET' and path.rfind('/') == 0:
+                value = store.get(path[1:])
+                if value is not None:
+                    start_response(REDIRECT_STATUS, redirect_headers(value['url'])[0])
+                    return empty_body
+            return wsgi_app(environ, start_response)
+
+        return fast_path
+
+    def generate_id(self):
+
+        """
+        Generate a unique identifier for a new short URL with the configured allocator.
+        Returns:
+            str: The unique identifier.
+        """
+
+        if self.id_allocator is None:
+            return generate_unique_id(self.store)
+        return self.id_allocator.allocate(self.store)
+
+    def generate_ids(self, count):
+
+        """
+        Generate several unique identifiers for new short URLs in one pass.
+        Args:
+            count (int): The number of identifiers.
+        Returns:
+            list: The unique identifiers.
+        """
+
+        if self.id_allocator is not None:
+            return self.id_allocator.allocate_many(count, self.store)
+
+        unique_ids = set()
+        while len(unique_ids) < count:
+            unique_ids.add(generate_unique_id(self.store))
+        return list(unique_ids)
+
+    def find_stored_url(self, url, canonical_url):
+
+        """
+        Find the ID of a stored URL, in its canonical form or exactly as it was sent.
+        URLs stored before canonicalization was introduced are kept as they were sent, so they are only found by the raw URL.
+        Args:
+            url (str): The URL as it was sent.
+            canonical_url (str): The canonical form of the URL.
+        Returns:
+            str: The ID of the stored URL, or None if it is not stored.
+        """
+
+        if existing_id := self.store.find_by_url(canonical_url):
+            return existing_id
+        if url != canonical_url:
+            return self.store.find_by_url(url)
+        return None
+
+    def close(self):
+
+        """
+        Flush pending work of the store and release its resources.
+        """
+
+        self.store.close()
+
+    def check_prefork(self, workers):
+
+        """
+        Check that the service can be served by forked worker processes that share the data loaded by the parent.
+        Args:
+            workers (int): The number of worker processes.
+        Raises:
+            ValueError: If the store cannot be shared by forked workers, e.g. the memory store rewriting its whole data file ('json' mode),
+                        or if several workers would draw random IDs that can collide with the IDs drawn by other workers.
+        """
+
+        if not self.store.supports_prefork():
+            raise ValueError("The pre-fork server requires PERSISTENCE_MODE=log or STORAGE_BACKEND=sqlite.")
+        if workers > 1 and self.id_allocator is None:
+            raise ValueError("Several workers require ID_ALLOCATOR=counter.")
+
+    def before_fork(self):
+
+        """
+        Prepare the service for the process to fork a worker: the store stops its follower thread.
+        """
+
+        self.store.before_fork()
+
+    def after_fork(self):
+
+        """
+        Prepare the service for use in a forked worker process: the store reopens its files and catches up with the writes of other workers,
+        and the ID allocator reserves a block of its own.
+        """
+
+        self.store.after_fork()
+        if self.id_allocator is not None:
+            self.id_allocator.reset()
 
     def admin_required(f):
 
         """"
         A decorator that checks if the JWT token in the request's Authorization header has an admin role.
+        The payload validated by check_jwt for the current request is reused, so the token is not validated twice.
         If the user is not an admin, return a JSON error response with a 403 status code.
 
         Args:
@@ -73,9 +266,11 @@ class URLShortenerService:
 
         @wraps(f)
         def decorated_function(self, *args, **kwargs):
-            auth_header = request.headers.get('Authorization')
-            token = auth_header.split(' ')[-1]
-            payload = self.auth_service.validate_jwt(token)
+            payload = g.get('jwt_payload')
+            if payload is None:
+                auth_header = request.headers.get('Authorization')
+                token = auth_header.split(' ')[-1]
+                payload = self.auth_service.validate_jwt(token)
             if payload.get("role") != "admin":
                 return jsonify({'error': 'Admin privileges required'}), 403
             return f(self, *args, **kwargs)
@@ -90,8 +285,12 @@ class URLShortenerService:
         The check_jwt method is called before each request (see __init__ method), 
         this ensures that the JWT token is validated and returns the required 401 "unauthorized" 
         or 403 "forbidden" status when necessary.
+        Routes with the AUTH_PUBLIC policy are served without looking at the request's headers.
         """
 
+        if self.auth_policies.get(request.endpoint) == AUTH_PUBLIC:
+            return None
+
         auth_header = request.headers.get('Authorization')
         if not auth_header:
             return jsonify({'error': 'Missing Authorization header'}), 401
@@ -100,6 +299,7 @@ class URLShortenerService:
         payload = self.auth_service.validate_jwt(token)
         if not payload:
             return jsonify({'error': 'Invalid or expired token'}), 401
+        g.jwt_payload = payload # reused by admin_required, so the token is validated once per request
 
     def redirect_url(self, id):
 
@@ -112,8 +312,9 @@ class URLShortenerService:
                                  a JSON response with an error message otherwise.
         """
 
-        if id in self.url_data:
-            return redirect(self.url_data[id]['url']), 301
+        value = self.store.get(id)
+        if value is not None:
+            return redirect(value['url']), 301
         else:
             return jsonify({"error": "URL not found"}), 404
 
@@ -121,28 +322,84 @@ class URLShortenerService:
     def serve_index(self):
 
         """
-        Retrieve all stored URLs and their corresponding data from the url_data dictionary and generates a list of dictionaries. 
-        Sort the list of dictionaries by the timestamp of creation in descending order.
+        Retrieve the stored URLs and their corresponding data from the store, ordered by the timestamp of creation in descending order,
+        and generate a list of dictionaries.
+        Without query parameters all URLs are returned as a list. With an `Accept: application/x-ndjson` header all URLs are streamed
+        as one JSON object per line, read lazily from the store. With a `limit` and/or `cursor` query parameter a single page is returned,
+        together with the cursor of the next page (null on the last page). Pages are read from the sorted index of the store,
+        so a page costs O(limit) and stays stable while URLs are created or deleted.
         Returns:
-            response (json): A JSON response containing the sorted list of URLs
+            response (json): A JSON response containing the sorted list of URLs, or a page of it.
         """
 
-        short_urls = [{
+        if self._wants_ndjson():
+            return self._stream_ndjson(self.index_entry(key, value) for key, value in self.store.iter_by_created_at(reverse=True))
+
+        if 'limit' not in request.args and 'cursor' not in request.args:
+            return jsonify([self.index_entry(key, value) for key, value in self.store.iter_by_created_at(reverse=True)]), 200
+
+        try:
+            limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+            after = decode_cursor(request.args['cursor']) if 'cursor' in request.args else None
+        except ValueError:
+            return jsonify({'error': 'Invalid limit or cursor'}), 400
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            return jsonify({'error': f'Limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
+
+        page = self.store.page_by_created_at(limit, after, reverse=True)
+        next_cursor = encode_cursor(page[-1][1]['created_at'], page[-1][0]) if len(page) == limit else None
+
+        return jsonify({'urls': [self.index_entry(key, value) for key, value in page], 'next_cursor': next_cursor}), 200
+
+    def _wants_ndjson(self):
+
+        """
+        Check if the client prefers a streamed NDJSON export over a single JSON document.
+        Returns:
+            bool: True if application/x-ndjson is the best match of the Accept header.
+        """
+
+        return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+    def _stream_ndjson(self, items):
+
+        """
+        Stream items as newline-delimited JSON. Items are consumed lazily and written in chunks,
+        so the memory used by the response does not depend on the number of items.
+        Args:
+            items (iterator): The JSON-serializable items.
+        Returns:
+            response (Response): The streamed response.
+        """
+
+        def generate():
+            while chunk := list(islice(items, NDJSON_CHUNK_SIZE)):
+                yield ''.join(json.dumps(item) + '\n' for item in chunk)
+
+        return Response(generate(), status=200, mimetype=NDJSON_MIMETYPE)
+
+    def index_entry(self, key, value):
+
+        """
+        Generate the dictionary describing a stored URL in the index, as served by the Flask and the ASGI application.
+        Args:
+            key (str): The unique identifier of the shortened URL.
+            value (dict): The stored record.
+        Returns:
+            dict: The index entry.
+        """
+
+        return {
             "generated_uri": key,
             "url": f"{BASE_URL}/{key}",
-            "created_at": self.url_data[key]["created_at"],
-            "original_url": self.url_data[key]["url"]
-            }
-            for key in self.url_data
-        ]
-        short_urls = sorted(short_urls, key=lambda x: x['created_at'], reverse=True)
-        
-        return jsonify(short_urls), 200
+            "created_at": format_timestamp(value["created_at"]),
+            "original_url": value["url"]
+        }
     
     def search_uri(self, uri):
 
         """
-        Search for the given URI in the url_data dictionary.
+        Search for the given URI in the store.
         Args:
             uri (str): The URI to search for.
         Returns:
@@ -150,10 +407,11 @@ class URLShortenerService:
                              an error message otherwise.
         """
 
-        if uri in self.url_data:
-            original_url = self.url_data[uri]['url']
+        value = self.store.get(uri)
+        if value is not None:
+            original_url = value['url']
             shortened_url = f"{BASE_URL}/{uri}"
-            timestamp = self.url_data[uri]['created_at']
+            timestamp = format_timestamp(value['created_at'])
             return jsonify({'original_url': original_url, 'shortened_url': shortened_url, 'timestamp': timestamp}), 200
         else:
             return jsonify({'error': 'URI not found'}), 404
@@ -172,11 +430,9 @@ class URLShortenerService:
         data = request.get_json()
         if data is None:
             return jsonify({'error': 'Invalid JSON'}), 400
-        url = data.get('url')
-        if url is not None and is_valid_url(url):
-            if id in self.url_data:
-                self.url_data[id] = {"url": url, "created_at": self.url_data[id]["created_at"]}
-                self._save_data()
+        url = canonicalize_url(data.get('url')) if isinstance(data.get('url'), str) else None
+        if url is not None:
+            if self.store.update_many([(id, url)])[0]: # atomic, unlike a get followed by a put
                 return jsonify({'message': 'Updated'}), 200
             else:
                 return jsonify({'error': 'Not Found'}), 404
@@ -194,9 +450,7 @@ class URLShortenerService:
             response: An HTTP response with a status code.
         """
 
-        if id in self.url_data:
-            del self.url_data[id]
-            self._save_data()
+        if self.store.delete(id):
             return '', 204
         else:
             return jsonify({'error': 'Not Found'}), 404
@@ -205,21 +459,25 @@ class URLShortenerService:
 
         """
         Retrieve all stored URL identifiers.
+        With an `Accept: application/x-ndjson` header the identifiers are streamed one per line, ordered by creation time.
         Returns:
             response (json): A JSON response containing a list of URL identifiers.
         """
 
-        if len(self.url_data.keys()) == 0:
+        if self.store.count() == 0:
             return "No URL identifiers found.", 404
+        elif self._wants_ndjson():
+            return self._stream_ndjson(key for key, _ in self.store.iter_by_created_at(reverse=False))
         else:
-            return jsonify(list(self.url_data.keys())), 200
+            return jsonify(list(self.store.ids())), 200
 
     @admin_required
     def create_short_url(self):
 
         """
         Create a short URL for the given long URL. 
-        If the URL already exists in the url_data dictionary, return an error message.
+        The URL is stored in its canonical form, so an equivalent URL (e.g. with an uppercase host or the default port) is found as already stored.
+        If the URL already exists in the store, return an error message.
         
         Returns:
             response (json): A JSON response containing the short URL identifier, an error message if the URL already exists,
@@ -229,22 +487,20 @@ class URLShortenerService:
         data = request.get_json()
         if data is None:
             return jsonify({'error': 'Invalid JSON'}), 400
-        url = data.get('url')
-        if url is None or not is_valid_url(url):
+        url = canonicalize_url(data.get('url')) if isinstance(data.get('url'), str) else None
+        if url is None:
             return jsonify({'error': 'Invalid URL'}), 400
 
-        if existing_id := next(
-            (id for id, value in self.url_data.items() if value['url'] == url),
-            None,
-        ):
+        if existing_id := self.find_stored_url(data['url'], url):
             short_url = f"{BASE_URL}/{existing_id}"
             generated_uri = existing_id
             return jsonify({'error': 'URL already exists', 'short_url': short_url, 'generated_uri': generated_uri}), 409
 
         try:
-            unique_id = generate_unique_id(self.url_data)
-            self.url_data[unique_id] = {"url": url, "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-            self._save_data()
+            unique_id = self.generate_id()
+            # Stores the URL only if no concurrent request stored it since the check above
+            if existing_id := self.store.put_new(unique_id, {"url": url, "created_at": int(time.time())}):
+                return jsonify({'error': 'URL already exists', 'short_url': f"{BASE_URL}/{existing_id}", 'generated_uri': existing_id}), 409
             short_url = f"{BASE_URL}/{unique_id}"
             generated_uri = unique_id
 
@@ -253,6 +509,118 @@ class URLShortenerService:
             error_msg = f"An internal server error occurred while generating a unique identifier: {str(e)}. Function: create_short_url(). Module: url_shortener.py"
             return jsonify({'error': error_msg}), 500
 
+    @admin_required
+    def create_short_urls(self):
+
+        """
+        Create short URLs for a list of long URLs in a single request.
+        All URLs are validated and canonicalized first, then identifiers are allocated in one pass and all new short URLs are committed atomically
+        with a single persistence write. URLs that are already stored, or that occur earlier in the same list, also in an equivalent form,
+        are reported as duplicates. Every result reports the URL as it was sent.
+
+        Returns:
+            response (json): A JSON response containing a result per URL, in the order of the request,
+                            with a status of 'created', 'duplicate' or 'invalid'.
+        """
+
+        data = request.get_json()
+        if data is None:
+            return jsonify({'error': 'Invalid JSON'}), 400
+        urls = data.get('urls') if isinstance(data, dict) else None
+        if not isinstance(urls, list):
+            return jsonify({'error': 'A list of URLs is required'}), 400
+        if len(urls) > MAX_BULK_SIZE:
+            return jsonify({'error': f'At most {MAX_BULK_SIZE} URLs per request'}), 400
+
+        results = [None] * len(urls)
+        new_urls = {} # maps every canonical URL to create to the positions in the request where it occurs
+        for position, (url, canonical_url) in enumerate(zip(urls, canonicalize_urls(urls))):
+            if canonical_url is None:
+                results[position] = {'url': url, 'status': 'invalid'}
+            elif existing_id := self.find_stored_url(url, canonical_url):
+                results[position] = {'url': url, 'status': 'duplicate', 'short_url': f"{BASE_URL}/{existing_id}", 'generated_uri': existing_id}
+            else:
+                new_urls.setdefault(canonical_url, []).append(position)
+
+        try:
+            unique_ids = self.generate_ids(len(new_urls))
+        except ValueError as e:
+            error_msg = f"An internal server error occurred while generating a unique identifier: {str(e)}. Function: create_short_urls(). Module: url_shortener.py"
+            return jsonify({'error': error_msg}), 500
+
+        created_at = int(time.time())
+        # Stores only the URLs that no concurrent request stored since the checks above
+        existing_ids = self.store.put_many_new([(unique_id, {"url": url, "created_at": created_at}) for unique_id, url in zip(unique_ids, new_urls)])
+
+        for unique_id, existing_id, positions in zip(unique_ids, existing_ids, new_urls.values()):
+            stored_id = unique_id if existing_id is None else existing_id
+            for position in positions:
+                status = 'created' if existing_id is None and position == positions[0] else 'duplicate'
+                results[position] = {'url': urls[position], 'status': status, 'short_url': f"{BASE_URL}/{stored_id}", 'generated_uri': stored_id}
+
+        return jsonify({'results': results}), 200
+
+    @admin_required
+    def update_urls(self):
+
+        """
+        Update the original URLs of several short URLs in a single request.
+        All updates are applied under one lock acquisition and committed with a single persistence write.
+
+        Returns:
+            response (json): A JSON response containing a result per update, in the order of the request,
+                            with a status of 'updated', 'not_found' or 'invalid'.
+        """
+
+        data = request.get_json()
+        if data is None:
+            return jsonify({'error': 'Invalid JSON'}), 400
+        updates = data.get('updates') if isinstance(data, dict) else None
+        if not isinstance(updates, list):
+            return jsonify({'error': 'A list of updates is required'}), 400
+        if len(updates) > MAX_BULK_SIZE:
+            return jsonify({'error': f'At most {MAX_BULK_SIZE} updates per request'}), 400
+
+        results = [None] * len(updates)
+        valid_updates = [] # (position, id, canonical url) of every update that passed validation
+        canonical_urls = canonicalize_urls([update.get('url') if isinstance(update, dict) else None for update in updates])
+        for position, (update, url) in enumerate(zip(updates, canonical_urls)):
+            id = update.get('id') if isinstance(update, dict) else None
+            if not isinstance(id, str) or url is None:
+                results[position] = {'id': id, 'status': 'invalid'}
+            else:
+                valid_updates.append((position, id, url))
+
+        updated = self.store.update_many([(id, url) for _, id, url in valid_updates])
+        for (position, id, _), found in zip(valid_updates, updated):
+            results[position] = {'id': id, 'status': 'updated' if found else 'not_found'}
+
+        return jsonify({'results': results}), 200
+
+    @admin_required
+    def delete_urls(self):
+
+        """
+        Delete several short URLs in a single request.
+        All deletions are applied under one lock acquisition and committed with a single persistence write.
+
+        Returns:
+            response (json): A JSON response containing a result per ID, in the order of the request,
+                            with a status of 'deleted' or 'not_found'.
+        """
+
+        data = request.get_json()
+        if data is None:
+            return jsonify({'error': 'Invalid JSON'}), 400
+        ids = data.get('ids') if isinstance(data, dict) else None
+        if not isinstance(ids, list) or not all(isinstance(id, str) for id in ids):
+            return jsonify({'error': 'A list of IDs is required'}), 400
+        if len(ids) > MAX_BULK_SIZE:
+            return jsonify({'error': f'At most {MAX_BULK_SIZE} IDs per request'}), 400
+
+        deleted = self.store.delete_many(ids)
+        return jsonify({'results': [{'id': id, 'status': 'deleted' if found else 'not_found'} for id, found in zip(ids, deleted)]}), 200
+
     @admin_required
     def unsupported_delete(self):
 
@@ -264,14 +632,33 @@ class URLShortenerService:
 
         return jsonify({'error': 'Method not supported'}), 404
 
+    def serve_metrics(self):
+
+        """
+        Report the metrics of the store in the Prometheus text format, e.g. the lag with which writes of other replicas or workers are applied.
+        Every worker process reports its own metrics.
+        Returns:
+            response (text): The metrics, one sample per line.
+        """
+
+        lines = []
+        for name, value in self.store.metrics().items():
+            lines.append(f"# TYPE {METRICS_PREFIX}{name} {'counter' if name.endswith('_total') else 'gauge'}\n")
+            lines.append(f"{METRICS_PREFIX}{name} {value}\n")
+        return Response(''.join(lines), mimetype=METRICS_MIMETYPE)
+
     def run(self, *args, **kwargs):
 
         """
         Run the Flask application with the given arguments and keyword arguments.
         The host parameter is set to '0.0.0.0' to make the application accessible to any address.
+        When the server stops, the store is closed, so writes that are still queued for persistence are drained and flushed.
         Args:
             *args: Variable-length argument list.
             **kwargs: Arbitrary keyword arguments.
         """
 
-        self.app.run(host='0.0.0.0', *args, **kwargs)
+        try:
+            self.app.run(host='0.0.0.0', *args, **kwargs)
+        finally:
+            self.close()
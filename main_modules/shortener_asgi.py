@@ -0,0 +1,314 @@
+import os
+import sys
+import json
+import asyncio
+from io import BytesIO
+from itertools import islice
+from urllib.parse import parse_qsl
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+from helper_modules.shortener_helpers import encode_cursor, decode_cursor, format_timestamp, redirect_headers
+from helper_modules.storage_helpers import MemoryStorage
+from main_modules.shortener import AUTH_PUBLIC, BASE_URL, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NDJSON_MIMETYPE, NDJSON_CHUNK_SIZE
+
+# Set the number of threads that run the routes without an async handler (e.g. creating, updating and deleting URLs) on the Flask application
+ASGI_THREADS = int(os.environ.get("ASGI_THREADS", 32))
+
+# Headers of the JSON responses, the same media type Flask's jsonify sends
+JSON_HEADERS = [(b'content-type', b'application/json')]
+
+class URLShortenerASGI:
+
+    """
+    An ASGI application serving a URLShortenerService: the same store and routes, for many concurrent connections on a single event loop.
+    Redirects, searches and listing pages are handled by async handlers on the event loop, so slow or idle keep-alive clients only hold a socket
+    and a coroutine instead of a server thread. Reads of the memory store never wait for I/O, so they run on the loop directly;
+    reads of other stores run on the thread pool. All other routes are passed to the Flask application on the thread pool,
+    where writes are handed to the background writer of the store, so the event loop never waits for a file to be written.
+
+    Attributes:
+        service (URLShortenerService): The service whose store, auth policies and Flask routes are served.
+        store (Storage): The store of the service.
+        executor (ThreadPoolExecutor): The threads running blocking work.
+    """
+
+    def __init__(self, service, threads=ASGI_THREADS):
+
+        """
+        Initializes the ASGI application.
+
+        Args:
+            service (URLShortenerService): The service to serve.
+            threads (int, optional): The number of threads running blocking work. Defaults to ASGI_THREADS.
+        """
+
+        self.service = service
+        self.store = service.store
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+        self._blocking_reads = not isinstance(service.store, MemoryStorage)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+
+        path = scope['path']
+        if scope['method'] == 'GET':
+            if path == '/':
+                return await self.serve_index(scope, send)
+            if path.startswith('/search/') and path.count('/') == 2 and len(path) > len('/search/'):
+                return await self.search_uri(scope, send, path[len('/search/'):])
+            # The static single-segment routes, /keys and /metrics, are served by Flask like every other route without an async handler
+            if path.rfind('/') == 0 and path not in ('/keys', '/metrics'):
+                return await self.redirect_url(scope, send, path[1:])
+        await self.call_wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+
+        """
+        Handles the lifespan protocol of the server: on shutdown the store is closed, so queued writes are drained and flushed.
+        """
+
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.get_running_loop().run_in_executor(self.executor, self.service.close)
+                self.executor.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _read(self, function, *args):
+
+        """
+        Runs a read of the store, on the event loop for the memory store and on the thread pool otherwise.
+
+        Args:
+            function (function): The read.
+            *args: The arguments of the read.
+
+        Returns:
+            object: The result of the read.
+        """
+
+        if self._blocking_reads:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+        return function(*args)
+
+    async def _send(self, send, status, body=b'', headers=JSON_HEADERS):
+
+        """
+        Sends a complete response.
+
+        Args:
+            send (function): The ASGI send callable.
+            status (int): The status code.
+            body (bytes, optional): The body. Defaults to an empty body.
+            headers (list, optional): The headers as (name, value) byte strings. Defaults to JSON_HEADERS.
+        """
+
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers + [(b'content-length', str(len(body)).encode('ascii'))]})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def _send_json(self, send, data, status=200):
+
+        """
+        Sends a JSON response, serialized like Flask's jsonify.
+
+        Args:
+            send (function): The ASGI send callable.
+            data (object): The JSON-serializable data.
+            status (int, optional): The status code. Defaults to 200.
+        """
+
+        await self._send(send, status, (json.dumps(data, separators=(',', ':'), sort_keys=True) + '\n').encode('utf-8'))
+
+    def _authorize(self, scope, endpoint, admin=False):
+
+        """
+        Applies the auth policy of an endpoint, like check_jwt and admin_required of the service.
+
+        Args:
+            scope (dict): The ASGI connection scope.
+            endpoint (str): The endpoint of the route.
+            admin (bool, optional): Whether the route requires the admin role. Defaults to False.
+
+        Returns:
+            tuple or None: The error and its status code, or None if the request is authorized.
+        """
+
+        if self.service.auth_policies.get(endpoint) == AUTH_PUBLIC:
+            return None
+
+        auth_header = next((value for name, value in scope['headers'] if name == b'authorization'), None)
+        if not auth_header:
+            return {'error': 'Missing Authorization header'}, 401
+
+        payload = self.service.auth_service.validate_jwt(auth_header.decode('latin-1').split(' ')[-1])
+        if not payload:
+            return {'error': 'Invalid or expired token'}, 401
+        if admin and payload.get("role") != "admin":
+            return {'error': 'Admin privileges required'}, 403
+        return None
+
+    async def redirect_url(self, scope, send, id):
+
+        """
+        Redirects to the original URL stored under the given ID, like URLShortenerService.redirect_url.
+
+        Args:
+            scope (dict): The ASGI connection scope.
+            send (function): The ASGI send callable.
+            id (str): The unique identifier of the shortened URL.
+        """
+
+        if error := self._authorize(scope, 'redirect_url'):
+            return await self._send_json(send, *error)
+
+        value = await self._read(self.store.get, id)
+        if value is None:
+            return await self._send_json(send, {"error": "URL not found"}, 404)
+        await self._send(send, 301, headers=redirect_headers(value['url'])[1])
+
+    async def search_uri(self, scope, send, uri):
+
+        """
+        Searches for the given URI, like URLShortenerService.search_uri.
+
+        Args:
+            scope (dict): The ASGI connection scope.
+            send (function): The ASGI send callable.
+            uri (str): The URI to search for.
+        """
+
+        if error := self._authorize(scope, 'search_uri'):
+            return await self._send_json(send, *error)
+
+        value = await self._read(self.store.get, uri)
+        if value is None:
+            return await self._send_json(send, {'error': 'URI not found'}, 404)
+        await self._send_json(send, {'original_url': value['url'], 'shortened_url': f"{BASE_URL}/{uri}", 'timestamp': format_timestamp(value['created_at'])})
+
+    async def serve_index(self, scope, send):
+
+        """
+        Lists the stored URLs, newest first, like URLShortenerService.serve_index: all URLs as a list, streamed as NDJSON,
+        or a single page addressed by the `limit` and `cursor` query parameters.
+        A streamed export is read and sent chunk by chunk, so other connections are served in between.
+
+        Args:
+            scope (dict): The ASGI connection scope.
+            send (function): The ASGI send callable.
+        """
+
+        if error := self._authorize(scope, 'serve_index', admin=True):
+            return await self._send_json(send, *error)
+
+        accept = next((value.decode('latin-1') for name, value in scope['headers'] if name == b'accept'), None)
+        items = self.store.iter_by_created_at(reverse=True)
+        if parse_accept_header(accept, MIMEAccept).best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE:
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-type', NDJSON_MIMETYPE.encode('ascii'))]})
+            while chunk := await self._read(lambda: list(islice(items, NDJSON_CHUNK_SIZE))):
+                body = ''.join(json.dumps(self.service.index_entry(key, value)) + '\n' for key, value in chunk)
+                await send({'type': 'http.response.body', 'body': body.encode('utf-8'), 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        args = dict(parse_qsl(scope['query_string'].decode('latin-1'))[::-1]) # the first value of a repeated parameter wins, like request.args
+        if 'limit' not in args and 'cursor' not in args:
+            page = await self._read(list, items)
+            return await self._send_json(send, [self.service.index_entry(key, value) for key, value in page])
+
+        try:
+            limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+            after = decode_cursor(args['cursor']) if 'cursor' in args else None
+        except ValueError:
+            return await self._send_json(send, {'error': 'Invalid limit or cursor'}, 400)
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            return await self._send_json(send, {'error': f'Limit must be between 1 and {MAX_PAGE_SIZE}'}, 400)
+
+        page = await self._read(self.store.page_by_created_at, limit, after, True)
+        next_cursor = encode_cursor(page[-1][1]['created_at'], page[-1][0]) if len(page) == limit else None
+        await self._send_json(send, {'urls': [self.service.index_entry(key, value) for key, value in page], 'next_cursor': next_cursor})
+
+    async def call_wsgi(self, scope, receive, send):
+
+        """
+        Passes a request to the Flask application of the service, on the thread pool.
+        The request body is read before the application is called, and the response body is sent chunk by chunk as the application produces it.
+
+        Args:
+            scope (dict): The ASGI connection scope.
+            receive (function): The ASGI receive callable.
+            send (function): The ASGI send callable.
+        """
+
+        body = bytearray()
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+
+        environ = self._environ(scope, bytes(body))
+        response = {}
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(self.executor, self.service.app, environ, start_response)
+        chunks = iter(result)
+        try:
+            chunk = await loop.run_in_executor(self.executor, next, chunks, None)
+            await send({'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']})
+            while chunk is not None:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await loop.run_in_executor(self.executor, next, chunks, None)
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(result, 'close'):
+                await loop.run_in_executor(self.executor, result.close)
+
+    def _environ(self, scope, body):
+
+        """
+        Builds the WSGI environment of a request.
+
+        Args:
+            scope (dict): The ASGI connection scope.
+            body (bytes): The request body.
+
+        Returns:
+            dict: The WSGI environment.
+        """
+
+        server_name, server_port = scope.get('server') or ('localhost', 80)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope['query_string'].decode('latin-1'),
+            'SERVER_NAME': server_name,
+            'SERVER_PORT': str(server_port),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope['headers']:
+            name = name.decode('latin-1').upper().replace('-', '_')
+            if name == 'CONTENT_LENGTH':
+                continue
+            key = name if name == 'CONTENT_TYPE' else f'HTTP_{name}'
+            value = value.decode('latin-1')
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+        return environ
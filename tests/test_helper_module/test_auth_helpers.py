@@ -1,5 +1,5 @@
 import unittest
-from helper_modules.auth_helpers import hash_password, is_password_strong, is_username_valid, PASSWORD_SECRET, base64url_encode, base64url_decode, jwt_decode, jwt_encode, generate_jwt_token
+from helper_modules.auth_helpers import hash_password, is_password_strong, is_username_valid, PASSWORD_SECRET, base64url_encode, base64url_decode, jwt_decode, jwt_encode, generate_jwt_token, is_token_expired, TokenCache, SigningContext, DEFAULT_KID, kdf_hash, kdf_verify, PasswordHasher, HasherOverloaded
 import hashlib
 import base64
 import hmac
@@ -83,6 +83,76 @@ class TestAuthHelperFunctions(unittest.TestCase):
 
         self.assertEqual(hashed_password, expected_hash, "The hashed password should match the expected hash.")
 
+    def test_kdf_hash(self):
+
+        """
+        Test if passwords hashed with scrypt and PBKDF2 are verified with the cost stored in the hash, and salted.
+        """
+
+        for kdf, params in (('scrypt', (2 ** 10, 8, 1)), ('pbkdf2', (1000,))):
+            password_hash = kdf_hash("Str0ng_P@ssw0rd!", kdf, params)
+            self.assertTrue(password_hash.startswith(f"{kdf}${'$'.join(map(str, params))}$"))
+            self.assertTrue(kdf_verify("Str0ng_P@ssw0rd!", password_hash))
+            self.assertFalse(kdf_verify("Wr0ng_P@ssw0rd!", password_hash))
+            self.assertNotEqual(password_hash, kdf_hash("Str0ng_P@ssw0rd!", kdf, params))
+
+        self.assertFalse(kdf_verify("Str0ng_P@ssw0rd!", hash_password("Str0ng_P@ssw0rd!")))
+        self.assertFalse(kdf_verify("Str0ng_P@ssw0rd!", "pbkdf2$many$salt$key"))
+
+    def test_password_hasher(self):
+
+        """
+        Test if the password hasher hashes in its worker processes, verifies hashes of every backend,
+        flags hashes of another backend or cost for upgrade and rejects hashes beyond its queue depth.
+        """
+
+        hasher = PasswordHasher('pbkdf2', workers=1, queue_depth=1, params=(1000,))
+        try:
+            password_hash = hasher.hash("Str0ng_P@ssw0rd!")
+            self.assertTrue(hasher.verify("Str0ng_P@ssw0rd!", password_hash))
+            self.assertFalse(hasher.verify("Wr0ng_P@ssw0rd!", password_hash))
+            self.assertTrue(hasher.verify("Str0ng_P@ssw0rd!", hash_password("Str0ng_P@ssw0rd!")))
+
+            self.assertFalse(hasher.needs_upgrade(password_hash))
+            self.assertTrue(hasher.needs_upgrade(hash_password("Str0ng_P@ssw0rd!")))
+            self.assertTrue(hasher.needs_upgrade(kdf_hash("Str0ng_P@ssw0rd!", 'pbkdf2', (2000,))))
+            self.assertFalse(PasswordHasher('hmac').needs_upgrade(hash_password("Str0ng_P@ssw0rd!")))
+
+            hasher._slots.acquire() # the only slot is taken by a hash in progress
+            with self.assertRaises(HasherOverloaded):
+                hasher.hash("Str0ng_P@ssw0rd!")
+            hasher._slots.release()
+        finally:
+            hasher.close()
+
+        with self.assertRaises(ValueError):
+            PasswordHasher('md5')
+
+    def test_hash_many(self):
+
+        """
+        Test if many passwords are hashed in batches over the worker processes, in order, and wait for a slot instead of being rejected.
+        """
+
+        passwords = [f"Str0ng_P@ssw0rd_{i}" for i in range(40)]
+        hasher = PasswordHasher('pbkdf2', workers=2, queue_depth=3, params=(1000,))
+        try:
+            password_hashes = hasher.hash_many(passwords)
+            self.assertEqual(len(password_hashes), len(passwords))
+            self.assertTrue(all(hasher.verify(password, password_hash) for password, password_hash in zip(passwords, password_hashes)))
+            self.assertEqual(hasher.hash_many([]), [])
+
+            hasher._slots.acquire()
+            hasher._slots.acquire() # one slot is left, which the batches take in turn
+            self.assertEqual(len(hasher.hash_many(passwords)), len(passwords))
+            hasher._slots.release()
+            hasher._slots.release()
+        finally:
+            hasher.close()
+
+        password_hashes = PasswordHasher('hmac').hash_many(passwords[:2])
+        self.assertEqual(password_hashes, [hash_password(passwords[0]), hash_password(passwords[1])])
+
     def test_generate_jwt_token(self):
 
         """
@@ -182,5 +252,94 @@ class TestAuthHelperFunctions(unittest.TestCase):
         # Assert decoded payload is None because invalid secret
         self.assertIsNone(decoded_payload)
 
+    def test_signing_context(self):
+
+        """
+        Test if a signing context signs with its active key, verifies with the key named by 'kid',
+        and verifies tokens without 'kid' with the default key.
+        """
+
+        context = SigningContext({DEFAULT_KID: "old_secret", "2024": "new_secret"}, active_kid="2024")
+        payload = {"sub": "test_user", "role": "admin"}
+
+        token = context.encode(payload)
+        self.assertEqual(base64url_decode(token.split('.')[0].encode('utf-8')), b'{"alg": "HS256", "typ": "JWT", "kid": "2024"}')
+        self.assertEqual(context.decode(token), payload)
+        self.assertEqual(jwt_decode(token, "new_secret"), payload)
+
+        legacy_token = jwt_encode({"alg": "HS256", "typ": "JWT"}, payload, "old_secret")
+        self.assertEqual(context.decode(legacy_token), payload)
+        self.assertIsNone(SigningContext({"2024": "new_secret"}, active_kid="2024").decode(legacy_token))
+
+        self.assertIsNone(context.decode(jwt_encode({"alg": "HS256", "typ": "JWT", "kid": "2024"}, payload, "old_secret")))
+        self.assertIsNone(context.decode(jwt_encode({"alg": "HS256", "typ": "JWT", "kid": "unknown"}, payload, "new_secret")))
+        self.assertIsNone(context.decode(jwt_encode({"alg": "none", "typ": "JWT", "kid": "2024"}, payload, "new_secret")))
+
+    def test_signing_context_malformed_token(self):
+
+        """
+        Test if malformed tokens are rejected instead of raising an error.
+        """
+
+        context = SigningContext({DEFAULT_KID: "my_secret_key"})
+        for token in ["", "a.b", "a.b.c", "a.b.c.d", "!!!.e30.e30", context.encode({"sub": "x"})[:-5] + "$$$$$"]:
+            self.assertIsNone(context.decode(token))
+
+    def test_signing_context_verify(self):
+
+        """
+        Test if verify reports why a token is rejected.
+        """
+
+        context = SigningContext({DEFAULT_KID: "my_secret_key"})
+        payload = {"sub": "test_user", "role": "admin"}
+        self.assertEqual(context.verify(context.encode(payload)), (payload, 'valid'))
+        self.assertEqual(context.verify(jwt_encode({"alg": "HS256", "typ": "JWT"}, payload, "other_secret")), (None, 'invalid_signature'))
+        self.assertEqual(context.verify(jwt_encode({"alg": "HS256", "typ": "JWT", "kid": "unknown"}, payload, "my_secret_key")), (None, 'unknown_key'))
+        self.assertEqual(context.verify(jwt_encode({"alg": "HS256", "typ": "JWT"}, [1], "my_secret_key")), (None, 'malformed'))
+        self.assertEqual(context.verify("a.b"), (None, 'malformed'))
+
+        # crafted headers are rejected instead of raising, before any signature is checked
+        self.assertEqual(context.verify(jwt_encode({"alg": "HS256", "kid": [1]}, payload, "my_secret_key")), (None, 'unknown_key'))
+        self.assertEqual(context.verify(jwt_encode({"alg": "HS256", "kid": {"a": 1}}, payload, "my_secret_key")), (None, 'unknown_key'))
+        nested_header = base64url_encode(b'[' * 100000 + b']' * 100000).decode('utf-8')
+        self.assertEqual(context.verify(f"{nested_header}.e30.c2ln"), (None, 'malformed'))
+        self.assertEqual(context.verify("ä.ö.ü"), (None, 'malformed'))
+
+    def test_token_cache(self):
+
+        """
+        Test if the token cache returns cached payloads, evicts the least recently used token and drops expired tokens.
+        """
+
+        cache = TokenCache(max_size=2)
+        exp = int(datetime.now(timezone.utc).timestamp()) + 60
+
+        cache.put("token_a", {"role": "admin", "exp": exp})
+        cache.put("token_b", {"role": "regular", "exp": exp})
+        self.assertEqual(cache.get("token_a"), {"role": "admin", "exp": exp})
+
+        cache.put("token_c", {"role": "regular"})
+        self.assertIsNone(cache.get("token_b")) # least recently used
+        self.assertIsNotNone(cache.get("token_a"))
+        self.assertIsNotNone(cache.get("token_c"))
+
+        cache.put("token_d", {"role": "admin", "exp": exp - 120})
+        self.assertIsNone(cache.get("token_d"))
+
+        cache._entries[next(iter(cache._entries))]["exp"] = exp - 120 # token_a expires while cached
+        self.assertIsNone(cache.get("token_a"))
+        self.assertEqual(len(cache), 1)
+
+    def test_is_token_expired(self):
+
+        """
+        Test if a token expires at its 'exp' claim, and a token without 'exp' never expires.
+        """
+
+        self.assertTrue(is_token_expired({"exp": 100}, now=100))
+        self.assertFalse(is_token_expired({"exp": 101}, now=100))
+        self.assertFalse(is_token_expired({}, now=100))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import threading
+from helper_modules.lock_helpers import ReadWriteLock
+
+class TestReadWriteLock(unittest.TestCase):
+
+    def setUp(self):
+        self.lock = ReadWriteLock()
+
+    def run_in_thread(self, function):
+
+        """
+        Runs a function in a thread and returns whether it finished within a second.
+        """
+
+        thread = threading.Thread(target=function, daemon=True)
+        thread.start()
+        thread.join(timeout=1)
+        return not thread.is_alive()
+
+    def test_readers_share_the_lock(self):
+
+        """
+        Test if a reader acquires the lock while another reader holds it.
+        """
+
+        with self.lock.read_locked():
+            self.assertTrue(self.run_in_thread(lambda: (self.lock.acquire_read(), self.lock.release_read())))
+
+    def test_writer_excludes_readers_and_writers(self):
+
+        """
+        Test if readers and writers wait while a writer holds the lock, and proceed once it is released.
+        """
+
+        acquired = []
+        self.lock.acquire_write()
+        reader = threading.Thread(target=lambda: (self.lock.acquire_read(), acquired.append('reader'), self.lock.release_read()))
+        writer = threading.Thread(target=lambda: (self.lock.acquire_write(), acquired.append('writer'), self.lock.release_write()))
+        reader.start()
+        writer.start()
+        reader.join(timeout=0.2)
+        self.assertEqual(acquired, [])
+
+        self.lock.release_write()
+        reader.join(timeout=1)
+        writer.join(timeout=1)
+        self.assertCountEqual(acquired, ['reader', 'writer'])
+
+    def test_waiting_writer_blocks_new_readers(self):
+
+        """
+        Test if a new reader waits behind a waiting writer, so readers cannot starve writers.
+        """
+
+        self.lock.acquire_read()
+        writer = threading.Thread(target=lambda: (self.lock.acquire_write(), self.lock.release_write()), daemon=True)
+        writer.start()
+        while not self.lock._waiting_writers:
+            pass
+
+        self.assertFalse(self.run_in_thread(self.lock.acquire_read))
+        self.lock.release_read()
+        writer.join(timeout=1)
+        self.assertFalse(writer.is_alive())
+
+if __name__ == '__main__':
+    unittest.main()
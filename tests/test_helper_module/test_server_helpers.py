@@ -0,0 +1,40 @@
+import unittest
+from helper_modules.server_helpers import PreforkServer, MAX_REQUESTS_JITTER
+
+class TestPreforkServer(unittest.TestCase):
+
+    def test_config(self):
+
+        """
+        Test if the server preloads the given application and installs the fork and exit hooks.
+        """
+
+        calls = []
+        app = lambda environ, start_response: []
+        server = PreforkServer(app, 3000, workers=3, max_requests=100, before_fork=lambda: calls.append('before'),
+                               after_fork=lambda: calls.append('fork'), on_exit=lambda: calls.append('exit'))
+
+        self.assertIs(server.load(), app)
+        self.assertEqual(server.cfg.workers, 3)
+        self.assertEqual(server.cfg.max_requests, 100)
+        self.assertTrue(server.cfg.preload_app)
+        self.assertEqual(server.cfg.bind, ['0.0.0.0:3000'])
+
+        server.cfg.pre_fork(None, None)
+        server.cfg.post_fork(None, None)
+        server.cfg.worker_exit(None, None)
+        server.cfg.on_exit(None)
+        self.assertEqual(calls, ['before', 'fork', 'exit', 'exit'])
+
+    def test_no_hooks(self):
+
+        """
+        Test if the default gunicorn hooks are kept when no callbacks are given.
+        """
+
+        server = PreforkServer(lambda environ, start_response: [], 3000, workers=1)
+        server.cfg.post_fork(None, None)
+        self.assertEqual(server.cfg.max_requests_jitter, MAX_REQUESTS_JITTER)
+
+if __name__ == '__main__':
+    unittest.main()
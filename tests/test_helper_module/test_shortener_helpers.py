@@ -1,6 +1,8 @@
 import unittest
+import os
 import string
-from helper_modules.shortener_helpers import is_valid_url, generate_unique_id
+import tempfile
+from helper_modules.shortener_helpers import is_valid_url, canonicalize_url, canonicalize_urls, generate_unique_id, redirect_headers, base62_encode, BlockIdAllocator, encode_cursor, decode_cursor, to_epoch, format_timestamp
 
 # Set the length of the unique ID to use for shortened URLs
 URI_LENGTH = 8
@@ -49,6 +51,36 @@ class TestURLShortenerServiceHelperFunctions(unittest.TestCase):
         # Test case for special characters
         self.assertFalse(is_valid_url('https://www.example.com/<path>alert("test")</error>!'))
 
+    def test_redirect_headers(self):
+
+        """
+        Test if the redirect headers encode the URL as an ASCII URI for WSGI and ASGI, and are built once per URL.
+        """
+
+        wsgi_headers, asgi_headers = redirect_headers("https://www.example.com/straße?q=ü")
+        self.assertEqual(wsgi_headers, [('Location', "https://www.example.com/stra%C3%9Fe?q=%C3%BC"), ('Content-Length', '0')])
+        self.assertEqual(asgi_headers, [(b'location', b"https://www.example.com/stra%C3%9Fe?q=%C3%BC")])
+        self.assertIs(redirect_headers("https://www.example.com/straße?q=ü")[0], wsgi_headers)
+
+    def test_canonicalize_url(self):
+
+        """
+        Check if equivalent URLs get the same canonical form, and if invalid URLs are rejected, also in a batch.
+        """
+
+        self.assertEqual(canonicalize_url("HTTP://Example.COM:80/Path?q=A"), "http://example.com/Path?q=A")
+        self.assertEqual(canonicalize_url("https://www.example.com.:443/"), "https://www.example.com/")
+        self.assertEqual(canonicalize_url("https://localhost:08080"), "https://localhost:8080")
+        self.assertEqual(canonicalize_url("http://example.com:443"), "http://example.com:443")
+        self.assertEqual(canonicalize_url("https://Bücher.de/straße"), "https://xn--bcher-kva.de/straße")
+        self.assertEqual(canonicalize_url("https://пример.рф"), "https://xn--e1afmkfd.xn--p1ai")
+        self.assertTrue(is_valid_url("https://пример.рф"))
+        self.assertIsNone(canonicalize_url("https://<script>.example.com"))
+        self.assertIsNone(canonicalize_url("https://" + "a" * 64 + ".com"))
+
+        urls = ["https://www.Example.com", "invalid_url", None, "http://192.168.0.1:80"]
+        self.assertEqual(canonicalize_urls(urls), ["https://www.example.com", None, None, "http://192.168.0.1"])
+
     def test_generate_unique_id_length(self):
 
         """
@@ -71,6 +103,77 @@ class TestURLShortenerServiceHelperFunctions(unittest.TestCase):
         for char in unique_id:
             self.assertIn(char, chars, "Generated ID should only contain ASCII letters and digits.")
 
+    def test_base62_encode(self):
+
+        """
+        Check if base62_encode produces fixed-length IDs and rejects numbers that do not fit.
+        """
+
+        self.assertEqual(base62_encode(0), "00000000")
+        self.assertEqual(base62_encode(61), "0000000Z")
+        self.assertEqual(base62_encode(62), "00000010")
+        self.assertEqual(base62_encode(62 ** URI_LENGTH - 1), "Z" * URI_LENGTH)
+        with self.assertRaises(ValueError):
+            base62_encode(62 ** URI_LENGTH)
+
+    def test_block_id_allocator(self):
+
+        """
+        Check if allocators sharing a lease file hand out non-overlapping IDs, one by one or in batches, also after a restart,
+        and skip IDs that are already taken.
+        """
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            lease_file = os.path.join(temp_dir, 'id_lease.json')
+            first = BlockIdAllocator(lease_file, block_size=10)
+            second = BlockIdAllocator(lease_file, block_size=10)
+
+            ids = [first.allocate() for _ in range(25)] + [second.allocate() for _ in range(25)]
+            restarted = BlockIdAllocator(lease_file, block_size=10)
+            ids += [restarted.allocate() for _ in range(25)]
+
+            self.assertEqual(len(set(ids)), len(ids))
+            for unique_id in ids:
+                self.assertEqual(len(unique_id), URI_LENGTH)
+
+            ids += BlockIdAllocator(lease_file, block_size=10).allocate_many(35) + restarted.allocate_many(3)
+            self.assertEqual(len(set(ids)), len(ids))
+
+            # A reset allocator (e.g. in a forked process) reserves a new block instead of continuing the block of its parent
+            block_end = restarted._end
+            restarted.reset()
+            ids.append(restarted.allocate())
+            self.assertEqual(len(set(ids)), len(ids))
+            self.assertGreater(restarted._end, block_end)
+
+            allocator = BlockIdAllocator(os.path.join(temp_dir, 'other_lease.json'), block_size=10)
+            expected = BlockIdAllocator(os.path.join(temp_dir, 'expected_lease.json'), block_size=10)
+            taken = {expected.allocate()}
+            self.assertEqual(allocator.allocate(taken), expected.allocate())
+
+    def test_cursor(self):
+
+        """
+        Check if a pagination cursor decodes to the encoded sort key and malformed cursors are rejected.
+        """
+
+        cursor = encode_cursor(1681300800, "A4ABAAA3")
+        self.assertEqual(decode_cursor(cursor), (1681300800, "A4ABAAA3"))
+
+        for cursor in ["not a cursor", "e30", encode_cursor(1681300800, "A4ABAAA3")[:-3], encode_cursor("2023-04-12 12:00:00", "A4ABAAA3")]:
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor)
+
+    def test_timestamps(self):
+
+        """
+        Check if timestamps in epoch seconds and formatted timestamps of older data files convert into each other.
+        """
+
+        self.assertEqual(to_epoch(1681300800), 1681300800)
+        self.assertEqual(to_epoch(format_timestamp(1681300800)), 1681300800)
+        self.assertEqual(format_timestamp(to_epoch("2023-04-12 12:00:00")), "2023-04-12 12:00:00")
+
     def test_sorted_urls(self):
 
         """
@@ -0,0 +1,81 @@
+import unittest
+import os
+import tempfile
+from helper_modules.snapshot_helpers import is_binary_snapshot, write_binary_snapshot, load_binary_snapshot, load_table, load_snapshot_data, table_from_items, convert_snapshot
+from helper_modules.wal_helpers import load_snapshot, write_snapshot
+
+class TestSnapshotHelperFunctions(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.snapshot_path = os.path.join(self.temp_dir.name, 'url_data.json')
+        self.url_data = {f"id{i:06d}": {"url": f"https://www.example.com/{i}", "created_at": 1672531200 + i % 7} for i in range(100)}
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_binary_round_trip(self):
+
+        """
+        Test if a binary snapshot restores the records, their indexes and their order, and leaves no temporary file behind.
+        """
+
+        table = table_from_items(self.url_data.items())
+        table.delete(b"id000042")
+        write_binary_snapshot(self.snapshot_path, table, table.live_order())
+
+        self.assertTrue(is_binary_snapshot(self.snapshot_path))
+        self.assertFalse(os.path.exists(f'{self.snapshot_path}.tmp'))
+
+        loaded = load_binary_snapshot(self.snapshot_path)
+        self.assertEqual(len(loaded), 99)
+        self.assertEqual(loaded.row_url(loaded.id_index.find(b"id000007")), b"https://www.example.com/7")
+        self.assertEqual(loaded.row_id(loaded.url_index.find(b"https://www.example.com/99")), b"id000099")
+        self.assertEqual(loaded.id_index.find(b"id000042"), -1)
+        self.assertEqual([loaded.sort_key(row) for row in loaded.order], [table.sort_key(row) for row in table.live_order()])
+
+        loaded.put(b"id000100", b"https://www.example.com/100", 1672531300)
+        self.assertEqual(loaded.row_id(loaded.order[-1]), b"id000100")
+
+    def test_truncated_binary_snapshot(self):
+
+        """
+        Test if a truncated binary snapshot is rejected instead of loaded partially.
+        """
+
+        table = table_from_items(self.url_data.items())
+        write_binary_snapshot(self.snapshot_path, table, table.order)
+        with open(self.snapshot_path, 'r+b') as file:
+            file.truncate(os.path.getsize(self.snapshot_path) - 1)
+
+        with self.assertRaises(ValueError):
+            load_binary_snapshot(self.snapshot_path)
+
+    def test_convert_snapshot(self):
+
+        """
+        Test if a JSON snapshot is converted to the binary format and back without losing records.
+        """
+
+        write_snapshot(self.snapshot_path, self.url_data)
+        self.assertFalse(is_binary_snapshot(self.snapshot_path))
+
+        self.assertEqual(convert_snapshot(self.snapshot_path), 'binary')
+        self.assertTrue(is_binary_snapshot(self.snapshot_path))
+        self.assertEqual(load_snapshot_data(self.snapshot_path), self.url_data)
+        self.assertEqual(len(load_table(self.snapshot_path)), 100)
+
+        self.assertEqual(convert_snapshot(self.snapshot_path), 'json')
+        self.assertEqual(load_snapshot(self.snapshot_path), self.url_data)
+
+    def test_missing_snapshot(self):
+
+        """
+        Test if a missing snapshot loads as an empty table.
+        """
+
+        self.assertFalse(is_binary_snapshot(self.snapshot_path))
+        self.assertEqual(len(load_table(self.snapshot_path)), 0)
+
+if __name__ == '__main__':
+    unittest.main()
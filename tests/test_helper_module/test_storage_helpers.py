@@ -0,0 +1,592 @@
+import unittest
+import os
+import json
+import time
+import tempfile
+import threading
+from unittest.mock import MagicMock
+from helper_modules.shortener_helpers import format_timestamp
+from helper_modules.storage_helpers import Storage, MemoryStorage, SQLiteStorage, create_storage
+from helper_modules.snapshot_helpers import convert_snapshot, is_binary_snapshot
+from helper_modules.table_helpers import VACUUM_MIN_ROWS
+from helper_modules.wal_helpers import ROTATED_SUFFIX, encode_record, read_log
+
+class StorageTests:
+
+    """
+    Test cases shared by all storage backends. Subclasses implement open_store.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = self.open_store()
+
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def test_put_get_delete(self):
+
+        """
+        Test if records can be stored, retrieved, replaced and removed.
+        """
+
+        self.store.put("abcdefgh", {"url": "https://www.example.com", "created_at": 1672531200})
+        self.assertEqual(self.store.get("abcdefgh"), {"url": "https://www.example.com", "created_at": 1672531200})
+        self.assertIn("abcdefgh", self.store)
+
+        self.store.put("abcdefgh", {"url": "https://www.example.org", "created_at": 1672531200})
+        self.assertEqual(self.store.get("abcdefgh")["url"], "https://www.example.org")
+        self.assertEqual(self.store.count(), 1)
+
+        self.assertTrue(self.store.delete("abcdefgh"))
+        self.assertFalse(self.store.delete("abcdefgh"))
+        self.assertIsNone(self.store.get("abcdefgh"))
+        self.assertEqual(self.store.count(), 0)
+
+    def test_put_many(self):
+
+        """
+        Test if a batch of records is stored and indexed, and survives reopening the store.
+        """
+
+        items = [(f"id{i:06d}", {"url": f"https://www.example.com/{i}", "created_at": 1672531200}) for i in range(100)]
+        self.store.put_many(items)
+        self.store.close()
+
+        self.store = self.open_store()
+        self.assertEqual(self.store.count(), 100)
+        self.assertEqual(self.store.find_by_url("https://www.example.com/42"), "id000042")
+        self.assertEqual(len(list(self.store.iter_by_created_at())), 100)
+
+    def test_put_many_new(self):
+
+        """
+        Test if a batch stores only URLs that are not stored yet, and if threads that store batches of the same URLs at the same time store each URL once.
+        """
+
+        self.store.put("aaaaaaaa", {"url": "https://www.example.com/a", "created_at": 1672531200})
+        items = [("bbbbbbbb", {"url": "https://www.example.com/a", "created_at": 1672531200}),
+                 ("cccccccc", {"url": "https://www.example.com/c", "created_at": 1672531200}),
+                 ("dddddddd", {"url": "https://www.example.com/c", "created_at": 1672531200})]
+        self.assertEqual(self.store.put_many_new(items), ["aaaaaaaa", None, "cccccccc"])
+        self.assertEqual(self.store.count(), 2)
+
+        def worker(thread):
+            self.store.put_many_new([(f"t{thread}{i:06d}", {"url": f"https://www.example.com/shared/{i}", "created_at": 1672531200}) for i in range(50)])
+        threads = [threading.Thread(target=worker, args=(thread,)) for thread in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.store.count(), 52)
+        self.store.close()
+
+        self.store = self.open_store()
+        self.assertEqual(self.store.count(), 52)
+        self.assertEqual(self.store.find_by_url("https://www.example.com/c"), "cccccccc")
+
+    def test_update_delete_many(self):
+
+        """
+        Test if batches of updates and removals report per ID whether it was stored, and survive reopening the store.
+        """
+
+        self.store.put_many([(f"id{i:06d}", {"url": f"https://www.example.com/{i}", "created_at": 1672531200 + i}) for i in range(100)])
+
+        self.assertEqual(self.store.update_many([("id000001", "https://www.example.org/1"), ("missing", "https://www.example.org/2")]), [True, False])
+        self.assertEqual(self.store.get("id000001"), {"url": "https://www.example.org/1", "created_at": 1672531201})
+
+        deleted_ids = [f"id{i:06d}" for i in range(0, 100, 2)]
+        self.assertEqual(self.store.delete_many(deleted_ids + ["missing"]), [True] * 50 + [False])
+        self.store.close()
+
+        self.store = self.open_store()
+        self.assertEqual(self.store.count(), 50)
+        self.assertEqual(self.store.find_by_url("https://www.example.org/1"), "id000001")
+        self.assertEqual([id for id, _ in self.store.iter_by_created_at(reverse=False)], [f"id{i:06d}" for i in range(1, 100, 2)])
+
+    def test_find_by_url(self):
+
+        """
+        Test if the reverse lookup from URL to ID follows updates and deletes.
+        """
+
+        self.store.put("abcdefgh", {"url": "https://www.example.com", "created_at": 1672531200})
+        self.assertEqual(self.store.find_by_url("https://www.example.com"), "abcdefgh")
+
+        self.store.put("abcdefgh", {"url": "https://www.example.org", "created_at": 1672531200})
+        self.assertIsNone(self.store.find_by_url("https://www.example.com"))
+        self.assertEqual(self.store.find_by_url("https://www.example.org"), "abcdefgh")
+
+        self.store.delete("abcdefgh")
+        self.assertIsNone(self.store.find_by_url("https://www.example.org"))
+
+    def test_find_by_url_stored_twice(self):
+
+        """
+        Test if a URL that an update stored under a second ID is still found under the first ID once the second one is deleted, also after reopening.
+        """
+
+        self.store.put_many([("aaaaaaaa", {"url": "http://a.com", "created_at": 1672531200}), ("bbbbbbbb", {"url": "http://b.com", "created_at": 1672531200})])
+        self.assertEqual(self.store.update_many([("bbbbbbbb", "http://a.com")]), [True])
+        self.assertIn(self.store.find_by_url("http://a.com"), ("aaaaaaaa", "bbbbbbbb"))
+
+        self.assertTrue(self.store.delete("bbbbbbbb"))
+        self.assertEqual(self.store.find_by_url("http://a.com"), "aaaaaaaa")
+        self.store.close()
+
+        self.store = self.open_store()
+        self.assertEqual(self.store.find_by_url("http://a.com"), "aaaaaaaa")
+
+    def test_iter_by_created_at(self):
+
+        """
+        Test if records are iterated in order of creation.
+        """
+
+        self.store.put("bbbbbbbb", {"url": "https://www.example2.com", "created_at": 1648843920})
+        self.store.put("cccccccc", {"url": "https://www.example1.com", "created_at": 1689845400})
+        self.store.put("aaaaaaaa", {"url": "https://www.example3.com", "created_at": 1681300800})
+
+        self.assertEqual([id for id, _ in self.store.iter_by_created_at()], ["cccccccc", "aaaaaaaa", "bbbbbbbb"])
+        self.assertEqual([id for id, _ in self.store.iter_by_created_at(reverse=False)], ["bbbbbbbb", "aaaaaaaa", "cccccccc"])
+        self.assertCountEqual(self.store.ids(), ["aaaaaaaa", "bbbbbbbb", "cccccccc"])
+
+    def test_page_by_created_at(self):
+
+        """
+        Test if keyset pages neither skip nor repeat records while records are inserted and deleted between pages.
+        """
+
+        for i in range(10):
+            self.store.put(f"id{i:06d}", {"url": f"https://www.example.com/{i}", "created_at": 1672531200 + i})
+
+        first_page = self.store.page_by_created_at(4)
+        self.assertEqual([id for id, _ in first_page], ["id000009", "id000008", "id000007", "id000006"])
+
+        self.store.delete("id000009")
+        self.store.delete("id000005")
+        self.store.put("id000010", {"url": "https://www.example.com/10", "created_at": 1672531210})
+
+        id, value = first_page[-1]
+        second_page = self.store.page_by_created_at(4, (value["created_at"], id))
+        self.assertEqual([id for id, _ in second_page], ["id000004", "id000003", "id000002", "id000001"])
+
+        ascending_page = self.store.page_by_created_at(3, (1672531202, "id000002"), reverse=False)
+        self.assertEqual([id for id, _ in ascending_page], ["id000003", "id000004", "id000006"])
+
+    def test_reopen(self):
+
+        """
+        Test if stored records survive closing and reopening the store.
+        """
+
+        self.store.put("abcdefgh", {"url": "https://www.example.com", "created_at": 1672531200})
+        self.store.close()
+
+        self.store = self.open_store()
+        self.assertEqual(self.store.get("abcdefgh")["url"], "https://www.example.com")
+        self.assertEqual(self.store.find_by_url("https://www.example.com"), "abcdefgh")
+
+    def test_concurrent_writes(self):
+
+        """
+        Stress test: threads that create, update and delete records at the same time lose none of their writes,
+        and threads that create the same URL at the same time store it only once.
+        """
+
+        threads_count, records_count = 8, 100
+        errors = []
+
+        def worker(thread):
+            try:
+                for i in range(records_count):
+                    id = f"t{thread}{i:06d}"
+                    self.store.put(id, {"url": f"https://www.example.com/{thread}/{i}", "created_at": 1672531200 + i})
+                    self.store.put_new(f"s{thread}{i:06d}", {"url": f"https://www.example.com/shared/{i}", "created_at": 1672531200})
+                    if i % 2:
+                        self.assertEqual(self.store.update_many([(id, f"https://www.example.org/{thread}/{i}")]), [True])
+                    if i % 5 == 0:
+                        self.assertTrue(self.store.delete(id))
+            except Exception as e: # reported on the main thread
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(thread,)) for thread in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+        def check():
+            self.assertEqual(self.store.count(), threads_count * records_count * 4 // 5 + records_count)
+            for thread in range(threads_count):
+                for i in range(records_count):
+                    value = self.store.get(f"t{thread}{i:06d}")
+                    if i % 5 == 0:
+                        self.assertIsNone(value)
+                    else:
+                        self.assertEqual(value["url"], f"https://www.example.{'org' if i % 2 else 'com'}/{thread}/{i}")
+            self.assertEqual(len({self.store.find_by_url(f"https://www.example.com/shared/{i}") for i in range(records_count)}), records_count)
+
+        check()
+        self.store.close()
+        self.store = self.open_store()
+        check()
+
+    def test_formatted_timestamp(self):
+
+        """
+        Test if a timestamp formatted by an older version of the service is stored in epoch seconds.
+        """
+
+        self.store.put("abcdefgh", {"url": "https://www.example.com", "created_at": format_timestamp(1672531200)})
+        self.assertEqual(self.store.get("abcdefgh")["created_at"], 1672531200)
+
+    def test_after_fork(self):
+
+        """
+        Test if a forked worker process can read the data of its parent and persist writes of its own.
+        """
+
+        self.store.put("abcdefgh", {"url": "https://www.example.com", "created_at": 1672531200})
+
+        self.store.before_fork()
+        pid = os.fork()
+        if pid == 0:
+            self.store.after_fork()
+            self.store.put("bcdefghi", {"url": "https://www.example.org", "created_at": 1672531201})
+            ok = self.store.get("abcdefgh") is not None and self.store.count() == 2
+            self.store.close()
+            os._exit(0 if ok else 1)
+        self.assertEqual(os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1]), 0)
+
+        self.store.close()
+        self.store = self.open_store()
+        self.assertEqual(self.store.get("bcdefghi")["url"], "https://www.example.org")
+
+class TestMemoryStorage(StorageTests, unittest.TestCase):
+
+    def open_store(self):
+        return MemoryStorage(os.path.join(self.temp_dir.name, 'url_data.json'))
+
+    def test_vacuum(self):
+
+        """
+        Test if the table is compacted once most of its rows are dead, and every record survives it.
+        """
+
+        items = [(f"id{i:06d}", {"url": f"https://www.example.com/{i}", "created_at": 1672531200 + i}) for i in range(100)]
+        for _ in range(VACUUM_MIN_ROWS // 100 + 2):
+            self.store.put_many(items)
+
+        self.assertLess(len(self.store.table.created), VACUUM_MIN_ROWS)
+        self.assertEqual(self.store.count(), 100)
+        self.assertEqual(self.store.find_by_url("https://www.example.com/42"), "id000042")
+        self.assertEqual([id for id, _ in self.store.iter_by_created_at(reverse=False)], [id for id, _ in items])
+
+    def test_invalid_id(self):
+
+        """
+        Test if IDs that do not fit the table are rejected on writes and not found on reads.
+        """
+
+        with self.assertRaises(ValueError):
+            self.store.put("short", {"url": "https://www.example.com", "created_at": 1672531200})
+        self.assertIsNone(self.store.get("short"))
+        self.assertNotIn("short", self.store)
+        self.assertFalse(self.store.delete("short"))
+
+    def test_load_invalid_id(self):
+
+        """
+        Test if records of an older data file whose IDs do not fit the table are skipped with a warning instead of failing the load.
+        """
+
+        self.store.close()
+        data_file = os.path.join(self.temp_dir.name, 'legacy_data.json')
+        with open(data_file, 'w') as file:
+            json.dump({"abcdefgh": {"url": "https://www.example.com/a", "created_at": 1672531200},
+                       "legacy1234": {"url": "https://www.example.com/b", "created_at": 1672531201}}, file)
+        with open(f'{data_file}.log', 'wb') as file:
+            file.write(encode_record({"op": "put", "id": "short", "value": {"url": "https://www.example.com/c", "created_at": 1672531202}}))
+            file.write(encode_record({"op": "put", "id": "ijklmnop", "value": {"url": "https://www.example.com/d", "created_at": 1672531203}}))
+
+        with self.assertLogs('helper_modules', level='WARNING') as logs:
+            self.store = MemoryStorage(data_file)
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(sorted(self.store.ids()), ["abcdefgh", "ijklmnop"])
+        self.assertEqual(self.store.skipped_records, 1)
+        self.assertIsNone(self.store.get("legacy1234"))
+
+    def test_reads_during_save(self):
+
+        """
+        Stress test: while the data file is being rewritten, lookups and pages are served without waiting for the save.
+        """
+
+        self.store.close()
+        self.store = MemoryStorage(os.path.join(self.temp_dir.name, 'url_data.json'), persistence_mode='json')
+        self.store.put_many([(f"id{i:06d}", {"url": f"https://www.example.com/{i}", "created_at": 1672531200 + i}) for i in range(100)])
+
+        saving, release = threading.Event(), threading.Event()
+        write_snapshot = self.store._write_snapshot
+        def blocking_write_snapshot(table, order):
+            saving.set()
+            release.wait()
+            write_snapshot(table, order)
+        self.store._write_snapshot = blocking_write_snapshot
+
+        writer = threading.Thread(target=self.store.put, args=("id000100", {"url": "https://www.example.com/100", "created_at": 1672531300}))
+        writer.start()
+        self.assertTrue(saving.wait(timeout=5))
+
+        reads = []
+        def reader():
+            for _ in range(100):
+                reads.append(self.store.get("id000100") is not None)
+                reads.append(len(self.store.page_by_created_at(10)) == 10)
+                reads.append(self.store.find_by_url("https://www.example.com/42") == "id000042")
+        thread = threading.Thread(target=reader)
+        thread.start()
+        thread.join(timeout=5)
+        stalled = thread.is_alive()
+
+        release.set()
+        writer.join()
+        thread.join()
+        self.assertFalse(stalled)
+        self.assertTrue(all(reads))
+
+        self.store.close()
+        self.store = MemoryStorage(os.path.join(self.temp_dir.name, 'url_data.json'), persistence_mode='json')
+        self.assertEqual(self.store.count(), 101)
+
+    def test_binary_snapshot(self):
+
+        """
+        Test if a store in the binary snapshot format compacts into a binary snapshot, and a JSON data file keeps its format.
+        """
+
+        self.store.close()
+        data_file = os.path.join(self.temp_dir.name, 'url_data.json')
+        self.store = MemoryStorage(data_file, compact_threshold=1)
+        self.store.put("abcdefgh", {"url": "https://www.example.com", "created_at": 1672531200})
+        self.store.close()
+
+        self.store = MemoryStorage(data_file, compact_threshold=1, snapshot_format='binary')
+        self.assertEqual(self.store.snapshot_format, 'json')
+        self.store.close()
+
+        convert_snapshot(data_file)
+        self.store = MemoryStorage(data_file, compact_threshold=1)
+        self.assertEqual(self.store.snapshot_format, 'binary')
+        self.store.put("bcdefghi", {"url": "https://www.example.org", "created_at": 1672531201})
+        self.store.close()
+
+        self.assertTrue(is_binary_snapshot(data_file))
+        self.assertFalse(os.path.exists(f'{data_file}.log{ROTATED_SUFFIX}'))
+        self.store = self.open_store()
+        self.assertEqual([id for id, _ in self.store.iter_by_created_at(reverse=False)], ["abcdefgh", "bcdefghi"])
+
+    def test_durability_modes(self):
+
+        """
+        Test if every durability mode persists the writes of both persistence modes, and closing the store drains writes that were not flushed yet.
+        """
+
+        self.store.close()
+        for persistence_mode in ('log', 'json'):
+            for durability in ('sync', 'group', 'async'):
+                data_file = os.path.join(self.temp_dir.name, f'{persistence_mode}_{durability}.json')
+                self.store = MemoryStorage(data_file, persistence_mode=persistence_mode, durability=durability, flush_interval=60)
+                self.store.put_many([(f"id{i:06d}", {"url": f"https://www.example.com/{i}", "created_at": 1672531200 + i}) for i in range(10)])
+                self.store.delete("id000003")
+                self.store.close()
+
+                self.store = MemoryStorage(data_file, persistence_mode=persistence_mode)
+                self.assertEqual(self.store.count(), 9, (persistence_mode, durability))
+                self.assertIsNone(self.store.get("id000003"))
+                self.store.close()
+        self.store = self.open_store()
+
+    def test_after_fork_catch_up(self):
+
+        """
+        Test if a forked worker replays the records appended since its parent stopped following the log,
+        and if a log beyond the threshold is compacted on startup.
+        """
+
+        data_file = os.path.join(self.temp_dir.name, 'url_data.json')
+        self.store.before_fork()
+        other = MemoryStorage(data_file)
+        other.put("abcdefgh", {"url": "https://www.example.com", "created_at": 1672531200})
+        other.close()
+        self.assertIsNone(self.store.get("abcdefgh"))
+
+        self.store.after_fork()
+        self.assertEqual(self.store.get("abcdefgh")["url"], "https://www.example.com")
+        self.store.put("bcdefghi", {"url": "https://www.example.org", "created_at": 1672531201})
+        self.assertTrue(os.path.getsize(self.store.log_file) > 0)
+        self.store.close()
+
+        self.store = MemoryStorage(data_file, compact_threshold=1)
+        self.store.close()
+        self.assertFalse(os.path.exists(self.store.log_file + ROTATED_SUFFIX))
+        self.assertEqual(read_log(self.store.log_file)[0], [{"op": "gen", "gen": 1}])
+        self.store = MemoryStorage(data_file)
+        self.assertEqual(self.store.count(), 2)
+
+        self.store.close()
+        self.store = MemoryStorage(data_file, persistence_mode='json')
+        with self.assertRaises(ValueError):
+            self.store.after_fork()
+
+    def wait_for(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def test_write_error(self):
+
+        """
+        Test if a write that fails to persist stops the store from accepting writes, in 'sync' mode at once and in 'async' mode
+        before the next mutation is applied, and if the IDs of the failed writes do not shadow the writes of other processes.
+        """
+
+        data_file = os.path.join(self.temp_dir.name, 'url_data.json')
+        for durability in ('sync', 'async'):
+            self.store.close()
+            self.store = MemoryStorage(data_file, durability=durability, follow_interval=3600)
+            self.store.wal.append_many = MagicMock(side_effect=OSError("disk full"))
+            if durability == 'sync':
+                with self.assertRaises(OSError):
+                    self.store.put("abcdefgh", {"url": "https://www.example.com/sync", "created_at": 1672531200})
+            else:
+                self.store.put("abcdefgh", {"url": "https://www.example.com/async", "created_at": 1672531200})
+                self.wait_for(lambda: self.store._writer._error is not None)
+            self.assertEqual(len(self.store._unlogged), 0 if durability == 'sync' else 1)
+
+            with self.assertRaises(OSError):
+                self.store.put("bcdefghi", {"url": "https://www.example.org", "created_at": 1672531201})
+            self.assertIsNone(self.store.get("bcdefghi"))
+            self.assertIsInstance(self.store.write_error, OSError)
+            self.assertEqual(len(self.store._unlogged), 0)
+            with self.assertRaises(OSError):
+                self.store.delete("abcdefgh")
+
+            other = MemoryStorage(data_file, follow_interval=3600)
+            other.put("abcdefgh", {"url": f"https://www.example.net/{durability}", "created_at": 1672531202})
+            other.close()
+            self.store._follower.poll()
+            self.assertEqual(self.store.get("abcdefgh")["url"], f"https://www.example.net/{durability}")
+
+    def test_follow(self):
+
+        """
+        Test if stores sharing a data file pick up each other's writes from the log, and report the propagation lag.
+        """
+
+        data_file = os.path.join(self.temp_dir.name, 'url_data.json')
+        other = MemoryStorage(data_file, follow_interval=0.01)
+        self.store.put("abcdefgh", {"url": "https://www.example.com", "created_at": 1672531200})
+        other.put_many([("bcdefghi", {"url": "https://www.example.org", "created_at": 1672531201}),
+                        ("cdefghij", {"url": "https://www.example.net", "created_at": 1672531202})])
+        other.delete("cdefghij")
+
+        self.wait_for(lambda: self.store.count() == 2 and other.count() == 2)
+        self.assertEqual(self.store.get("bcdefghi")["url"], "https://www.example.org")
+        self.assertEqual(other.find_by_url("https://www.example.com"), "abcdefgh")
+        self.assertEqual([id for id, _ in self.store.iter_by_created_at(reverse=False)], ["abcdefgh", "bcdefghi"])
+
+        metrics = self.store.metrics()
+        self.assertEqual(metrics['replicated_records_total'], 2)
+        self.assertGreaterEqual(metrics['replication_lag_seconds'], 0)
+        self.assertEqual(metrics['replication_poll_errors_total'], 0)
+        self.assertEqual(other.metrics()['replicated_records_total'], 1)
+        other.close()
+
+    def test_follow_conflict(self):
+
+        """
+        Test if concurrent writes to the same ID converge on the write that comes last in the log, in every store.
+        """
+
+        data_file = os.path.join(self.temp_dir.name, 'url_data.json')
+        other = MemoryStorage(data_file)
+        self.store.before_fork()
+        other.before_fork()
+
+        other.put("abcdefgh", {"url": "https://www.example.org", "created_at": 1672531200})
+        self.store.put("abcdefgh", {"url": "https://www.example.com", "created_at": 1672531200})
+        self.store._follower.poll()
+        other._follower.poll()
+
+        self.assertEqual(self.store.get("abcdefgh")["url"], "https://www.example.com")
+        self.assertEqual(other.get("abcdefgh")["url"], "https://www.example.com")
+        self.assertEqual(len(self.store._unlogged), 0)
+        other.close()
+
+    def test_follow_rotation(self):
+
+        """
+        Test if a store follows the log across a compaction by another store, and loads the state again when it missed a whole generation of the log.
+        """
+
+        data_file = os.path.join(self.temp_dir.name, 'url_data.json')
+        self.store.before_fork()
+        other = MemoryStorage(data_file, compact_threshold=1)
+
+        for i in range(3):
+            other.put(f"id{i:06d}", {"url": f"https://www.example.com/{i}", "created_at": 1672531200 + i})
+            other._compactor.join()
+            if i == 0:
+                self.store._follower.poll()
+                self.assertEqual(self.store._follower.generation, 1)
+                self.assertEqual(self.store.count(), 1)
+        self.assertEqual(other.wal.generation, 3)
+
+        self.store.put("abcdefgh", {"url": "https://www.example.org", "created_at": 1672531300})
+        self.store._follower.poll()
+        self.assertEqual(self.store._follower.generation, 3)
+        self.assertEqual(self.store.count(), 4)
+        other.close()
+
+        self.store.close()
+        self.store = self.open_store()
+        self.assertEqual(self.store.count(), 4)
+
+class TestSQLiteStorage(StorageTests, unittest.TestCase):
+
+    def open_store(self):
+        return SQLiteStorage(os.path.join(self.temp_dir.name, 'url_data.db'))
+
+class TestCreateStorage(unittest.TestCase):
+
+    def test_invalid_backend(self):
+
+        """
+        Test if an unknown backend is rejected.
+        """
+
+        with self.assertRaises(ValueError):
+            create_storage('redis', 'url_data.json')
+
+    def test_incomplete_backend(self):
+
+        """
+        Test if a backend that does not implement the whole interface cannot be created.
+        """
+
+        class IncompleteStorage(Storage):
+
+            def get(self, id):
+                return None
+
+        with self.assertRaises(TypeError):
+            IncompleteStorage()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import unittest
+from helper_modules.table_helpers import RecordTable, HashIndex, pack_id
+
+class TestTableHelperFunctions(unittest.TestCase):
+
+    def setUp(self):
+        self.table = RecordTable()
+
+    def put(self, id, url, created, ordered=True):
+        self.table.put(id.encode('ascii'), url.encode('utf-8'), created, ordered)
+
+    def test_pack_id(self):
+
+        """
+        Test if IDs are packed to fixed-width bytes and IDs that can never be stored are rejected.
+        """
+
+        self.assertEqual(pack_id("abcdefgh"), b"abcdefgh")
+        self.assertIsNone(pack_id("short"))
+        self.assertIsNone(pack_id("abcdefgé"))
+
+    def test_hash_index(self):
+
+        """
+        Test if the hash index finds every key after growing, and forgets removed keys.
+        """
+
+        keys = [f"{i:08d}".encode('ascii') for i in range(1000)]
+        index = HashIndex(lambda row: keys[row])
+        for row, key in enumerate(keys):
+            index.insert(key, row)
+
+        self.assertEqual(index.size, 1000)
+        self.assertTrue(all(index.find(key) == row for row, key in enumerate(keys)))
+
+        self.assertTrue(index.remove(keys[42], 42))
+        self.assertFalse(index.remove(keys[42], 42))
+        self.assertEqual(index.find(keys[42]), -1)
+        self.assertEqual(index.find(b"missing!"), -1)
+
+    def test_put_replace_delete(self):
+
+        """
+        Test if replacing a record leaves a dead row behind and moves both indexes and the order to the new row,
+        and if a dead row stays in the order as a tombstone that is replaced when its ID is stored again with the same timestamp.
+        """
+
+        self.put("bbbbbbbb", "https://www.example.com/b", 2)
+        self.put("aaaaaaaa", "https://www.example.com/a", 1)
+        self.put("aaaaaaaa", "https://www.example.com/é", 3)
+
+        row = self.table.id_index.find(b"aaaaaaaa")
+        self.assertEqual(self.table.row_url(row).decode('utf-8'), "https://www.example.com/é")
+        self.assertEqual(self.table.url_index.find(b"https://www.example.com/a"), -1)
+        self.assertEqual([self.table.row_id(row) for row in self.table.live_order()], [b"bbbbbbbb", b"aaaaaaaa"])
+        self.assertEqual((len(self.table), self.table.dead_rows), (2, 1))
+
+        self.assertTrue(self.table.delete(b"bbbbbbbb"))
+        self.assertFalse(self.table.delete(b"bbbbbbbb"))
+        self.assertEqual([self.table.row_id(row) for row in self.table.live_order()], [b"aaaaaaaa"])
+        self.assertEqual(len(self.table.order), 3)
+
+        self.put("bbbbbbbb", "https://www.example.com/b", 2)
+        self.assertEqual([self.table.row_id(row) for row in self.table.order], [b"aaaaaaaa", b"bbbbbbbb", b"aaaaaaaa"])
+        self.assertEqual(self.table.order[1], self.table.id_index.find(b"bbbbbbbb"))
+        self.assertEqual(list(self.table.vacuumed().order), [0, 1])
+
+    def test_url_stored_twice(self):
+
+        """
+        Test if a URL that is stored under two IDs, e.g. after an update, is still found under one ID once the other one is deleted or updated.
+        """
+
+        self.put("aaaaaaaa", "https://www.example.com/a", 1)
+        self.put("bbbbbbbb", "https://www.example.com/b", 2)
+        self.put("bbbbbbbb", "https://www.example.com/a", 2)
+        self.assertIn(self.table.url_index.find(b"https://www.example.com/a"), (self.table.id_index.find(b"aaaaaaaa"), self.table.id_index.find(b"bbbbbbbb")))
+
+        self.assertTrue(self.table.delete(b"bbbbbbbb"))
+        self.assertEqual(self.table.url_index.find(b"https://www.example.com/a"), self.table.id_index.find(b"aaaaaaaa"))
+        self.put("cccccccc", "https://www.example.com/a", 3)
+        self.put("aaaaaaaa", "https://www.example.com/c", 1)
+        self.assertEqual(self.table.url_index.find(b"https://www.example.com/a"), self.table.id_index.find(b"cccccccc"))
+        self.assertEqual(self.table.vacuumed().url_index.size, 2)
+
+    def test_page(self):
+
+        """
+        Test if pages skip the tombstones of deleted and updated records, in both directions, and still hold `limit` rows.
+        """
+
+        for i in range(20):
+            self.put(f"id{i:06d}", f"https://www.example.com/{i}", i)
+        for i in range(0, 20, 3):
+            self.table.delete(f"id{i:06d}".encode('ascii'))
+        self.put("id000004", "https://www.example.org/4", 4)
+        live = [i for i in range(20) if i % 3]
+
+        def ids(rows):
+            return [int(self.table.row_id(row)[2:]) for row in rows]
+
+        self.assertEqual(ids(self.table.page(5)), live[::-1][:5])
+        self.assertEqual(ids(self.table.page(5, (live[-5], f"id{live[-5]:06d}".encode('ascii')))), live[::-1][5:10])
+        self.assertEqual(ids(self.table.page(5, reverse=False)), live[:5])
+        self.assertEqual(ids(self.table.page(5, (3, b"id000003"), reverse=False)), live[2:7])
+        self.assertEqual(ids(self.table.page(100, reverse=False)), live)
+        self.assertEqual(self.table.position_of((5, b"id000005")), 5)
+
+    def test_build_order(self):
+
+        """
+        Test if the order built after an unordered load matches the order maintained on every put.
+        """
+
+        ordered = RecordTable()
+        for i in [5, 3, 9, 3, 1, 7]:
+            self.put(f"id{i:06d}", f"https://www.example.com/{i}", i % 4, ordered=False)
+            ordered.put(f"id{i:06d}".encode('ascii'), f"https://www.example.com/{i}".encode('utf-8'), i % 4)
+        self.table.build_order()
+
+        self.assertEqual(list(self.table.order), list(ordered.order))
+
+    def test_vacuumed(self):
+
+        """
+        Test if a vacuumed copy only keeps the live rows and still finds them by ID and URL.
+        """
+
+        for i in range(10):
+            self.put(f"id{i:06d}", f"https://www.example.com/{i}", i)
+            self.put(f"id{i:06d}", f"https://www.example.org/{i}", i)
+        self.table.delete(b"id000000")
+
+        table = self.table.vacuumed()
+        self.assertEqual((len(table.created), table.dead_rows), (9, 0))
+        self.assertEqual(table.row_url(table.id_index.find(b"id000005")), b"https://www.example.org/5")
+        self.assertEqual(table.row_id(table.url_index.find(b"https://www.example.org/9")), b"id000009")
+        self.assertEqual([table.row_id(row) for row in table.order], [f"id{i:06d}".encode('ascii') for i in range(1, 10)])
+
+if __name__ == '__main__':
+    unittest.main()
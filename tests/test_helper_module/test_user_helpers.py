@@ -0,0 +1,139 @@
+import unittest
+import os
+import tempfile
+import threading
+from helper_modules.user_helpers import UserStore
+from helper_modules.wal_helpers import ROTATED_SUFFIX, read_log
+
+class TestUserStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_file = os.path.join(self.temp_dir.name, 'users.json')
+        self.store = UserStore(self.data_file)
+
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def test_create_and_set_password(self):
+
+        """
+        Test if users are created once, and a password hash is only replaced if it is still the expected one.
+        """
+
+        self.assertTrue(self.store.create("test_user", "hash_1", "regular"))
+        self.assertFalse(self.store.create("test_user", "hash_2", "admin"))
+        self.assertEqual(self.store.get("test_user"), {'password': "hash_1", 'role': "regular"})
+        self.assertIsNone(self.store.get("other_user"))
+
+        self.assertFalse(self.store.set_password("test_user", "hash_3", expected="hash_0"))
+        self.assertTrue(self.store.set_password("test_user", "hash_3", expected="hash_1"))
+        self.assertTrue(self.store.set_password("test_user", "hash_4"))
+        self.assertFalse(self.store.set_password("other_user", "hash_4"))
+        self.assertEqual(self.store.get("test_user"), {'password': "hash_4", 'role': "regular"})
+        self.assertIn("test_user", self.store)
+        self.assertEqual(len(self.store), 1)
+
+    def test_create_many(self):
+
+        """
+        Test if users are created in one batch record, skipping taken usernames and usernames repeated within the batch.
+        """
+
+        self.store.create("test_user", "hash_1", "regular")
+        created = self.store.create_many([("test_user", "hash_2", "regular"), ("new_user", "hash_3", "admin"), ("new_user", "hash_4", "regular")])
+        self.assertEqual(created, [False, True, False])
+        self.assertEqual(self.store.create_many([]), [])
+        self.assertEqual(self.store.get("test_user")['password'], "hash_1")
+        self.assertEqual(self.store.get("new_user"), {'password': "hash_3", 'role': "admin"})
+        self.store.close()
+
+        self.assertEqual(read_log(self.store.log_file)[0][-1], {"op": "batch", "records": [{"op": "put", "id": "new_user", "value": "admin:hash_3"}]})
+        self.store = UserStore(self.data_file)
+        self.assertEqual(self.store.get("new_user"), {'password': "hash_3", 'role': "admin"})
+
+    def test_concurrent_create(self):
+
+        """
+        Test if of many threads creating the same usernames, exactly one succeeds per username.
+        """
+
+        usernames = [f"user_{i}" for i in range(200)]
+        barrier = threading.Barrier(8)
+        created = []
+        def create(thread):
+            barrier.wait()
+            created.extend((username, thread) for username in usernames if self.store.create(username, f"hash_{thread}", "regular"))
+        threads = [threading.Thread(target=create, args=(thread,)) for thread in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(username for username, _ in created), sorted(usernames))
+        self.assertTrue(all(self.store.get(username)['password'] == f"hash_{thread}" for username, thread in created))
+
+    def test_persistence_and_compaction(self):
+
+        """
+        Test if users are restored from the log and from the snapshot it is compacted into.
+        """
+
+        self.store.create("test_user", "hash_1", "regular")
+        self.store.set_password("test_user", "hash_2")
+        self.store.close()
+
+        self.store = UserStore(self.data_file, compact_threshold=1)
+        self.assertEqual(self.store.get("test_user")['password'], "hash_2")
+        self.store.create("other_user", "hash_3", "admin")
+        self.store.close()
+        self.assertFalse(os.path.exists(self.store.log_file + ROTATED_SUFFIX))
+        self.assertEqual(read_log(self.store.log_file)[0], [{"op": "gen", "gen": 1}])
+
+        self.store = UserStore(self.data_file)
+        self.assertEqual(self.store.get("test_user"), {'password': "hash_2", 'role': "regular"})
+        self.assertEqual(self.store.get("other_user"), {'password': "hash_3", 'role': "admin"})
+
+    def test_exclusive(self):
+
+        """
+        Test if an exclusive store, e.g. of an import, cannot be opened next to another store of the same data file, nor another store next to it.
+        """
+
+        with self.assertRaises(ValueError):
+            UserStore(self.data_file, exclusive=True)
+        self.store.close()
+
+        exclusive_store = UserStore(self.data_file, exclusive=True)
+        with self.assertRaises(ValueError):
+            UserStore(self.data_file)
+        exclusive_store.close()
+        self.store = UserStore(self.data_file)
+
+    def test_after_fork_catch_up(self):
+
+        """
+        Test if a forked worker reads the users that an earlier worker created after the store was loaded, also across a compaction.
+        """
+
+        other = UserStore(self.data_file)
+        other.create("test_user", "hash_1", "regular")
+        other.close()
+        self.assertIsNone(self.store.get("test_user"))
+        self.store.after_fork()
+        self.assertEqual(self.store.get("test_user")['password'], "hash_1")
+
+        other = UserStore(self.data_file, compact_threshold=1)
+        other.create("other_user", "hash_2", "regular")
+        other.close()
+        self.store.after_fork()
+        self.assertEqual(len(self.store), 2)
+        self.store.create("third_user", "hash_3", "regular")
+        self.store.close()
+
+        self.store = UserStore(self.data_file)
+        self.assertEqual(len(self.store), 3)
+
+if __name__ == '__main__':
+    unittest.main()
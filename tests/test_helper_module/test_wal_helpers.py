@@ -0,0 +1,210 @@
+import unittest
+import os
+import tempfile
+import threading
+from helper_modules.wal_helpers import BackgroundWriter, LogFollower, WriteAheadLog, ROTATED_SUFFIX, encode_record, decode_record, read_log, apply_record, load_snapshot, write_snapshot
+
+class TestWALHelperFunctions(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self.temp_dir.name, 'data.log')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_encode_decode_record(self):
+
+        """
+        Test if a record survives encoding and decoding, and a corrupted record is rejected.
+        """
+
+        record = {"op": "put", "id": "abcdefgh", "value": {"url": "https://www.example.com"}}
+        line = encode_record(record)
+
+        self.assertEqual(decode_record(line), record)
+        self.assertIsNone(decode_record(line[:-5]))
+        self.assertIsNone(decode_record(line.replace(b'example', b'exbmple')))
+
+    def test_replay(self):
+
+        """
+        Test if replaying the appended records restores the data.
+        """
+
+        wal = WriteAheadLog(self.log_path)
+        wal.open()
+        wal.append({"op": "put", "id": "a", "value": 1})
+        wal.append({"op": "put", "id": "b", "value": 2})
+        wal.append({"op": "del", "id": "a"})
+        wal.append({"op": "batch", "records": [{"op": "put", "id": "c", "value": 3}, {"op": "del", "id": "b"}]})
+        wal.close()
+
+        data = {}
+        records, _ = read_log(self.log_path)
+        for record in records:
+            apply_record(data, record)
+
+        self.assertEqual(data, {"c": 3})
+
+    def test_torn_last_record(self):
+
+        """
+        Test if a torn last record is cut off on recovery and new records are appended after the intact prefix.
+        """
+
+        wal = WriteAheadLog(self.log_path)
+        wal.open()
+        wal.append({"op": "put", "id": "a", "value": 1})
+        wal.close()
+
+        with open(self.log_path, 'ab') as file:
+            file.write(encode_record({"op": "put", "id": "b", "value": 2})[:-7])
+
+        wal = WriteAheadLog(self.log_path)
+        records = wal.open()
+        wal.append({"op": "put", "id": "c", "value": 3})
+        wal.close()
+
+        self.assertEqual([record["id"] for record in records], ["a"])
+        self.assertEqual([record["id"] for record in read_log(self.log_path)[0]], ["a", "c"])
+
+    def test_snapshot_round_trip(self):
+
+        """
+        Test if a snapshot is written atomically and loaded back, and a missing snapshot loads as empty.
+        """
+
+        snapshot_path = os.path.join(self.temp_dir.name, 'data.json')
+        self.assertEqual(load_snapshot(snapshot_path), {})
+
+        write_snapshot(snapshot_path, {"a": 1})
+        self.assertEqual(load_snapshot(snapshot_path), {"a": 1})
+        self.assertFalse(os.path.exists(f'{snapshot_path}.tmp'))
+
+    def test_background_writer_group(self):
+
+        """
+        Test if concurrent writes in 'group' mode are acknowledged after a sync that covers several of them, in submission order.
+        """
+
+        written, syncs = [], []
+        writer = BackgroundWriter(written.extend, lambda: syncs.append(len(written)), 'group', group_window=0.05)
+
+        def submit(i):
+            writer.submit(i).wait()
+            self.assertIn(i, written[:syncs[-1]])
+        threads = [threading.Thread(target=submit, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        writer.close()
+
+        self.assertEqual(sorted(written), list(range(20)))
+        self.assertLess(len(syncs), 20)
+
+    def test_background_writer_async(self):
+
+        """
+        Test if a write in 'async' mode is acknowledged before it is written, and close drains and syncs it.
+        """
+
+        release = threading.Event()
+        written, syncs = [], []
+        def write_batch(items):
+            release.wait()
+            written.extend(items)
+        writer = BackgroundWriter(write_batch, lambda: syncs.append(len(written)), 'async', flush_interval=60)
+
+        self.assertIsNone(writer.submit("a"))
+        self.assertEqual(written, [])
+        release.set()
+        writer.close()
+
+        self.assertEqual(written, ["a"])
+        self.assertEqual(syncs, [1])
+
+    def test_background_writer_error(self):
+
+        """
+        Test if a failed write is raised to the waiting caller, and the writer keeps serving later writes.
+        """
+
+        def write_batch(items):
+            if "bad" in items:
+                raise OSError("disk full")
+        writer = BackgroundWriter(write_batch, lambda: None, 'sync')
+
+        with self.assertRaises(OSError):
+            writer.submit("bad").wait()
+        writer.submit("good").wait()
+        writer.close()
+
+        with self.assertRaises(ValueError):
+            BackgroundWriter(write_batch, lambda: None, 'never')
+
+    def test_shared_log(self):
+
+        """
+        Test if a process appends to the new log after another process rotated it, and a record torn by a crashed process
+        does not hide the records appended behind it.
+        """
+
+        first, second = WriteAheadLog(self.log_path), WriteAheadLog(self.log_path)
+        first.open()
+        second.open()
+        first.append({"op": "put", "id": "a", "value": 1})
+        with open(self.log_path, 'ab') as file:
+            file.write(encode_record({"op": "put", "id": "b", "value": 2})[:-7])
+        second.append({"op": "put", "id": "c", "value": 3})
+
+        rotated_path = first.rotate()
+        self.assertIsNone(second.rotate())
+        second.append({"op": "put", "id": "d", "value": 4})
+        first.close()
+        second.close()
+
+        self.assertEqual([record["id"] for record in read_log(rotated_path)[0]], ["a", "c"])
+        self.assertEqual(read_log(self.log_path)[0], [{"op": "gen", "gen": 1}, {"op": "put", "id": "d", "value": 4}])
+        self.assertEqual(rotated_path, self.log_path + ROTATED_SUFFIX)
+
+    def test_log_follower(self):
+
+        """
+        Test if a follower reads only complete records, follows a rotation, and reports a skipped generation.
+        """
+
+        wal = WriteAheadLog(self.log_path)
+        wal.open()
+        read, gaps = [], []
+        def on_gap():
+            gaps.append(wal.generation)
+            return open(self.log_path, 'rb'), wal.size(), wal.generation
+        follower = LogFollower(self.log_path, read.extend, on_gap, open(self.log_path, 'rb'), 0, 0)
+
+        wal.append({"op": "put", "id": "a", "value": 1})
+        with open(self.log_path, 'ab') as file:
+            file.write(encode_record({"op": "put", "id": "b", "value": 2})[:-7])
+        self.assertEqual(follower.poll(), 1)
+        self.assertEqual(follower.poll(), 0)
+
+        os.remove(wal.rotate())
+        wal.append({"op": "put", "id": "c", "value": 3})
+        self.assertEqual(follower.poll(), 1)
+        self.assertEqual(follower.generation, 1)
+
+        os.remove(wal.rotate())
+        wal.append({"op": "put", "id": "d", "value": 4})
+        os.remove(wal.rotate())
+        self.assertEqual(follower.poll(), 0)
+        self.assertEqual((gaps, follower.generation), ([3], 3))
+        wal.append({"op": "put", "id": "e", "value": 5})
+        self.assertEqual(follower.poll(), 1)
+
+        follower.close()
+        wal.close()
+        self.assertEqual([record["id"] for record in read], ["a", "c", "e"])
+
+if __name__ == '__main__':
+    unittest.main()
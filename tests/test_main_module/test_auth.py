@@ -1,14 +1,30 @@
 import unittest
+import os
+import sys
+import time
+import tempfile
+import threading
+import subprocess
 from flask import json
-from main_modules.auth import AuthService
+from unittest.mock import patch
+from main_modules.auth import AuthService, RevocationList, JWT_SECRET
+from helper_modules.auth_helpers import generate_jwt_token, jwt_encode, base64url_encode, SigningContext, PasswordHasher, HasherOverloaded, hash_password
+from helper_modules.wal_helpers import read_generation
 from flask import Flask
 
 class TestAuthService(unittest.TestCase):
 
     def setUp(self):
-        self.app = AuthService(Flask(__name__))
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.users_file = os.path.join(self.temp_dir.name, 'users.json')
+        self.revocations_file = os.path.join(self.temp_dir.name, 'revocation_data', 'revocations.log')
+        self.app = AuthService(Flask(__name__), users_file=self.users_file, revocations_file=self.revocations_file)
         self.client = self.app.app.test_client()
 
+    def tearDown(self):
+        self.app.close()
+        self.temp_dir.cleanup()
+
     def test_create_user(self):
 
         """"
@@ -40,6 +56,89 @@ class TestAuthService(unittest.TestCase):
         data = json.loads(response.data)
         self.assertIn('access_token', data)
 
+    def test_create_user_race(self):
+
+        """
+        Test if exactly one of many concurrent sign-ups with the same username succeeds, and the others are rejected as duplicates.
+        Hashing is slowed down, so all sign-ups pass the early check for a taken username before the first one is stored.
+        """
+
+        def slow_hash(password):
+            time.sleep(0.01)
+            return hash_password(password)
+
+        threads_per_username = 8
+        for round in range(10):
+            username = f'race_user_{round}'
+            barrier = threading.Barrier(threads_per_username)
+            statuses = []
+            def sign_up(password):
+                client = self.app.app.test_client()
+                barrier.wait()
+                statuses.append(client.post('/users', json={'username': username, 'password': password, 'role': 'regular'}).status_code)
+            threads = [threading.Thread(target=sign_up, args=(f'Str3ngP4ss{i}!',)) for i in range(threads_per_username)]
+            with patch.object(self.app.password_hasher, 'hash', side_effect=slow_hash):
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+
+            self.assertEqual(sorted(statuses), [201] + [409] * (threads_per_username - 1))
+            winner = [f'Str3ngP4ss{i}!' for i in range(threads_per_username)
+                      if self.client.post('/users/login', json={'username': username, 'password': f'Str3ngP4ss{i}!'}).status_code == 200]
+            self.assertEqual(len(winner), 1)
+
+    def test_import_users(self):
+
+        """
+        Test if a stream of users is imported in chunks, with a result per record, and if only admins may import users over HTTP.
+        """
+
+        self.app.get_user_store().create("taken_user", hash_password("Str0ng_P@ssw0rd!"), "regular")
+        records = [{'username': f"import_user_{i}", 'password': "Str0ng_P@ssw0rd!"} for i in range(5)]
+        records += [{'username': "taken_user", 'password': "Str0ng_P@ssw0rd!"}, {'username': "import_user_0", 'password': "Str0ng_P@ssw0rd!"},
+                    {'username': "weak_user", 'password': "weak"}, {'username': "admin_user", 'password': "Str0ng_P@ssw0rd!", 'role': "admin"}, None]
+        results = list(self.app.import_users(iter(records), chunk_size=3))
+
+        self.assertEqual([result['status'] for result in results], ['created'] * 5 + ['duplicate', 'duplicate', 'invalid', 'created', 'invalid'])
+        self.assertIn('Password must be', results[7]['error'])
+        self.assertEqual(results[9], {'username': None, 'status': 'invalid', 'error': 'Invalid record'})
+        self.assertEqual(self.app.get_user_store().get("admin_user")['role'], "admin")
+        response = self.client.post('/users/login', json={'username': "import_user_4", 'password': "Str0ng_P@ssw0rd!"})
+        self.assertEqual(response.status_code, 200)
+
+        users = {'users': [{'username': "bulk_user", 'password': "Str0ng_P@ssw0rd!"}]}
+        admin_token = generate_jwt_token("admin_user", "admin", JWT_SECRET)
+        regular_token = generate_jwt_token("import_user_0", "regular", JWT_SECRET)
+        response = self.client.post('/users/bulk', json=users, headers={'Authorization': f'Bearer {regular_token}'})
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post('/users/bulk', json={'users': "bulk_user"}, headers={'Authorization': f'Bearer {admin_token}'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/users/bulk', json=users, headers={'Authorization': f'Bearer {admin_token}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['results'], [{'username': "bulk_user", 'status': 'created'}])
+
+    def test_users_persist(self):
+
+        """
+        Test if users, password changes and the revocation of the tokens issued before a password change survive a restart of the service.
+        """
+
+        self.client.post('/users', json={'username': 'persisted_user', 'password': 'Str3ngP4ss1!', 'role': 'admin'})
+        login_response = self.client.post('/users/login', json={'username': 'persisted_user', 'password': 'Str3ngP4ss1!'})
+        old_token = json.loads(login_response.data)['access_token']
+        self.client.put('/users', json={'username': 'persisted_user', 'old_password': 'Str3ngP4ss1!', 'new_password': 'N3wStr3ngP4ss!'},
+                        headers={'Authorization': f"Bearer {old_token}"})
+        self.app.close()
+
+        self.app = AuthService(None, users_file=self.users_file, revocations_file=self.revocations_file)
+        self.assertIsNone(self.app.validate_jwt(old_token))
+        client = self.app.app.test_client()
+        self.assertEqual(client.post('/users/login', json={'username': 'persisted_user', 'password': 'Str3ngP4ss1!'}).status_code, 403)
+        response = client.post('/users/login', json={'username': 'persisted_user', 'password': 'N3wStr3ngP4ss!'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.app.validate_jwt(json.loads(response.data)['access_token'])['role'], 'admin')
+
     def test_update_password(self):
 
         """
@@ -54,6 +153,25 @@ class TestAuthService(unittest.TestCase):
                                    headers={'Authorization': f'Bearer {access_token}'})
         self.assertEqual(response.status_code, 200)
 
+    def test_update_password_revokes_tokens(self):
+
+        """
+        Test if updating a password revokes the tokens issued before, also cached ones, while tokens issued after are accepted.
+        """
+
+        self.client.post('/users', json={'username': 'revoked_user', 'password': 'Str3ngP4ss1!', 'role': 'regular'})
+        login_response = self.client.post('/users/login', json={'username': 'revoked_user', 'password': 'Str3ngP4ss1!'})
+        access_token = json.loads(login_response.data)['access_token']
+        self.assertIsNotNone(self.app.validate_jwt(access_token))
+
+        response = self.client.put('/users', json={'username': 'revoked_user', 'old_password': 'Str3ngP4ss1!', 'new_password': 'N3wStr3ngP4ss!'},
+                                   headers={'Authorization': f'Bearer {access_token}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(self.app.validate_jwt(access_token))
+
+        login_response = self.client.post('/users/login', json={'username': 'revoked_user', 'password': 'N3wStr3ngP4ss!'})
+        self.assertIsNotNone(self.app.validate_jwt(json.loads(login_response.data)['access_token']))
+
     def test_update_password_wrong_old_password(self):
 
         """
@@ -76,5 +194,217 @@ class TestAuthService(unittest.TestCase):
         response = self.client.put('/users', json={'username': 'test_user', 'old_password': 'Str3ngP4ss1!', 'new_password': 'Str3ngP4ss1!'})
         self.assertEqual(response.status_code, 401)
 
+        crafted_token = jwt_encode({"alg": "HS256", "kid": [1]}, {'sub': 'test_user', 'role': 'admin'}, JWT_SECRET)
+        response = self.client.put('/users', json={'username': 'test_user', 'old_password': 'Str3ngP4ss1!', 'new_password': 'Str3ngP4ss1!'},
+                                   headers={'Authorization': f'Bearer {crafted_token}'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_password_upgrade(self):
+
+        """
+        Test if a legacy HMAC password hash is replaced by a KDF hash on login, and the user can still log in afterwards.
+        """
+
+        auth_service = AuthService(None, password_hasher=PasswordHasher('pbkdf2', workers=1, params=(1000,)),
+                                   users_file=os.path.join(self.temp_dir.name, 'legacy_users.json'))
+        client = auth_service.app.test_client()
+        try:
+            auth_service.get_user_store().create('legacy_user', hash_password('Str3ngP4ss1!'), 'regular')
+            response = client.post('/users/login', json={'username': 'legacy_user', 'password': 'Str3ngP4ss1!'})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(auth_service.get_user_store().get('legacy_user')['password'].startswith('pbkdf2$1000$'))
+
+            response = client.post('/users/login', json={'username': 'legacy_user', 'password': 'Str3ngP4ss1!'})
+            self.assertEqual(response.status_code, 200)
+            response = client.post('/users/login', json={'username': 'legacy_user', 'password': 'Wr0ngP4ss1!'})
+            self.assertEqual(response.status_code, 403)
+        finally:
+            auth_service.close()
+
+    def test_hasher_overloaded(self):
+
+        """
+        Test if a request is rejected with 503 when the password hasher is overloaded, and a login still succeeds when only the upgrade of its hash is.
+        """
+
+        with patch.object(self.app.password_hasher, 'hash', side_effect=HasherOverloaded):
+            response = self.client.post('/users', json={'username': 'busy_user', 'password': 'Str3ngP4ss1!', 'role': 'regular'})
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.headers['Retry-After'], '1')
+
+            self.app.get_user_store().create('busy_user', hash_password('Str3ngP4ss1!'), 'regular')
+            with patch.object(self.app.password_hasher, 'needs_upgrade', return_value=True):
+                response = self.client.post('/users/login', json={'username': 'busy_user', 'password': 'Str3ngP4ss1!'})
+            self.assertEqual(response.status_code, 200)
+
+    def test_validate_jwt_cache(self):
+
+        """
+        Test if a verified token is served from the token cache, and an expired token is rejected.
+        """
+
+        token = generate_jwt_token('test_user', 'admin', JWT_SECRET)
+        with patch.object(SigningContext, 'decode', autospec=True, side_effect=SigningContext.decode) as decode:
+            self.assertEqual(self.app.validate_jwt(token)['sub'], 'test_user')
+            self.assertEqual(self.app.validate_jwt(token)['sub'], 'test_user')
+            self.assertEqual(decode.call_count, 1)
+
+        expired_token = jwt_encode({"alg": "HS256", "typ": "JWT"}, {'sub': 'test_user', 'role': 'admin', 'exp': 1}, JWT_SECRET)
+        self.assertIsNone(self.app.validate_jwt(expired_token))
+
+    def test_verify_tokens(self):
+
+        """
+        Test if a batch of tokens is verified in request order, with the payload of every valid token and the reason every other token is rejected.
+        """
+
+        valid_token = generate_jwt_token('test_user', 'admin', JWT_SECRET)
+        expired_token = jwt_encode({"alg": "HS256", "typ": "JWT"}, {'sub': 'test_user', 'role': 'admin', 'exp': 1}, JWT_SECRET)
+        forged_token = jwt_encode({"alg": "HS256", "typ": "JWT"}, {'sub': 'test_user', 'role': 'admin'}, 'other_secret')
+        tokens = [valid_token, expired_token, forged_token, 'not_a_token', 42, valid_token]
+
+        with patch.object(SigningContext, 'verify', autospec=True, side_effect=SigningContext.verify) as verify:
+            response = self.client.post('/tokens/verify', json={'tokens': tokens})
+            self.assertEqual(verify.call_count, 4) # the repeated and the non-string token are not verified
+        self.assertEqual(response.status_code, 200)
+        results = response.get_json()['results']
+        self.assertEqual([result['status'] for result in results], ['valid', 'expired', 'invalid_signature', 'malformed', 'malformed', 'valid'])
+        self.assertEqual(results[0]['payload']['sub'], 'test_user')
+        self.assertNotIn('payload', results[1])
+
+        # crafted tokens are rejected one by one, the valid tokens of the batch are still reported as valid
+        unhashable_kid_token = jwt_encode({"alg": "HS256", "kid": [1]}, {'sub': 'test_user', 'role': 'admin'}, JWT_SECRET)
+        nested_token = base64url_encode(b'[' * 100000 + b']' * 100000).decode('utf-8') + '.e30.c2ln'
+        response = self.client.post('/tokens/verify', json={'tokens': [valid_token, unhashable_kid_token, nested_token, valid_token]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['status'] for result in response.get_json()['results']], ['valid', 'unknown_key', 'malformed', 'valid'])
+
+        self.assertEqual(self.client.post('/tokens/verify', json={'tokens': 'abc'}).status_code, 400)
+        with patch('main_modules.auth.MAX_VERIFY_BATCH_SIZE', 2):
+            self.assertEqual(self.client.post('/tokens/verify', json={'tokens': tokens}).status_code, 400)
+
+    def test_revoke_token(self):
+
+        """
+        Test if a revoked token is rejected by validation and batch verification, while other tokens of the user stay valid.
+        """
+
+        token = generate_jwt_token('test_user', 'admin', JWT_SECRET)
+        other_token = generate_jwt_token('test_user', 'admin', JWT_SECRET)
+        self.assertIsNotNone(self.app.validate_jwt(token))
+
+        response = self.client.post('/tokens/revoke', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 204)
+        self.assertIsNone(self.app.validate_jwt(token))
+        self.assertIsNotNone(self.app.validate_jwt(other_token))
+        results = self.client.post('/tokens/verify', json={'tokens': [token, other_token]}).get_json()['results']
+        self.assertEqual([result['status'] for result in results], ['revoked', 'valid'])
+        self.assertEqual(self.client.post('/tokens/revoke', headers={'Authorization': f'Bearer {token}'}).status_code, 401)
+
+        legacy_token = jwt_encode({"alg": "HS256", "typ": "JWT"}, {'sub': 'test_user', 'role': 'admin'}, JWT_SECRET)
+        self.assertEqual(self.client.post('/tokens/revoke', headers={'Authorization': f'Bearer {legacy_token}'}).status_code, 400)
+
+    def test_revocation_pruning(self):
+
+        """
+        Test if revocations are pruned once their tokens have expired, and a user cutoff revokes the tokens issued before it.
+        """
+
+        revocations = RevocationList()
+        revocations.revoke_token({'jti': 'expired', 'exp': time.time() - 1})
+        revocations.revoke_user('expired_user', cutoff=time.time() - 2 * 86400)
+        with patch('main_modules.auth.REVOCATION_PRUNE_INTERVAL', 0):
+            for i in range(10):
+                revocations.revoke_token({'jti': f'token_{i}', 'exp': time.time() + 60})
+        self.assertTrue(all(revocations.is_revoked({'jti': f'token_{i}'}) for i in range(10)))
+        self.assertEqual(len(revocations), 10)
+
+        revocations.revoke_user('test_user', cutoff=100)
+        self.assertTrue(revocations.is_revoked({'sub': 'test_user', 'iat': 99}))
+        self.assertTrue(revocations.is_revoked({'sub': 'test_user'}))
+        self.assertFalse(revocations.is_revoked({'sub': 'test_user', 'iat': 101}))
+        self.assertFalse(revocations.is_revoked({'sub': 'other_user', 'jti': 'other', 'iat': 99}))
+
+    def test_revocation_log(self):
+
+        """
+        Test if revocations are shared through their log: a second list and a service validating tokens sees
+        the revocations of an auth service in another process, also after the log was rewritten, and a restarted list loads them.
+        """
+
+        revocations = RevocationList(self.revocations_file, compact_threshold=1024, follow_interval=3600)
+        other = RevocationList(self.revocations_file, follow_interval=3600)
+        now = time.time()
+        try:
+            revocations.revoke_token({'jti': 'logout', 'exp': time.time() + 60})
+            revocations.revoke_user('test_user', cutoff=now - 20)
+            self.assertFalse(other.is_revoked({'jti': 'logout'}))
+            other._follower.poll()
+            self.assertTrue(other.is_revoked({'jti': 'logout'}))
+            self.assertTrue(other.is_revoked({'sub': 'test_user', 'iat': now - 21}))
+
+            other.revoke_user('test_user', cutoff=now - 10)
+            other.revoke_token({'jti': 'expired', 'exp': time.time() - 1})
+            for i in range(100): # rewrites the log several times, without reading the revocations of the other list first
+                revocations.revoke_token({'jti': f'token_{i}', 'exp': time.time() + 60})
+            self.assertGreater(read_generation(self.revocations_file), 1)
+            with open(self.revocations_file, 'rb') as file:
+                self.assertNotIn(b'"expired"', file.read())
+            other._follower.poll()
+            revocations._follower.poll()
+            for revocation_list in (revocations, other):
+                self.assertTrue(all(revocation_list.is_revoked({'jti': f'token_{i}'}) for i in range(100)))
+                self.assertTrue(revocation_list.is_revoked({'sub': 'test_user', 'iat': now - 11}))
+        finally:
+            revocations.close()
+            other.close()
+
+        restarted = RevocationList(self.revocations_file, follow_interval=3600)
+        self.assertTrue(restarted.is_revoked({'jti': 'logout'}))
+        self.assertTrue(restarted.is_revoked({'jti': 'token_99'}))
+        self.assertTrue(restarted.is_revoked({'sub': 'test_user', 'iat': now - 11}))
+        self.assertFalse(restarted.is_revoked({'jti': 'expired'}))
+        restarted.close()
+
+        token = generate_jwt_token('test_user', 'admin', JWT_SECRET)
+        self.assertIsNotNone(self.app.validate_jwt(token))
+        script = ("import sys; from main_modules.auth import AuthService; auth_service = AuthService(None, revocations_file=sys.argv[1]); "
+                  "response = auth_service.app.test_client().post('/tokens/revoke', headers={'Authorization': 'Bearer ' + sys.argv[2]}); "
+                  "auth_service.close(); sys.exit(response.status_code != 204)")
+        subprocess.run([sys.executable, '-c', script, self.revocations_file, token], check=True,
+                       cwd=os.path.join(os.path.dirname(__file__), os.pardir, os.pardir), env={**os.environ, 'JWT_SECRET': JWT_SECRET})
+        self.app.revocations._follower.poll()
+        self.assertIsNone(self.app.validate_jwt(token))
+        self.assertEqual(self.client.post('/tokens/verify', json={'tokens': [token]}).get_json()['results'][0]['status'], 'revoked')
+
+    def test_key_rotation(self):
+
+        """
+        Test if a rotated key file is picked up without a restart, tokens signed with a kept key stay valid
+        and tokens signed with a removed key are rejected.
+        """
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            keys_file = os.path.join(temp_dir, 'jwt_keys.json')
+
+            def write_keys(active_kid, keys, mtime):
+                with open(keys_file, 'w') as file:
+                    json.dump({'active_kid': active_kid, 'keys': keys}, file)
+                os.utime(keys_file, (mtime, mtime))
+
+            write_keys('k1', {'k1': 'first_secret'}, 1000)
+            auth_service = AuthService(None, keys_file=keys_file, revocations_file=None)
+            first_token = generate_jwt_token('test_user', 'admin', auth_service.get_signing_context())
+
+            with patch('main_modules.auth.JWT_KEYS_RELOAD_INTERVAL', 0):
+                write_keys('k2', {'k1': 'first_secret', 'k2': 'second_secret'}, 2000)
+                second_token = generate_jwt_token('test_user', 'admin', auth_service.get_signing_context())
+                self.assertIsNotNone(auth_service.validate_jwt(first_token))
+                self.assertIsNotNone(auth_service.validate_jwt(second_token))
+
+                write_keys('k2', {'k2': 'second_secret'}, 3000)
+                self.assertIsNone(auth_service.validate_jwt(first_token))
+                self.assertIsNotNone(auth_service.validate_jwt(second_token))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
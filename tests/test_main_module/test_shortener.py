@@ -1,6 +1,10 @@
 import unittest
+import os
+import tempfile
 from unittest.mock import MagicMock
-from flask import json
+from flask import Flask, json
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
 from main_modules.auth import AuthService
 from main_modules.shortener import URLShortenerService
 
@@ -14,9 +18,12 @@ class TestURLShortenerService(unittest.TestCase):
         Create list of URLs to be validated.
         """
 
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_file = os.path.join(self.temp_dir.name, 'url_data.json')
+
         self.auth_service = AuthService(None)
         self.auth_service.validate_jwt = MagicMock(return_value={"role": "admin"})
-        self.url_shortener_app = URLShortenerService(self.auth_service)
+        self.url_shortener_app = URLShortenerService(self.auth_service, data_file=self.data_file)
         self.app = self.url_shortener_app.app.test_client()
 
         self.urls = [
@@ -25,6 +32,10 @@ class TestURLShortenerService(unittest.TestCase):
             "https://www.github.com",
         ]
 
+    def tearDown(self):
+        self.url_shortener_app.close()
+        self.temp_dir.cleanup()
+
     def test_create_short_url(self):
 
         """
@@ -215,5 +226,379 @@ class TestURLShortenerService(unittest.TestCase):
         response = self.app.get("/", headers=headers)
         self.assertEqual(response.status_code, 200)
 
+    def test_serve_index_pagination(self):
+
+        """
+        Testing the paginated index: pages follow each other through the cursor until the last page has no next cursor.
+        Check if the response status code is 400 for an invalid limit or cursor.
+        """
+
+        headers = {"Authorization": "Bearer test_token"}
+        for url in self.urls:
+            self.app.post("/", headers=headers, data=json.dumps({"url": url}), content_type="application/json")
+
+        response = self.app.get("/?limit=2", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        first_page = json.loads(response.get_data(as_text=True))
+        self.assertEqual(len(first_page["urls"]), 2)
+
+        response = self.app.get(f"/?limit=2&cursor={first_page['next_cursor']}", headers=headers)
+        second_page = json.loads(response.get_data(as_text=True))
+        self.assertEqual(len(second_page["urls"]), 1)
+        self.assertIsNone(second_page["next_cursor"])
+        self.assertCountEqual([item["original_url"] for item in first_page["urls"] + second_page["urls"]], self.urls)
+
+        self.assertEqual(self.app.get("/?limit=0", headers=headers).status_code, 400)
+        self.assertEqual(self.app.get("/?limit=abc", headers=headers).status_code, 400)
+        self.assertEqual(self.app.get("/?cursor=abc", headers=headers).status_code, 400)
+
+    def test_ndjson_export(self):
+
+        """
+        Testing the streamed NDJSON export of the index and of the URL identifiers.
+        Check if every stored URL is returned as one JSON line.
+        """
+
+        headers = {"Authorization": "Bearer test_token", "Accept": "application/x-ndjson"}
+        for url in self.urls:
+            self.app.post("/", headers=headers, data=json.dumps({"url": url}), content_type="application/json")
+
+        response = self.app.get("/", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertCountEqual([json.loads(line)["original_url"] for line in lines], self.urls)
+
+        response = self.app.get("/keys", headers=headers)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        keys = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertCountEqual(keys, json.loads(self.app.get("/keys", headers={"Authorization": "Bearer test_token"}).get_data(as_text=True)))
+
+    def test_create_short_urls_bulk(self):
+
+        """
+        Testing the bulk creation of short URLs.
+        Check if every URL gets a result in request order, and if the created short URLs survive a restart.
+        """
+
+        headers = {"Authorization": "Bearer test_token"}
+        response = self.app.post("/", headers=headers, data=json.dumps({"url": self.urls[0]}), content_type="application/json")
+        existing_uri = json.loads(response.get_data(as_text=True))["generated_uri"]
+
+        urls = [self.urls[0], self.urls[1], "invalid_url", self.urls[2], self.urls[1], 42]
+        response = self.app.post("/bulk", headers=headers, data=json.dumps({"urls": urls}), content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+
+        results = json.loads(response.get_data(as_text=True))["results"]
+        self.assertEqual([result["status"] for result in results], ["duplicate", "created", "invalid", "created", "duplicate", "invalid"])
+        self.assertEqual(results[0]["generated_uri"], existing_uri)
+        self.assertEqual(results[4]["generated_uri"], results[1]["generated_uri"])
+
+        self.url_shortener_app.close()
+        self.url_shortener_app = URLShortenerService(self.auth_service, data_file=self.data_file)
+        self.app = self.url_shortener_app.app.test_client()
+        self.assertEqual(self.url_shortener_app.store.get(results[3]["generated_uri"])["url"], self.urls[2])
+
+        response = self.app.post("/bulk", headers=headers, data=json.dumps({"url": self.urls[0]}), content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_update_delete_urls_bulk(self):
+
+        """
+        Testing the bulk update and bulk deletion of short URLs.
+        Check if every update and deletion gets a result in request order.
+        """
+
+        headers = {"Authorization": "Bearer test_token"}
+        response = self.app.post("/bulk", headers=headers, data=json.dumps({"urls": self.urls}), content_type="application/json")
+        ids = [result["generated_uri"] for result in json.loads(response.get_data(as_text=True))["results"]]
+
+        updates = [{"id": ids[0], "url": "https://www.example.com"}, {"id": "nonexistent", "url": "https://www.example.org"}, {"id": ids[1], "url": "invalid_url"}]
+        response = self.app.put("/bulk", headers=headers, data=json.dumps({"updates": updates}), content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.get_data(as_text=True))["results"]
+        self.assertEqual([result["status"] for result in results], ["updated", "not_found", "invalid"])
+        self.assertEqual(self.url_shortener_app.store.get(ids[0])["url"], "https://www.example.com")
+
+        response = self.app.delete("/bulk", headers=headers, data=json.dumps({"ids": [ids[0], "nonexistent", ids[2], ids[0]]}), content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.get_data(as_text=True))["results"]
+        self.assertEqual([result["status"] for result in results], ["deleted", "not_found", "deleted", "not_found"])
+        self.assertEqual(list(self.url_shortener_app.store.ids()), [ids[1]])
+
+        response = self.app.delete("/bulk", headers=headers, data=json.dumps({"ids": "abc"}), content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_create_short_url_duplicate(self):
+
+        """
+        Tests if duplicates are detected through the reverse URL index, and if the index follows updates and deletes.
+        Check if the response status code is 409 for a duplicate and 201 once the URL is no longer stored.
+        """
+
+        headers = {"Authorization": "Bearer test_token"}
+        response = self.app.post("/", headers=headers, data=json.dumps({"url": self.urls[0]}), content_type="application/json")
+        generated_uri = json.loads(response.get_data(as_text=True))["generated_uri"]
+
+        response = self.app.post("/", headers=headers, data=json.dumps({"url": self.urls[0]}), content_type="application/json")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(json.loads(response.get_data(as_text=True))["generated_uri"], generated_uri)
+
+        self.app.put(f"/{generated_uri}", headers=headers, data=json.dumps({"url": self.urls[1]}), content_type="application/json")
+        response = self.app.post("/", headers=headers, data=json.dumps({"url": self.urls[1]}), content_type="application/json")
+        self.assertEqual(response.status_code, 409)
+        response = self.app.post("/", headers=headers, data=json.dumps({"url": self.urls[0]}), content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+
+        self.app.delete(f"/{generated_uri}", headers=headers)
+        response = self.app.post("/", headers=headers, data=json.dumps({"url": self.urls[1]}), content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+
+    def test_create_legacy_url_duplicate(self):
+
+        """
+        Tests if a URL that was stored before canonicalization, in a non-canonical form, is still reported as a duplicate when it is sent again.
+        Check if the single and the bulk creation return the ID of the stored record instead of allocating a new one.
+        """
+
+        self.url_shortener_app.close()
+        with open(self.data_file, 'w') as file:
+            json.dump({"abcdefgh": {"url": "http://Example.COM/a", "created_at": 1672531200}}, file)
+        self.url_shortener_app = URLShortenerService(self.auth_service, data_file=self.data_file)
+        self.app = self.url_shortener_app.app.test_client()
+
+        headers = {"Authorization": "Bearer test_token"}
+        response = self.app.post("/", headers=headers, data=json.dumps({"url": "http://Example.COM/a"}), content_type="application/json")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(json.loads(response.get_data(as_text=True))["generated_uri"], "abcdefgh")
+
+        response = self.app.post("/bulk", headers=headers, data=json.dumps({"urls": ["http://Example.COM/a"]}), content_type="application/json")
+        results = json.loads(response.get_data(as_text=True))["results"]
+        self.assertEqual([(result["status"], result["generated_uri"]) for result in results], [("duplicate", "abcdefgh")])
+        self.assertEqual(list(self.url_shortener_app.store.ids()), ["abcdefgh"])
+
+    def test_create_short_urls_race(self):
+
+        """
+        Tests if a URL that a concurrent request stores between the duplicate check and the write of a bulk request is reported as a duplicate.
+        """
+
+        headers = {"Authorization": "Bearer test_token"}
+        response = self.app.post("/", headers=headers, data=json.dumps({"url": self.urls[0]}), content_type="application/json")
+        generated_uri = json.loads(response.get_data(as_text=True))["generated_uri"]
+
+        store = self.url_shortener_app.store
+        find_by_url = store.find_by_url
+        checks = []
+        def stale_find_by_url(url): # the 3 checks of the request miss the stored URL, the checks under the write lock do not
+            checks.append(url)
+            return None if len(checks) <= 3 else find_by_url(url)
+        store.find_by_url = stale_find_by_url
+        response = self.app.post("/bulk", headers=headers, data=json.dumps({"urls": [self.urls[0], self.urls[1], self.urls[0]]}), content_type="application/json")
+        results = json.loads(response.get_data(as_text=True))["results"]
+        self.assertEqual([result["status"] for result in results], ["duplicate", "created", "duplicate"])
+        self.assertEqual([results[0]["generated_uri"], results[2]["generated_uri"]], [generated_uri, generated_uri])
+        self.assertEqual(self.url_shortener_app.store.count(), 2)
+
+    def test_create_short_url_equivalent(self):
+
+        """
+        Tests if a URL is stored in its canonical form, so an equivalent URL is detected as a duplicate, on its own and in a bulk request.
+        """
+
+        headers = {"Authorization": "Bearer test_token"}
+        response = self.app.post("/", headers=headers, data=json.dumps({"url": "HTTPS://WWW.Facebook.com:443/Page"}), content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        generated_uri = json.loads(response.get_data(as_text=True))["generated_uri"]
+        self.assertEqual(self.url_shortener_app.store.get(generated_uri)["url"], "https://www.facebook.com/Page")
+
+        response = self.app.post("/", headers=headers, data=json.dumps({"url": "https://www.facebook.com./Page"}), content_type="application/json")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(json.loads(response.get_data(as_text=True))["generated_uri"], generated_uri)
+
+        urls = ["https://www.facebook.com/Page", "https://www.facebook.com/page", "HTTPS://www.facebook.com/page"]
+        response = self.app.post("/bulk", headers=headers, data=json.dumps({"urls": urls}), content_type="application/json")
+        results = json.loads(response.get_data(as_text=True))["results"]
+        self.assertEqual([result["status"] for result in results], ["duplicate", "created", "duplicate"])
+        self.assertEqual([result["url"] for result in results], urls)
+
+    def test_log_persistence_restart(self):
+
+        """
+        Tests if created, updated and deleted short URLs survive a restart by replaying the write-ahead log.
+        """
+
+        headers = {"Authorization": "Bearer test_token"}
+        generated_uris = []
+
+        for url in self.urls:
+            response = self.app.post("/", headers=headers, data=json.dumps({"url": url}), content_type="application/json")
+            generated_uris.append(json.loads(response.get_data(as_text=True))["generated_uri"])
+
+        self.app.put(f"/{generated_uris[0]}", headers=headers, data=json.dumps({"url": "https://www.example.com"}), content_type="application/json")
+        self.app.delete(f"/{generated_uris[1]}", headers=headers)
+        self.url_shortener_app.close()
+
+        restarted = URLShortenerService(self.auth_service, data_file=self.data_file)
+        self.assertEqual(restarted.store.get(generated_uris[0])["url"], "https://www.example.com")
+        self.assertNotIn(generated_uris[1], restarted.store)
+        self.assertEqual(restarted.store.get(generated_uris[2])["url"], self.urls[2])
+        restarted.close()
+
+    def test_log_compaction(self):
+
+        """
+        Tests if the write-ahead log is folded into the snapshot once it passes the compaction threshold.
+        """
+
+        self.url_shortener_app.close()
+        service = URLShortenerService(self.auth_service, data_file=self.data_file, compact_threshold=1)
+        service.app.test_client().post("/", headers={"Authorization": "Bearer test_token"}, data=json.dumps({"url": self.urls[0]}), content_type="application/json")
+        service.close()
+
+        with open(self.data_file) as file:
+            snapshot = json.load(file)
+        self.assertEqual([value["url"] for value in snapshot.values()], [self.urls[0]])
+        self.assertFalse(os.path.exists(service.store.log_file + '.1'))
+
+    def test_check_prefork(self):
+
+        """
+        Tests if the pre-fork server is refused for stores that forked workers cannot share, and the service works after a fork.
+        """
+
+        self.url_shortener_app.check_prefork(4)
+        self.url_shortener_app.before_fork()
+        self.url_shortener_app.after_fork()
+        response = self.app.post("/", headers={"Authorization": "Bearer test_token"}, data=json.dumps({"url": self.urls[0]}), content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+
+        json_service = URLShortenerService(self.auth_service, data_file=os.path.join(self.temp_dir.name, 'json_data.json'), persistence_mode='json')
+        with self.assertRaises(ValueError):
+            json_service.check_prefork(1)
+        json_service.close()
+
+        sqlite_service = URLShortenerService(self.auth_service, data_file=os.path.join(self.temp_dir.name, 'sqlite_data.json'), storage_backend='sqlite')
+        sqlite_service.check_prefork(4)
+        sqlite_service.close()
+
+        random_service = URLShortenerService(self.auth_service, data_file=os.path.join(self.temp_dir.name, 'random_data.json'), id_allocator='random')
+        random_service.check_prefork(1)
+        with self.assertRaises(ValueError):
+            random_service.check_prefork(2)
+        random_service.close()
+
+    def test_metrics(self):
+
+        """
+        Tests if the replication metrics of the store are served without a token in the Prometheus text format.
+        """
+
+        response = self.app.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain"))
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertIn("# TYPE url_shortener_replication_lag_seconds gauge", lines)
+        self.assertIn("url_shortener_replicated_records_total 0", lines)
+
+    def test_sqlite_backend(self):
+
+        """
+        Tests if the service works on top of the SQLite backend and imports an existing JSON data file on first use.
+        """
+
+        headers = {"Authorization": "Bearer test_token"}
+        response = self.app.post("/", headers=headers, data=json.dumps({"url": self.urls[0]}), content_type="application/json")
+        imported_uri = json.loads(response.get_data(as_text=True))["generated_uri"]
+        self.url_shortener_app.close()
+
+        self.url_shortener_app = URLShortenerService(self.auth_service, data_file=self.data_file, storage_backend='sqlite')
+        self.app = self.url_shortener_app.app.test_client()
+
+        response = self.app.get(f"/{imported_uri}", headers=headers)
+        self.assertEqual(response.status_code, 301)
+
+        response = self.app.post("/", headers=headers, data=json.dumps({"url": self.urls[0]}), content_type="application/json")
+        self.assertEqual(response.status_code, 409)
+
+        response = self.app.post("/", headers=headers, data=json.dumps({"url": self.urls[1]}), content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+
+        response = self.app.get("/", headers=headers)
+        self.assertCountEqual([item["original_url"] for item in json.loads(response.get_data(as_text=True))], [self.urls[0], self.urls[1]])
+
+        response = self.app.delete(f"/{imported_uri}", headers=headers)
+        self.assertEqual(response.status_code, 204)
+
+    def test_admin_reuses_validated_token(self):
+
+        """
+        Checks if an admin route validates the bearer token only once per request.
+        """
+
+        headers = {"Authorization": "Bearer test_token"}
+        response = self.app.get("/", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.auth_service.validate_jwt.call_count, 1)
+
+    def test_public_redirects(self):
+
+        """
+        Checks if redirects are served without a bearer token when public redirects are enabled,
+        while every other route still requires one.
+        """
+
+        headers = {"Authorization": "Bearer test_token"}
+        response = self.app.post("/", headers=headers, data=json.dumps({"url": self.urls[0]}), content_type="application/json")
+        generated_uri = json.loads(response.get_data(as_text=True))["generated_uri"]
+
+        self.assertEqual(self.app.get(f"/{generated_uri}").status_code, 401)
+        self.url_shortener_app.close()
+
+        self.url_shortener_app = URLShortenerService(self.auth_service, data_file=self.data_file, public_redirects=True)
+        self.app = self.url_shortener_app.app.test_client()
+        self.auth_service.validate_jwt.reset_mock()
+
+        response = self.app.get(f"/{generated_uri}")
+        self.assertEqual(response.status_code, 301)
+        self.assertEqual(response.headers["Location"], self.urls[0])
+        self.assertEqual(self.app.get("/nonexistent").status_code, 404)
+        self.auth_service.validate_jwt.assert_not_called()
+
+        self.assertEqual(self.app.get(f"/search/{generated_uri}").status_code, 401)
+        self.assertEqual(self.app.delete(f"/{generated_uri}").status_code, 401)
+
+    def test_redirect_fast_path(self):
+
+        """
+        Checks if the WSGI fast path answers redirects like Flask does, including non-ASCII URLs,
+        leaves everything else to Flask, and never serves the cached headers of a URL that was updated or deleted.
+        """
+
+        self.url_shortener_app.close()
+        self.url_shortener_app = URLShortenerService(self.auth_service, data_file=self.data_file, public_redirects=True)
+        self.app = self.url_shortener_app.app.test_client()
+        # Client of the unwrapped Flask application
+        flask_app = Client(lambda environ, start_response: Flask.wsgi_app(self.url_shortener_app.app, environ, start_response), Response)
+
+        headers = {"Authorization": "Bearer test_token"}
+        for url in self.urls + ["https://www.example.com/straße?q=ü"]:
+            response = self.app.post("/", headers=headers, data=json.dumps({"url": url}), content_type="application/json")
+            generated_uri = json.loads(response.get_data(as_text=True))["generated_uri"]
+
+            response = self.app.get(f"/{generated_uri}")
+            expected = flask_app.get(f"/{generated_uri}")
+            self.assertEqual((response.status, response.headers["Location"]), (expected.status, expected.headers["Location"]))
+            self.assertEqual(response.get_data(), b"")
+
+        self.assertEqual(self.app.get("/nonexistent").status_code, 404)
+        self.assertEqual(self.app.get("/keys", headers=headers).status_code, 200)
+        self.assertEqual(self.app.head(f"/{generated_uri}").status_code, 301)
+
+        self.app.put(f"/{generated_uri}", headers=headers, data=json.dumps({"url": "https://www.example.org/updated"}), content_type="application/json")
+        self.assertEqual(self.app.get(f"/{generated_uri}").headers["Location"], "https://www.example.org/updated")
+        self.app.delete(f"/{generated_uri}", headers=headers)
+        self.assertEqual(self.app.get(f"/{generated_uri}").status_code, 404)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,150 @@
+import unittest
+import os
+import json
+import asyncio
+import tempfile
+from unittest.mock import MagicMock
+from main_modules.auth import AuthService
+from main_modules.shortener import URLShortenerService
+from main_modules.shortener_asgi import URLShortenerASGI
+
+def call(app, method, path, headers=(), body=b'', query_string=b''):
+
+    """
+    Sends a single request to an ASGI application and collects the response.
+    Returns the status code, the headers as a dictionary and the body.
+    """
+
+    async def run():
+        messages = []
+        request = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        async def receive():
+            return request.pop(0) if request else {'type': 'http.disconnect'}
+        async def send(message):
+            messages.append(message)
+        scope = {'type': 'http', 'http_version': '1.1', 'method': method, 'path': path, 'root_path': '', 'scheme': 'http',
+                 'query_string': query_string, 'headers': [(name.lower().encode(), value.encode()) for name, value in headers],
+                 'server': ('testserver', 80), 'client': ('127.0.0.1', 12345)}
+        await app(scope, receive, send)
+        return messages
+
+    messages = asyncio.run(run())
+    start = messages[0]
+    return start['status'], {name.decode(): value.decode() for name, value in start['headers']}, b''.join(message.get('body', b'') for message in messages[1:])
+
+class TestURLShortenerASGI(unittest.TestCase):
+
+    def setUp(self):
+
+        """
+        Initializes a URLShortenerService with an admin token and its ASGI application.
+        """
+
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.auth_service = AuthService(None)
+        self.auth_service.validate_jwt = MagicMock(return_value={"role": "admin"})
+        self.service = URLShortenerService(self.auth_service, data_file=os.path.join(self.temp_dir.name, 'url_data.json'))
+        self.app = URLShortenerASGI(self.service)
+        self.auth = [('Authorization', 'Bearer test_token')]
+
+    def tearDown(self):
+        self.app.executor.shutdown()
+        self.service.close()
+        self.temp_dir.cleanup()
+
+    def create(self, url):
+        status, _, body = call(self.app, 'POST', '/', self.auth + [('Content-Type', 'application/json')], json.dumps({"url": url}).encode())
+        self.assertEqual(status, 201)
+        return json.loads(body)["generated_uri"]
+
+    def test_redirect_and_search(self):
+
+        """
+        Tests if redirects and searches are answered by the async handlers, for URLs created through the Flask routes.
+        """
+
+        id = self.create("https://www.example.com/ä")
+
+        status, headers, _ = call(self.app, 'GET', f'/{id}', self.auth)
+        self.assertEqual(status, 301)
+        self.assertEqual(headers['location'], "https://www.example.com/%C3%A4")
+
+        status, _, body = call(self.app, 'GET', f'/search/{id}', self.auth)
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)['original_url'], "https://www.example.com/ä")
+
+        self.assertEqual(call(self.app, 'GET', '/missing1', self.auth)[0], 404)
+        self.assertEqual(call(self.app, 'GET', '/search/missing1', self.auth)[0], 404)
+        self.assertEqual(call(self.app, 'GET', f'/{id}')[0], 401)
+
+    def test_listing(self):
+
+        """
+        Tests if the async listing returns the same pages and export as the Flask route.
+        """
+
+        for i in range(5):
+            self.create(f"https://www.example.com/{i}")
+        flask_client = self.service.app.test_client()
+
+        status, _, body = call(self.app, 'GET', '/', self.auth)
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body), flask_client.get('/', headers=dict(self.auth)).get_json())
+
+        status, _, body = call(self.app, 'GET', '/', self.auth, query_string=b'limit=2')
+        page = json.loads(body)
+        self.assertEqual(page, flask_client.get('/?limit=2', headers=dict(self.auth)).get_json())
+        status, _, body = call(self.app, 'GET', '/', self.auth, query_string=f'limit=2&cursor={page["next_cursor"]}'.encode())
+        self.assertEqual(len(json.loads(body)['urls']), 2)
+        self.assertEqual(call(self.app, 'GET', '/', self.auth, query_string=b'limit=0')[0], 400)
+
+        status, headers, body = call(self.app, 'GET', '/', self.auth + [('Accept', 'application/x-ndjson')])
+        self.assertEqual(headers['content-type'], 'application/x-ndjson')
+        self.assertEqual(body, flask_client.get('/', headers=dict(self.auth + [('Accept', 'application/x-ndjson')])).get_data())
+        self.assertEqual(len(body.splitlines()), 5)
+
+        self.auth_service.validate_jwt.return_value = {"role": "user"}
+        self.assertEqual(call(self.app, 'GET', '/', self.auth)[0], 403)
+
+    def test_wsgi_routes(self):
+
+        """
+        Tests if routes without an async handler are served by the Flask application, with the request body and headers passed on.
+        """
+
+        id = self.create("https://www.example.com")
+        status, _, _ = call(self.app, 'PUT', f'/{id}', self.auth + [('Content-Type', 'application/json')], json.dumps({"url": "https://www.example.org"}).encode())
+        self.assertEqual(status, 200)
+        self.assertEqual(self.service.store.get(id)['url'], "https://www.example.org")
+
+        status, _, body = call(self.app, 'GET', '/keys', self.auth)
+        self.assertEqual(status, 200)
+        self.assertEqual(self.service.app.test_client().get('/keys', headers=dict(self.auth)).get_data(), body)
+
+        status, _, body = call(self.app, 'GET', '/metrics')
+        self.assertEqual(status, 200)
+        self.assertIn(b'url_shortener_replication_lag_seconds', body)
+
+        self.assertEqual(call(self.app, 'DELETE', f'/{id}', self.auth)[0], 204)
+        self.assertEqual(call(self.app, 'GET', f'/{id}', self.auth)[0], 404)
+
+    def test_lifespan_shutdown(self):
+
+        """
+        Tests if shutting the server down closes the store, so queued writes are flushed.
+        """
+
+        self.service.close = MagicMock()
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+        async def receive():
+            return messages.pop(0)
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(self.app({'type': 'lifespan'}, receive, send))
+        self.assertEqual(sent, ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+        self.service.close.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()